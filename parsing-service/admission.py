@@ -0,0 +1,168 @@
+import asyncio
+import heapq
+import itertools
+import math
+from contextlib import asynccontextmanager
+from typing import List
+
+from loguru import logger
+
+import config
+from exceptions import AdmissionQueueFullError, ServiceOverloadedError
+from monitoring import record_admission_rejection, record_admission_wait, update_admission_state
+from tracing import stage
+
+# Weight of the latest parse in the running average used for Retry-After
+_HOLD_SMOOTHING = 0.2
+
+# Retry-After bounds, in seconds
+_MIN_RETRY_AFTER = 1
+_MAX_RETRY_AFTER = 120
+
+
+class AdmissionController:
+    """Bounds the parses in flight at once, by count and by document bytes.
+
+    A parse acquires a slot for its document size first. While the service
+    is saturated, requests wait in a priority queue rather than all
+    piling onto the parser pool: the queue is ordered by arrival time plus
+    ``seconds_per_mb`` for every megabyte of the document, so small
+    documents overtake large ones without starving them (0 is plain FIFO).
+    Slots are only handed to the head of the queue, so a large document
+    that has waited its turn is not overtaken forever by smaller ones that
+    happen to fit.
+
+    Requests are rejected with a ``Retry-After`` estimate when more than
+    ``max_queue`` are already waiting (429) or when they waited
+    ``max_wait`` seconds without being admitted (503). A document larger
+    than ``max_bytes`` on its own is admitted once nothing else is in
+    flight.
+    """
+
+    def __init__(
+        self,
+        max_jobs: int = config.ADMISSION_MAX_JOBS,
+        max_bytes: int = config.ADMISSION_MAX_BYTES,
+        max_queue: int = config.ADMISSION_MAX_QUEUE,
+        max_wait: float = config.ADMISSION_MAX_WAIT,
+        seconds_per_mb: float = config.ADMISSION_SECONDS_PER_MB,
+    ):
+        self.max_jobs = max(1, max_jobs)
+        self.max_bytes = max(1, max_bytes)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self.seconds_per_mb = seconds_per_mb
+        self.jobs = 0
+        self.bytes = 0
+        self._waiters: List[list] = []  # heap of [priority, sequence, size, future]
+        self._sequence = itertools.count()
+        self._average_hold = 1.0  # seconds a parse holds its slot, smoothed
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _fits(self, size: int) -> bool:
+        if self.jobs >= self.max_jobs:
+            return False
+        return self.jobs == 0 or self.bytes + size <= self.max_bytes
+
+    def _take(self, size: int):
+        self.jobs += 1
+        self.bytes += size
+
+    def _update_metrics(self):
+        update_admission_state(self.jobs, self.bytes, len(self._waiters))
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to be free: the queue ahead,
+        drained ``max_jobs`` at a time at the recent parse duration."""
+        rounds = (len(self._waiters) + 1) / self.max_jobs
+        seconds = math.ceil(self._average_hold * max(1.0, rounds))
+        return min(_MAX_RETRY_AFTER, max(_MIN_RETRY_AFTER, seconds))
+
+    async def acquire(self, size: int, document_type: str = None, bounded: bool = True):
+        """Wait for a slot for a document of ``size`` bytes.
+
+        ``bounded=False`` is for callers that already cap their own
+        concurrency, such as batches and background jobs: they wait as
+        long as it takes and are never rejected.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        if not self._waiters and self._fits(size):
+            self._take(size)
+            self._update_metrics()
+            record_admission_wait(0.0)
+            return
+
+        if bounded and len(self._waiters) >= self.max_queue:
+            record_admission_rejection("queue_full")
+            raise AdmissionQueueFullError(
+                "Too many documents are waiting to be parsed",
+                document_type=document_type,
+                details={"waiting": len(self._waiters), "max_queue": self.max_queue},
+                retry_after=self.retry_after()
+            )
+
+        future = loop.create_future()
+        entry = [start + self.seconds_per_mb * size / (1024 * 1024), next(self._sequence), size, future]
+        heapq.heappush(self._waiters, entry)
+        self._update_metrics()
+        try:
+            await asyncio.wait_for(future, timeout=self.max_wait if bounded else None)
+        except asyncio.TimeoutError:
+            self._remove(entry)
+            record_admission_rejection("timeout")
+            logger.warning(f"Parse of {size} bytes was not admitted within {self.max_wait:g}s")
+            raise ServiceOverloadedError(
+                f"Service is busy, the document was not admitted within {self.max_wait:g}s",
+                document_type=document_type,
+                details={"in_flight": self.jobs, "waiting": len(self._waiters)},
+                retry_after=self.retry_after()
+            )
+        except BaseException:
+            # Cancelled while waiting; give the slot back if it was just granted
+            if future.done() and not future.cancelled():
+                self.release(size)
+            else:
+                self._remove(entry)
+            raise
+        record_admission_wait(loop.time() - start)
+
+    def release(self, size: int, held: float = None):
+        """Free the slot of a finished parse and admit whoever fits next."""
+        self.jobs -= 1
+        self.bytes -= size
+        if held is not None:
+            self._average_hold += _HOLD_SMOOTHING * (held - self._average_hold)
+        self._wake()
+
+    def _remove(self, entry: list):
+        if entry in self._waiters:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+            # The waiter may have been blocking the head of the queue
+            self._wake()
+
+    def _wake(self):
+        while self._waiters and self._fits(self._waiters[0][2]):
+            _, _, size, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._take(size)
+            future.set_result(None)
+        self._update_metrics()
+
+    @asynccontextmanager
+    async def admit(self, size: int, document_type: str = None, bounded: bool = True):
+        """Hold a slot for the enclosed parse; the wait is traced as the
+        ``admission`` stage."""
+        with stage("admission"):
+            await self.acquire(size, document_type, bounded)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            yield
+        finally:
+            self.release(size, loop.time() - start)
@@ -0,0 +1,266 @@
+"""Deterministic synthetic documents for the parser benchmarks.
+
+Every fixture is rebuilt byte for byte from its description, so a
+benchmark run needs no checked-in documents and no network access. A
+fixture controls the page count (slides for PPTX), how many tables a page
+carries and how many images the document holds.
+
+Run from ``parsing-service/`` to write the corpus out, e.g. to profile a
+single document or feed it to the load test::
+
+    python -m benchmarks.corpus corpus/                   # every fixture
+    python -m benchmarks.corpus corpus/ --fixture pdf-large
+"""
+import argparse
+import io
+import os
+import random
+import struct
+import zipfile
+import zlib
+from dataclasses import dataclass
+from typing import Iterable, List
+
+import docx
+import fitz
+from docx.enum.text import WD_BREAK
+from docx.shared import Inches as DocxInches
+from pptx import Presentation
+from pptx.util import Inches
+
+WORDS = "revenue ebitda margin growth churn pipeline quarter forecast target region contract renewal".split()
+
+HEADER = ("Segment", "FY2022", "FY2023", "Growth", "Margin")
+
+MIME_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+}
+
+
+@dataclass(frozen=True)
+class Fixture:
+    """A synthetic document.
+
+    ``pages`` is the page count, or the slide count of a PPTX (a DOCX
+    "page" is a block of paragraphs ended by a page break). ``tables`` is
+    the number of tables per page and may be fractional: 0.25 puts a table
+    on every fourth page. ``images`` is the total spread across the pages.
+    """
+    name: str
+    document_type: str
+    pages: int
+    tables: float = 0.0
+    images: int = 0
+    seed: int = 0
+
+    @property
+    def filename(self) -> str:
+        return f"{self.name}.{self.document_type}"
+
+    @property
+    def mime_type(self) -> str:
+        return MIME_TYPES[self.document_type]
+
+    def tables_on(self, page: int) -> int:
+        return int((page + 1) * self.tables) - int(page * self.tables)
+
+    def images_on(self, page: int) -> int:
+        return (page + 1) * self.images // self.pages - page * self.images // self.pages
+
+
+CORPUS = (
+    Fixture("pdf-small", "pdf", pages=5, tables=0.5, images=2),
+    Fixture("pdf-tables", "pdf", pages=50, tables=3),
+    Fixture("pdf-images", "pdf", pages=20, images=120),
+    Fixture("pdf-large", "pdf", pages=300, tables=1, images=30),
+    Fixture("docx-small", "docx", pages=5, tables=0.5, images=2),
+    Fixture("docx-tables", "docx", pages=50, tables=2),
+    Fixture("docx-large", "docx", pages=300, tables=0.25, images=30),
+    Fixture("pptx-small", "pptx", pages=10, tables=0.2, images=4),
+    Fixture("pptx-images", "pptx", pages=50, images=150),
+    Fixture("pptx-large", "pptx", pages=500, tables=0.1, images=50),
+)
+
+
+def get_fixtures(names: Iterable[str] = None, document_type: str = None) -> List[Fixture]:
+    """The corpus, or the named fixtures of it in the given order,
+    limited to ``document_type`` when given."""
+    by_name = {
+        fixture.name: fixture for fixture in CORPUS
+        if document_type is None or fixture.document_type == document_type
+    }
+    if not names:
+        return list(by_name.values())
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise ValueError(f"Unknown fixtures: {', '.join(unknown)} (available: {', '.join(by_name)})")
+    return [by_name[name] for name in names]
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def build_image(rng: random.Random, size: int = 96, blocks: int = 4) -> bytes:
+    """A small RGB PNG of ``blocks`` x ``blocks`` coloured squares."""
+    colours = [bytes(rng.randrange(256) for _ in range(3)) for _ in range(blocks * blocks)]
+    step = size // blocks
+    rows = []
+    for y in range(size):
+        row = colours[(y // step) * blocks:(y // step + 1) * blocks]
+        rows.append(b"\x00" + b"".join(colour * step for colour in row))
+    return b"".join((
+        b"\x89PNG\r\n\x1a\n",
+        _png_chunk(b"IHDR", struct.pack(">IIBBBBB", step * blocks, size, 8, 2, 0, 0, 0)),
+        _png_chunk(b"IDAT", zlib.compress(b"".join(rows))),
+        _png_chunk(b"IEND", b""),
+    ))
+
+
+def _fixed_timestamps(data: bytes) -> bytes:
+    """Rewrite an OOXML package with constant entry times, so the same
+    fixture always has the same bytes."""
+    source = zipfile.ZipFile(io.BytesIO(data))
+    stream = io.BytesIO()
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            target.writestr(zipfile.ZipInfo(info.filename, date_time=(1980, 1, 1, 0, 0, 0)), source.read(info), zipfile.ZIP_DEFLATED)
+    return stream.getvalue()
+
+
+def _sentence(rng: random.Random, words: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _table_row(rng: random.Random) -> tuple:
+    return (
+        rng.choice(WORDS).title(),
+        f"${rng.uniform(1, 900):,.1f}M",
+        f"${rng.uniform(1, 900):,.1f}M",
+        f"{rng.uniform(-20, 40):.1f}%",
+        f"({rng.uniform(0, 30):.1f}%)",
+    )
+
+
+def build_pdf(fixture: Fixture) -> bytes:
+    """A4 pages of a paragraph, aligned-column financial tables and a row
+    of images along the bottom margin. At most four tables fit on a page."""
+    rng = random.Random(fixture.seed)
+    doc = fitz.open()
+    for page_num in range(fixture.pages):
+        page = doc.new_page()
+        writer = fitz.TextWriter(page.rect)
+        y = 72
+        for _ in range(6):
+            writer.append((72, y), _sentence(rng))
+            y += 14
+        for _ in range(min(4, fixture.tables_on(page_num))):
+            y += 40
+            for x, label in zip((72, 200, 290, 380, 470), HEADER):
+                writer.append((x, y), label)
+            for _ in range(8):
+                y += 14
+                for x, cell in zip((72, 200, 290, 380, 470), _table_row(rng)):
+                    writer.append((x, y), cell)
+        writer.write_text(page)
+        for index in range(fixture.images_on(page_num)):
+            x = 72 + (index % 8) * 58
+            row = index // 8
+            page.insert_image(fitz.Rect(x, 770 - row * 58, x + 50, 820 - row * 58), stream=build_image(rng))
+    data = doc.tobytes(garbage=1, no_new_id=True)
+    doc.close()
+    return data
+
+
+def build_docx(fixture: Fixture) -> bytes:
+    """Pages of 20 paragraphs with 6x5 tables and inline images, each
+    ended by a page break."""
+    rng = random.Random(fixture.seed)
+    doc = docx.Document()
+    for page_num in range(fixture.pages):
+        doc.add_heading(f"Section {page_num + 1}", level=2)
+        for index in range(20):
+            paragraph = doc.add_paragraph(_sentence(rng, 30))
+            if index % 7 == 0:
+                paragraph.add_run(" (as amended)").bold = True
+        for _ in range(fixture.tables_on(page_num)):
+            table = doc.add_table(rows=6, cols=5)
+            for col, label in enumerate(HEADER):
+                table.cell(0, col).text = label
+            for row in range(1, 6):
+                for col, cell in enumerate(_table_row(rng)):
+                    table.cell(row, col).text = cell
+        for _ in range(fixture.images_on(page_num)):
+            doc.add_picture(io.BytesIO(build_image(rng)), width=DocxInches(1))
+        doc.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
+    stream = io.BytesIO()
+    doc.save(stream)
+    return _fixed_timestamps(stream.getvalue())
+
+
+def build_pptx(fixture: Fixture) -> bytes:
+    """Title-and-content slides with speaker notes, 6x5 tables and pictures."""
+    rng = random.Random(fixture.seed)
+    prs = Presentation()
+    layout = prs.slide_layouts[1]
+    for slide_num in range(fixture.pages):
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.title.text = f"Slide {slide_num + 1}: {rng.choice(WORDS)}"
+        body = slide.placeholders[1].text_frame
+        body.text = _sentence(rng)
+        for _ in range(4):
+            body.add_paragraph().text = _sentence(rng)
+        for index in range(fixture.tables_on(slide_num)):
+            shape = slide.shapes.add_table(6, 5, Inches(0.5 + index * 0.3), Inches(4 + index * 0.3), Inches(8), Inches(2))
+            table = shape.table
+            for col, label in enumerate(HEADER):
+                table.cell(0, col).text = label
+            for row in range(1, 6):
+                for col, cell in enumerate(_table_row(rng)):
+                    table.cell(row, col).text = cell
+        for index in range(fixture.images_on(slide_num)):
+            slide.shapes.add_picture(io.BytesIO(build_image(rng)), Inches(0.2 + (index % 10) * 0.95), Inches(6.6), width=Inches(0.8))
+        slide.notes_slide.notes_text_frame.text = _sentence(rng, 40)
+    stream = io.BytesIO()
+    prs.save(stream)
+    return _fixed_timestamps(stream.getvalue())
+
+
+BUILDERS = {
+    "pdf": build_pdf,
+    "docx": build_docx,
+    "pptx": build_pptx,
+}
+
+
+def build(fixture: Fixture) -> bytes:
+    """The bytes of ``fixture``; the same on every call."""
+    return BUILDERS[fixture.document_type](fixture)
+
+
+def write_corpus(directory: str, fixtures: Iterable[Fixture]) -> List[str]:
+    """Write ``fixtures`` to ``directory`` and return their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for fixture in fixtures:
+        path = os.path.join(directory, fixture.filename)
+        with open(path, "wb") as handle:
+            handle.write(build(fixture))
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="where to write the documents")
+    parser.add_argument("--fixture", action="append", help="fixture to write, repeatable (default: all)")
+    args = parser.parse_args()
+
+    for path in write_corpus(args.directory, get_fixtures(args.fixture)):
+        print(f"{path}: {os.path.getsize(path) / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""DOCX extraction engine benchmark.
+
+Compares ``parse_docx`` on the python-docx object model with the streaming
+``ooxml`` engine (``DOCX_ENGINE``), and checks both return the same result.
+
+Run from ``parsing-service/``::
+
+    python -m benchmarks.docx_engines                     # the DOCX files of the benchmark corpus
+    python -m benchmarks.docx_engines --fixture docx-large --pages 1000
+    python -m benchmarks.docx_engines path/to/contract.docx
+"""
+import argparse
+import dataclasses
+import time
+
+import config
+from benchmarks.corpus import build, get_fixtures
+from parsers.docx_parser import parse_docx
+
+ENGINES = ("python-docx", "ooxml")
+
+
+def time_engine(source, engine: str, rounds: int):
+    """Best wall time in seconds over ``rounds`` and the parse result."""
+    config.DOCX_ENGINE = engine
+    best = float("inf")
+    result = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = parse_docx(source)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(source, name: str, rounds: int):
+    timings = {}
+    results = {}
+    for engine in ENGINES:
+        timings[engine], results[engine] = time_engine(source, engine, rounds)
+    reference = results[ENGINES[0]]
+    # The text holds one line per non-empty paragraph
+    print(f"{name}: {len(reference['text'].splitlines())} paragraphs, {len(reference['tables'])} tables")
+    for engine in ENGINES:
+        print(f"  {engine:12} {timings[engine] * 1000:9.1f} ms")
+    print(f"  speedup      {timings['python-docx'] / timings['ooxml']:.2f}x")
+    print(f"  identical    {results['ooxml'] == reference}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("docs", nargs="*", help="DOCX files to benchmark (default: corpus fixtures)")
+    parser.add_argument("--fixture", action="append", help="corpus fixture to run, repeatable (default: every DOCX)")
+    parser.add_argument("--pages", type=int, help="page count (20 paragraphs each) overriding the fixtures'")
+    parser.add_argument("--rounds", type=int, default=3, help="repetitions per engine, best time is kept")
+    args = parser.parse_args()
+
+    engine = config.DOCX_ENGINE
+    try:
+        if args.docs:
+            for path in args.docs:
+                run(path, path, args.rounds)
+        else:
+            for fixture in get_fixtures(args.fixture, "docx"):
+                if args.pages:
+                    fixture = dataclasses.replace(fixture, pages=args.pages)
+                run(build(fixture), fixture.name, args.rounds)
+    finally:
+        config.DOCX_ENGINE = engine
+
+
+if __name__ == "__main__":
+    main()
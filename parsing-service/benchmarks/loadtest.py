@@ -0,0 +1,369 @@
+"""HTTP load test for a running parsing service.
+
+Replays a weighted mix of documents against ``/parse`` at a target request
+rate while probing ``/health`` and scraping ``/metrics`` on the side, then
+reports per endpoint:
+
+- achieved rate, status codes and error rate; 429/503 answers from
+  admission control are counted as rejections, apart from other errors
+- p50/p95/p99/max latency and a latency histogram
+- what the server saw over the run, from its Prometheus metrics: documents
+  parsed and failed, admission rejections, mean time per stage, event loop
+  lag, and the peak of queue depth, in-flight parses, pool usage and memory
+
+Load is open-loop: requests are sent on schedule whether or not earlier
+ones have finished, the way independent clients behave, so a saturated
+server shows up as rising latency and rejections rather than as a lower
+send rate. ``--max-outstanding`` caps the requests in flight; sends skipped
+because of it are reported as dropped.
+
+The mix defaults to fixtures of the synthetic corpus (``benchmarks.corpus``,
+built in memory), so no documents are needed. The same documents are sent
+over and over, so start the service with ``PARSE_CACHE_MEMORY_BYTES=0`` and
+no ``PARSE_CACHE_DIR`` to measure parsing rather than cache hits. The
+command exits with status 1 when a ``/health`` probe fails or their p99
+latency exceeds ``--health-slo``.
+
+Start the service, then run from ``parsing-service/``::
+
+    python -m benchmarks.loadtest                                   # 2 parses/s for 60s on localhost:8000
+    python -m benchmarks.loadtest --rate 10 --duration 300 --mix pdf-small=6,docx-small=3,pdf-large=1
+    python -m benchmarks.loadtest --doc report.pdf --doc deck.pptx --param normalize=true
+    python -m benchmarks.loadtest --url http://10.0.0.5:8000 --output run.json
+"""
+import argparse
+import asyncio
+import json
+import mimetypes
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+
+from benchmarks.corpus import MIME_TYPES, build, get_fixtures
+from benchmarks.suite import percentile
+
+DEFAULT_MIX = "pdf-small=5,docx-small=3,pptx-small=3,pdf-tables=1"
+
+# Latency histogram bucket bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+
+# Server gauges whose peak over the run is reported
+PEAK_GAUGES = (
+    "parse_admission_queue_depth",
+    "parse_admission_in_flight_jobs",
+    "parser_pool_busy_workers",
+    "parser_worker_processes",
+    "parsing_service_process_memory_bytes",
+    "parsing_service_process_cpu_percent",
+)
+
+# Sample key: metric sample name and its sorted labels
+SampleKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class EndpointStats:
+    """Latencies and outcomes of the requests to one endpoint."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.statuses: Dict[str, int] = {}
+        self.dropped = 0
+
+    def record(self, latency: float, outcome: str):
+        """``outcome`` is the status code, or the exception class name for
+        requests that got no response."""
+        self.latencies.append(latency)
+        self.statuses[outcome] = self.statuses.get(outcome, 0) + 1
+
+    @property
+    def sent(self) -> int:
+        return len(self.latencies)
+
+    def count(self, predicate: Callable[[str], bool]) -> int:
+        return sum(count for outcome, count in self.statuses.items() if predicate(outcome))
+
+    def summary(self, duration: float) -> dict:
+        rejected = self.count(lambda outcome: outcome in ("429", "503"))
+        succeeded = self.count(lambda outcome: outcome.startswith("2"))
+        errors = self.sent - succeeded - rejected
+        summary = {
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "rate": self.sent / duration if duration else 0.0,
+            "statuses": dict(sorted(self.statuses.items())),
+            "rejected": rejected,
+            "errors": errors,
+            "error_rate": errors / self.sent if self.sent else 0.0,
+            "histogram": self.histogram(),
+        }
+        if self.latencies:
+            summary.update({
+                "p50": percentile(self.latencies, 0.50),
+                "p95": percentile(self.latencies, 0.95),
+                "p99": percentile(self.latencies, 0.99),
+                "max": max(self.latencies),
+            })
+        return summary
+
+    def histogram(self) -> Dict[str, int]:
+        """Request count per latency bucket, keyed by its upper bound."""
+        counts = [0] * len(LATENCY_BUCKETS)
+        for latency in self.latencies:
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    counts[index] += 1
+                    break
+        return {("+Inf" if bound == float("inf") else f"{bound:g}"): count for bound, count in zip(LATENCY_BUCKETS, counts)}
+
+
+@dataclass
+class Document:
+    filename: str
+    data: bytes
+    mime_type: str
+
+
+def load_mix(mix: str, paths: List[str]) -> Tuple[List[Document], List[float]]:
+    """The documents to replay and their weights: files given with
+    ``--doc``, equally weighted, or else ``name=weight`` corpus fixtures."""
+    if paths:
+        documents = []
+        for path in paths:
+            with open(path, "rb") as handle:
+                data = handle.read()
+            mime_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            documents.append(Document(os.path.basename(path), data, mime_type))
+        return documents, [1.0] * len(documents)
+
+    weights = {}
+    for entry in mix.split(","):
+        name, _, weight = entry.strip().partition("=")
+        weights[name] = float(weight or 1)
+    fixtures = get_fixtures(list(weights))
+    documents = [Document(fixture.filename, build(fixture), MIME_TYPES[fixture.document_type]) for fixture in fixtures]
+    return documents, [weights[fixture.name] for fixture in fixtures]
+
+
+def parse_metrics(text: str) -> Dict[SampleKey, float]:
+    samples = {}
+    for family in text_string_to_metric_families(text):
+        for sample in family.samples:
+            samples[(sample.name, tuple(sorted(sample.labels.items())))] = sample.value
+    return samples
+
+
+class MetricsTimeline:
+    """Scrapes of the server's ``/metrics`` taken during the run."""
+
+    def __init__(self):
+        self.scrapes: List[Tuple[float, Dict[SampleKey, float]]] = []
+
+    def add(self, at: float, text: str):
+        self.scrapes.append((at, parse_metrics(text)))
+
+    def delta(self, name: str, group_by: str = None) -> Dict[str, float]:
+        """How much the samples called ``name`` grew between the first and
+        the last scrape, summed, or per value of the ``group_by`` label."""
+        if len(self.scrapes) < 2:
+            return {}
+        first, last = self.scrapes[0][1], self.scrapes[-1][1]
+        totals: Dict[str, float] = {}
+        for key, value in last.items():
+            if key[0] != name:
+                continue
+            group = dict(key[1]).get(group_by, "") if group_by else "total"
+            totals[group] = totals.get(group, 0.0) + value - first.get(key, 0.0)
+        return totals
+
+    def mean(self, histogram: str, group_by: str = None) -> Dict[str, float]:
+        """Mean observation of a histogram over the run."""
+        sums = self.delta(f"{histogram}_sum", group_by)
+        counts = self.delta(f"{histogram}_count", group_by)
+        return {group: sums[group] / counts[group] for group in sums if counts.get(group)}
+
+    def peak(self, name: str) -> Optional[float]:
+        """Highest value over the scrapes of a gauge, summed over its series."""
+        values = [
+            sum(value for key, value in samples.items() if key[0] == name)
+            for _, samples in self.scrapes
+            if any(key[0] == name for key in samples)
+        ]
+        return max(values) if values else None
+
+    def summary(self) -> dict:
+        return {
+            "documents": self.delta("documents_processed_total", "status"),
+            "errors": self.delta("parsing_errors_total", "error_type"),
+            "admission_rejections": self.delta("parse_admission_rejections_total", "reason"),
+            "mean_processing_seconds": self.mean("document_processing_seconds", "document_type"),
+            "mean_stage_seconds": self.mean("parse_stage_seconds", "stage"),
+            "mean_admission_wait_seconds": self.mean("parse_admission_wait_seconds").get("total"),
+            "mean_event_loop_lag_seconds": self.mean("event_loop_lag_seconds").get("total"),
+            "peaks": {name: self.peak(name) for name in PEAK_GAUGES},
+        }
+
+
+async def open_loop(
+    rate: float,
+    duration: float,
+    send: Callable[[], Awaitable[None]],
+    stats: EndpointStats,
+    max_outstanding: int,
+    poisson: bool,
+    rng: random.Random,
+):
+    """Call ``send`` ``rate`` times a second for ``duration`` seconds, on
+    schedule, then wait for the requests still in flight."""
+    if rate <= 0:
+        return
+    loop = asyncio.get_running_loop()
+    end = loop.time() + duration
+    at = loop.time()
+    pending = set()
+    while True:
+        at += rng.expovariate(rate) if poisson else 1 / rate
+        if at >= end:
+            break
+        await asyncio.sleep(max(0.0, at - loop.time()))
+        if len(pending) >= max_outstanding:
+            stats.dropped += 1
+            continue
+        task = asyncio.create_task(send())
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.wait(pending)
+
+
+async def timed(stats: EndpointStats, request: Awaitable[httpx.Response]) -> Optional[httpx.Response]:
+    start = time.perf_counter()
+    try:
+        response = await request
+    except httpx.HTTPError as e:
+        stats.record(time.perf_counter() - start, e.__class__.__name__)
+        return None
+    stats.record(time.perf_counter() - start, str(response.status_code))
+    return response
+
+
+async def run(args) -> dict:
+    documents, weights = load_mix(args.mix, args.doc)
+    params = dict(param.split("=", 1) for param in args.param)
+    rng = random.Random(args.seed)
+    stats = {name: EndpointStats(name) for name in ("/parse", "/health", "/metrics")}
+    timeline = MetricsTimeline()
+    limits = httpx.Limits(max_connections=args.max_outstanding + 8, max_keepalive_connections=args.max_outstanding + 8)
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        async def send_parse():
+            document = rng.choices(documents, weights)[0]
+            files = {"file": (document.filename, document.data, document.mime_type)}
+            await timed(stats["/parse"], client.post("/parse", params=params, files=files))
+
+        async def send_health():
+            await timed(stats["/health"], client.get("/health"))
+
+        async def scrape():
+            response = await timed(stats["/metrics"], client.get("/metrics"))
+            if response is not None and response.status_code == 200:
+                timeline.add(time.time(), response.text)
+
+        await scrape()
+        start = time.perf_counter()
+        poisson = args.arrival == "poisson"
+        await asyncio.gather(
+            open_loop(args.rate, args.duration, send_parse, stats["/parse"], args.max_outstanding, poisson, rng),
+            open_loop(args.health_rate, args.duration, send_health, stats["/health"], args.max_outstanding, False, rng),
+            open_loop(1 / args.scrape_interval, args.duration, scrape, stats["/metrics"], 1, False, rng),
+        )
+        elapsed = time.perf_counter() - start
+        await scrape()
+
+    return {
+        "url": args.url,
+        "rate": args.rate,
+        "duration": elapsed,
+        "documents": {document.filename: len(document.data) for document in documents},
+        "endpoints": {name: endpoint.summary(elapsed) for name, endpoint in stats.items()},
+        "server": timeline.summary(),
+    }
+
+
+def _ms(seconds: Optional[float]) -> str:
+    return "-" if seconds is None else f"{seconds * 1000:.1f}"
+
+
+def report(result: dict):
+    print(f"{result['url']}: {result['duration']:.1f}s at {result['rate']:g} parses/s")
+    for name, endpoint in result["endpoints"].items():
+        print(
+            f"  {name:9} {endpoint['sent']:6} sent {endpoint['rate']:7.2f}/s  errors {endpoint['error_rate']:6.1%}"
+            f"  rejected {endpoint['rejected']}  dropped {endpoint['dropped']}"
+            f"  p50 {_ms(endpoint.get('p50'))}  p95 {_ms(endpoint.get('p95'))}"
+            f"  p99 {_ms(endpoint.get('p99'))}  max {_ms(endpoint.get('max'))} ms"
+        )
+        print(f"            statuses {endpoint['statuses']}")
+    parse = result["endpoints"]["/parse"]
+    if parse["sent"]:
+        print("  /parse latency histogram (seconds):")
+        widest = max(parse["histogram"].values())
+        for bound, count in parse["histogram"].items():
+            if count:
+                print(f"    <= {bound:>5} {count:6} {'#' * max(1, round(40 * count / widest))}")
+
+    server = result["server"]
+    print("  server:")
+    print(f"    documents {server['documents']}  errors {server['errors']}  rejections {server['admission_rejections']}")
+    stages = ", ".join(f"{stage} {_ms(seconds)}" for stage, seconds in sorted(server["mean_stage_seconds"].items()))
+    print(f"    mean stage ms: {stages or '-'}")
+    print(
+        f"    mean admission wait {_ms(server['mean_admission_wait_seconds'])} ms,"
+        f" mean event loop lag {_ms(server['mean_event_loop_lag_seconds'])} ms"
+    )
+    peaks = ", ".join(f"{name} {value:g}" for name, value in server["peaks"].items() if value is not None)
+    print(f"    peaks: {peaks or '-'}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="base URL of the service")
+    parser.add_argument("--rate", type=float, default=2.0, help="/parse requests per second")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds to send load for")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="corpus fixtures as name=weight,... (see benchmarks.corpus)")
+    parser.add_argument("--doc", action="append", default=[], help="document file to replay instead of the mix, repeatable")
+    parser.add_argument("--param", action="append", default=[], help="/parse query parameter as key=value, repeatable")
+    parser.add_argument("--arrival", choices=("poisson", "constant"), default="poisson", help="spacing of /parse requests")
+    parser.add_argument("--health-rate", type=float, default=2.0, help="/health probes per second")
+    parser.add_argument("--scrape-interval", type=float, default=5.0, help="seconds between /metrics scrapes")
+    parser.add_argument("--max-outstanding", type=int, default=64, help="requests in flight per endpoint before sends are dropped")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout in seconds")
+    parser.add_argument("--health-slo", type=float, default=0.1, help="highest acceptable /health p99 in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the arrival times and document choice")
+    parser.add_argument("--output", help="also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    report(result)
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(result, handle, indent=2)
+
+    health = result["endpoints"]["/health"]
+    if health["errors"] or health["rejected"]:
+        print(f"/health failed {health['errors'] + health['rejected']} of {health['sent']} probes")
+        return 1
+    if health.get("p99") is not None and health["p99"] > args.health_slo:
+        print(f"/health p99 {health['p99'] * 1000:.1f} ms exceeds {args.health_slo * 1000:.0f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
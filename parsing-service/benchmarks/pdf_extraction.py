@@ -0,0 +1,76 @@
+"""Per-page PDF text extraction benchmark.
+
+Compares the old two-pass extraction (``get_text()`` followed by
+``get_text("words")`` for table detection) with the single layout pass
+used by ``parse_pdf``.
+
+Run from ``parsing-service/``::
+
+    python -m benchmarks.pdf_extraction                 # the PDFs of the benchmark corpus
+    python -m benchmarks.pdf_extraction --fixture pdf-large --pages 500
+    python -m benchmarks.pdf_extraction path/to/deck.pdf
+"""
+import argparse
+import dataclasses
+import statistics
+import time
+
+import fitz
+
+from benchmarks.corpus import build, get_fixtures
+from parsers.pdf_parser import _extract_page_text
+
+
+def two_pass(page):
+    return page.get_text(), page.get_text("words")
+
+
+def single_pass(page):
+    text, textpage = _extract_page_text(page)
+    return text, page.get_text("words", textpage=textpage)
+
+
+def time_strategy(doc: fitz.Document, extract, rounds: int) -> list:
+    """Per-page extraction times in milliseconds, best of ``rounds``."""
+    best = [float("inf")] * len(doc)
+    for _ in range(rounds):
+        for page_num in range(len(doc)):
+            page = doc[page_num]
+            start = time.perf_counter()
+            extract(page)
+            best[page_num] = min(best[page_num], (time.perf_counter() - start) * 1000)
+    return best
+
+
+def run(doc: fitz.Document, name: str, rounds: int):
+    old = time_strategy(doc, two_pass, rounds)
+    new = time_strategy(doc, single_pass, rounds)
+    old_total, new_total = sum(old), sum(new)
+    print(f"{name}: {len(doc)} pages")
+    print(f"  two-pass     total {old_total:8.1f} ms   median/page {statistics.median(old):.3f} ms")
+    print(f"  single-pass  total {new_total:8.1f} ms   median/page {statistics.median(new):.3f} ms")
+    print(f"  speedup      {old_total / new_total:.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="*", help="PDF files to benchmark (default: corpus fixtures)")
+    parser.add_argument("--fixture", action="append", help="corpus fixture to run, repeatable (default: every PDF)")
+    parser.add_argument("--pages", type=int, help="page count overriding the fixtures'")
+    parser.add_argument("--rounds", type=int, default=3, help="repetitions per page, best time is kept")
+    args = parser.parse_args()
+
+    if args.pdfs:
+        for path in args.pdfs:
+            with fitz.open(path) as doc:
+                run(doc, path, args.rounds)
+    else:
+        for fixture in get_fixtures(args.fixture, "pdf"):
+            if args.pages:
+                fixture = dataclasses.replace(fixture, pages=args.pages)
+            with fitz.open(stream=build(fixture), filetype="pdf") as doc:
+                run(doc, fixture.name, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
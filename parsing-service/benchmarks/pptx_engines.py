@@ -0,0 +1,71 @@
+"""PPTX extraction engine benchmark.
+
+Compares ``parse_pptx`` on the python-pptx object model with the streaming
+``ooxml`` engine (``PPTX_ENGINE``), and checks both return the same result.
+
+Run from ``parsing-service/``::
+
+    python -m benchmarks.pptx_engines                  # the decks of the benchmark corpus
+    python -m benchmarks.pptx_engines --fixture pptx-large --slides 2000
+    python -m benchmarks.pptx_engines path/to/deck.pptx
+"""
+import argparse
+import dataclasses
+import time
+
+import config
+from benchmarks.corpus import build, get_fixtures
+from parsers.pptx_parser import parse_pptx
+
+ENGINES = ("python-pptx", "ooxml")
+
+
+def time_engine(source, engine: str, rounds: int):
+    """Best wall time in seconds over ``rounds`` and the parse result."""
+    config.PPTX_ENGINE = engine
+    best = float("inf")
+    result = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = parse_pptx(source)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(source, name: str, rounds: int):
+    timings = {}
+    results = {}
+    for engine in ENGINES:
+        timings[engine], results[engine] = time_engine(source, engine, rounds)
+    reference = results[ENGINES[0]]
+    print(f"{name}: {reference['total_slides']} slides, {len(reference['tables'])} tables")
+    for engine in ENGINES:
+        print(f"  {engine:12} {timings[engine] * 1000:9.1f} ms")
+    print(f"  speedup      {timings['python-pptx'] / timings['ooxml']:.2f}x")
+    print(f"  identical    {results['ooxml'] == reference}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("decks", nargs="*", help="PPTX files to benchmark (default: corpus fixtures)")
+    parser.add_argument("--fixture", action="append", help="corpus fixture to run, repeatable (default: every PPTX)")
+    parser.add_argument("--slides", type=int, help="slide count overriding the fixtures'")
+    parser.add_argument("--rounds", type=int, default=3, help="repetitions per engine, best time is kept")
+    args = parser.parse_args()
+
+    engine = config.PPTX_ENGINE
+    try:
+        if args.decks:
+            for path in args.decks:
+                run(path, path, args.rounds)
+        else:
+            for fixture in get_fixtures(args.fixture, "pptx"):
+                if args.slides:
+                    fixture = dataclasses.replace(fixture, pages=args.slides)
+                run(build(fixture), fixture.name, args.rounds)
+    finally:
+        config.PPTX_ENGINE = engine
+
+
+if __name__ == "__main__":
+    main()
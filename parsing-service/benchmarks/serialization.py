@@ -0,0 +1,99 @@
+"""Response serialisation benchmark.
+
+Compares how long the ``/parse`` result of a document takes to encode, and
+how big the body is, for the old ``JSONResponse`` path (``jsonable_encoder``
+followed by ``json.dumps``) and each format ``serialization`` offers: stdlib
+and orjson JSON, msgpack, and the Arrow IPC stream of normalized tables.
+Results are parsed with ``normalize=true`` so every format carries the
+same tables.
+
+Run from ``parsing-service/``::
+
+    python -m benchmarks.serialization                  # the whole benchmark corpus
+    python -m benchmarks.serialization --fixture pdf-tables --pages 1000
+    python -m benchmarks.serialization path/to/report.pdf path/to/deck.pptx
+"""
+import argparse
+import dataclasses
+import json
+import tempfile
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import serialization
+from benchmarks.corpus import get_fixtures, write_corpus
+from parsers import ParseOptions, detect_parser
+
+
+def json_response(result: dict) -> bytes:
+    """What FastAPI did for a returned dict before ``serialization``."""
+    return JSONResponse(content=jsonable_encoder(result)).body
+
+
+def stdlib_json(result: dict) -> bytes:
+    return json.dumps(result, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+def encoders() -> dict:
+    """Name to encoder, skipping formats whose library is not installed."""
+    available = {"JSONResponse": json_response, "json (stdlib)": stdlib_json}
+    if serialization.orjson is not None:
+        available["json (orjson)"] = serialization.dumps_json
+    if serialization.msgpack is not None:
+        available["msgpack"] = serialization.dumps_msgpack
+    if serialization.pa is not None:
+        available["arrow"] = serialization.dumps_arrow
+    return available
+
+
+def time_encoder(encode, result: dict, rounds: int):
+    """Best wall time in seconds over ``rounds`` and the encoded body."""
+    best = float("inf")
+    body = b""
+    for _ in range(rounds):
+        start = time.perf_counter()
+        body = encode(result)
+        best = min(best, time.perf_counter() - start)
+    return best, body
+
+
+def run(path: str, name: str, rounds: int):
+    _, parser = detect_parser(path, filename=path)
+    result = parser(path, ParseOptions(normalize=True))
+    cells = sum(len(column) for frame in result.get("normalized_tables", []) for column in frame["data"])
+    print(f"{name}: {len(result.get('normalized_tables', []))} tables, {cells} cells")
+
+    baseline = None
+    for label, encode in encoders().items():
+        seconds, body = time_encoder(encode, result, rounds)
+        baseline = baseline or (seconds, len(body))
+        print(
+            f"  {label:14} {seconds * 1000:9.2f} ms {seconds and baseline[0] / seconds:7.1f}x"
+            f" {len(body) / 1024:10.1f} KiB {len(body) / baseline[1]:6.0%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("docs", nargs="*", help="documents to benchmark (default: corpus fixtures)")
+    parser.add_argument("--fixture", action="append", help="corpus fixture to run, repeatable (default: whole corpus)")
+    parser.add_argument("--pages", type=int, help="page (slide) count overriding the fixtures'")
+    parser.add_argument("--rounds", type=int, default=5, help="repetitions per format, best time is kept")
+    args = parser.parse_args()
+
+    if args.docs:
+        for path in args.docs:
+            run(path, path, args.rounds)
+        return
+    fixtures = get_fixtures(args.fixture)
+    if args.pages:
+        fixtures = [dataclasses.replace(fixture, pages=args.pages) for fixture in fixtures]
+    with tempfile.TemporaryDirectory(prefix="serialization-bench-") as directory:
+        for fixture, path in zip(fixtures, write_corpus(directory, fixtures)):
+            run(path, fixture.name, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
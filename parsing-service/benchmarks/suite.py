@@ -0,0 +1,297 @@
+"""Parser benchmark suite.
+
+Runs every fixture of the synthetic corpus (``benchmarks.corpus``) through
+its parser (``parse_pdf``, ``parse_docx``, ``parse_pptx``) and through the
+``/parse`` endpoint, and reports per case:
+
+- throughput, in documents and megabytes per second
+- p50/p95/p99 latency
+- peak RSS of the benchmark and its parser workers while the case ran,
+  and how far it rose above the RSS before the case
+- peak Python allocations (tracemalloc) of one extra, untimed iteration
+
+Endpoint cases go through the FastAPI app in-process with the parse cache
+disabled and the parser executor set by ``PARSER_EXECUTOR`` as in
+production. With the process executor, their allocations cover only the
+request handling in the service process; parsing itself happens in the
+workers.
+
+Each run is appended as one JSON line to the history file (by default
+``~/.cache/parsing-service/benchmark-history.jsonl``, outside the source
+tree) and compared with the previous run from the same host. The command exits with status 1
+when a case's p95 latency or peak allocations grew by more than
+``--threshold``, so it can gate a deploy. Everything is generated locally
+and no network access is needed.
+
+Run from ``parsing-service/``::
+
+    python -m benchmarks.suite                            # whole corpus, both modes
+    python -m benchmarks.suite --fixture pdf-small --fixture docx-small --iterations 30
+    python -m benchmarks.suite --mode direct --history /tmp/history.jsonl
+    python -m benchmarks.suite --no-history              # report only
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Callable, List, Optional
+
+import psutil
+
+import config
+from benchmarks.corpus import Fixture, build, get_fixtures
+from parsers import ParseOptions, detect_parser
+
+MODES = ("direct", "endpoint")
+
+DEFAULT_HISTORY = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "parsing-service", "benchmark-history.jsonl"
+)
+
+# Latency changes smaller than this are noise, whatever the percentage
+MIN_LATENCY_DELTA = 0.002
+
+# How often peak RSS is sampled while a case runs, in seconds
+RSS_INTERVAL = 0.005
+
+
+def percentile(values: List[float], q: float) -> float:
+    """The ``q`` quantile (0-1) of ``values``, linearly interpolated."""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class PeakRSS:
+    """Samples the RSS of this process and its children on a thread and
+    keeps the highest total seen."""
+
+    def __init__(self, interval: float = RSS_INTERVAL):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.baseline = self.current()
+        self.peak = self.baseline
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def current(self) -> int:
+        total = 0
+        for process in [self.process] + self.process.children(recursive=True):
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                continue
+        return total
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.current())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+def direct_runner(fixture: Fixture, path: str) -> Callable[[], None]:
+    """Parse the document in this process with its registered parser."""
+    _, parser = detect_parser(path, filename=fixture.filename)
+    options = ParseOptions()
+    return lambda: parser(path, options)
+
+
+class EndpointRunner:
+    """Posts documents to ``/parse`` of the app, in-process."""
+
+    def __init__(self):
+        from fastapi.testclient import TestClient
+        from loguru import logger
+
+        import main
+        from cache import ParseResultCache
+
+        # Every iteration must parse, not hit the cache
+        main.parse_cache = ParseResultCache(memory_bytes=0, directory="")
+        logger.remove()
+        logger.add(sys.stderr, level="WARNING")
+        self.client = TestClient(main.app)
+
+    def __enter__(self):
+        self.client.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.client.__exit__(*exc_info)
+
+    def runner(self, fixture: Fixture, path: str) -> Callable[[], None]:
+        with open(path, "rb") as handle:
+            data = handle.read()
+
+        def post():
+            response = self.client.post("/parse", files={"file": (fixture.filename, data, fixture.mime_type)})
+            if response.status_code != 200:
+                raise RuntimeError(f"/parse returned {response.status_code} for {fixture.name}: {response.text[:200]}")
+        return post
+
+
+def run_case(run: Callable[[], None], size: int, iterations: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        run()
+    latencies = []
+    with PeakRSS() as rss:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            run()
+            latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        run()
+        _, allocated_peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    total = sum(latencies)
+    return {
+        "iterations": iterations,
+        "bytes": size,
+        "docs_per_second": iterations / total,
+        "mb_per_second": size * iterations / total / (1024 * 1024),
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "peak_rss_bytes": rss.peak,
+        "rss_growth_bytes": max(0, rss.peak - rss.baseline),
+        "peak_alloc_bytes": allocated_peak,
+    }
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "executor": config.PARSER_EXECUTOR,
+        "workers": config.PARSER_WORKERS,
+    }
+
+
+def load_previous(history: str, host: str) -> Optional[dict]:
+    """The latest run recorded in ``history`` from ``host``."""
+    if not os.path.exists(history):
+        return None
+    previous = None
+    with open(history) as handle:
+        for line in handle:
+            if line.strip():
+                record = json.loads(line)
+                if record.get("host") == host:
+                    previous = record
+    return previous
+
+
+def regressions(cases: dict, previous: Optional[dict], threshold: float) -> List[str]:
+    """Cases whose p95 latency or peak allocations grew by more than ``threshold``."""
+    found = []
+    for name, case in cases.items():
+        before = (previous or {}).get("cases", {}).get(name)
+        if before is None:
+            continue
+        if case["p95"] > before["p95"] * (1 + threshold) and case["p95"] - before["p95"] > MIN_LATENCY_DELTA:
+            found.append(f"{name}: p95 {before['p95'] * 1000:.1f} -> {case['p95'] * 1000:.1f} ms")
+        if case["peak_alloc_bytes"] > before["peak_alloc_bytes"] * (1 + threshold):
+            found.append(
+                f"{name}: peak allocations {before['peak_alloc_bytes'] / 2**20:.1f} -> "
+                f"{case['peak_alloc_bytes'] / 2**20:.1f} MiB"
+            )
+    return found
+
+
+def report(name: str, case: dict, before: Optional[dict]):
+    change = ""
+    if before:
+        change = f" {case['p95'] / before['p95'] - 1:+7.1%}"
+    print(
+        f"  {name:22} {case['docs_per_second']:8.2f} doc/s {case['mb_per_second']:7.2f} MB/s"
+        f"  p50 {case['p50'] * 1000:8.1f}  p95 {case['p95'] * 1000:8.1f}  p99 {case['p99'] * 1000:8.1f} ms{change}"
+        f"  rss {case['peak_rss_bytes'] / 2**20:7.1f} MiB (+{case['rss_growth_bytes'] / 2**20:.1f})"
+        f"  alloc {case['peak_alloc_bytes'] / 2**20:7.1f} MiB"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixture", action="append", help="fixture to run, repeatable (default: whole corpus)")
+    parser.add_argument("--mode", choices=MODES, action="append", help="direct or endpoint, repeatable (default: both)")
+    parser.add_argument("--iterations", type=int, default=10, help="timed iterations per case")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed iterations before each case")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON-lines file the run is appended to")
+    parser.add_argument("--no-history", action="store_true", help="do not read or write the history")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed growth before a case counts as a regression")
+    args = parser.parse_args()
+
+    fixtures = get_fixtures(args.fixture)
+    modes = args.mode or list(MODES)
+    record = environment()
+    previous = None if args.no_history else load_previous(args.history, record["host"])
+    if previous:
+        print(f"Comparing with the run of {previous['timestamp']} ({previous.get('commit') or 'unknown commit'})")
+
+    cases = {}
+    endpoint = EndpointRunner() if "endpoint" in modes else None
+    with tempfile.TemporaryDirectory(prefix="parser-bench-") as directory:
+        if endpoint:
+            endpoint.__enter__()
+        try:
+            for fixture in fixtures:
+                data = build(fixture)
+                path = os.path.join(directory, fixture.filename)
+                with open(path, "wb") as handle:
+                    handle.write(data)
+                print(f"{fixture.name}: {len(data) / 1024:.1f} KiB")
+                for mode in modes:
+                    run = direct_runner(fixture, path) if mode == "direct" else endpoint.runner(fixture, path)
+                    name = f"{fixture.name}/{mode}"
+                    cases[name] = run_case(run, len(data), args.iterations, args.warmup)
+                    report(mode, cases[name], (previous or {}).get("cases", {}).get(name))
+        finally:
+            if endpoint:
+                endpoint.__exit__(None, None, None)
+
+    record["cases"] = cases
+    if not args.no_history:
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        with open(args.history, "a") as handle:
+            handle.write(json.dumps(record) + "\n")
+        print(f"Appended results to {args.history}")
+
+    found = regressions(cases, previous, args.threshold)
+    for line in found:
+        print(f"REGRESSION {line}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from loguru import logger
+
+import config
+from monitoring import (
+    record_cache_hit,
+    record_cache_miss,
+    record_cache_eviction,
+    update_cache_size
+)
+from parsers import PARSER_VERSION, ParseOptions
+
+
+class _MemoryTier:
+    """LRU of serialized results, bounded by total byte size."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._entries[key] = data
+            self.size += len(data)
+            evicted = 0
+            while self.size > self.max_bytes:
+                _, dropped = self._entries.popitem(last=False)
+                self.size -= len(dropped)
+                evicted += 1
+        if evicted:
+            record_cache_eviction("memory", evicted)
+        update_cache_size("memory", self.size)
+
+
+class _DiskTier:
+    """One JSON file per result, evicting least recently used files by size."""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(entry.stat().st_size for entry in self._scan())
+        update_cache_size("disk", self.size)
+
+    def _scan(self):
+        return [entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # mark as recently used
+            return data
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        with self._lock:
+            try:
+                self.size -= os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, path)
+            self.size += len(data)
+            if self.size > self.max_bytes:
+                self._evict()
+        update_cache_size("disk", self.size)
+
+    def _evict(self):
+        entries = sorted(self._scan(), key=lambda entry: entry.stat().st_mtime)
+        evicted = 0
+        for entry in entries:
+            if self.size <= self.max_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            self.size -= size
+            evicted += 1
+        if evicted:
+            record_cache_eviction("disk", evicted)
+
+
+class ParseResultCache:
+    """Content-addressed cache of parse results.
+
+    Results are keyed by the SHA-256 of the document bytes, the document
+    type, ``PARSER_VERSION`` and the parse options, and stored serialized so every hit hands
+    out a fresh copy. A memory LRU sits in front of an optional disk tier.
+    """
+
+    def __init__(
+        self,
+        memory_bytes: int = config.PARSE_CACHE_MEMORY_BYTES,
+        directory: str = config.PARSE_CACHE_DIR,
+        disk_bytes: int = config.PARSE_CACHE_DISK_BYTES,
+    ):
+        self.memory = _MemoryTier(memory_bytes) if memory_bytes > 0 else None
+        self.disk = _DiskTier(directory, disk_bytes) if directory else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.memory is not None or self.disk is not None
+
+    @staticmethod
+    def key_for(digest: str, doc_type: str, options: ParseOptions) -> str:
+        options_hash = hashlib.sha256(options.cache_token().encode("utf-8")).hexdigest()[:16]
+        return f"{doc_type}-v{PARSER_VERSION}-{digest}-{options_hash}"
+
+    async def get(self, key: str) -> Optional[dict]:
+        """Return a cached result, or None on a miss."""
+        return await asyncio.to_thread(self._get, key)
+
+    async def put(self, key: str, result: dict):
+        """Store a parse result in every enabled tier."""
+        await asyncio.to_thread(self._put, key, result)
+
+    def _get(self, key: str) -> Optional[dict]:
+        if self.memory is not None:
+            data = self.memory.get(key)
+            if data is not None:
+                record_cache_hit("memory")
+                return json.loads(data)
+        if self.disk is not None:
+            try:
+                data = self.disk.get(key)
+            except OSError as e:
+                logger.warning(f"Failed to read cached result {key}: {str(e)}")
+                data = None
+            if data is not None:
+                record_cache_hit("disk")
+                if self.memory is not None:
+                    self.memory.put(key, data)
+                return json.loads(data)
+        record_cache_miss()
+        return None
+
+    def _put(self, key: str, result: dict):
+        data = json.dumps(result, separators=(",", ":"), default=str).encode("utf-8")
+        if self.memory is not None:
+            self.memory.put(key, data)
+        if self.disk is not None:
+            try:
+                self.disk.put(key, data)
+            except OSError as e:
+                logger.warning(f"Failed to write cached result {key}: {str(e)}")
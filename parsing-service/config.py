@@ -0,0 +1,99 @@
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment."""
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float setting from the environment."""
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+# Upload limits and spooling
+MAX_DOCUMENT_BYTES = _env_int("MAX_DOCUMENT_BYTES", 50 * 1024 * 1024)  # 50MB
+SPOOL_DIR = os.getenv("SPOOL_DIR") or None  # defaults to the system temp directory
+UPLOAD_CHUNK_BYTES = _env_int("UPLOAD_CHUNK_BYTES", 1024 * 1024)
+
+# How parse_pdf opens spooled files: "file" lets MuPDF read the file on
+# demand, "mmap" maps it read-only so parses share the OS page cache
+PDF_OPEN_MODE = os.getenv("PDF_OPEN_MODE", "file").lower()
+
+# DOCX extraction engine: "python-docx" builds the full object model,
+# "ooxml" streams word/document.xml with an incremental XML parser
+DOCX_ENGINE = os.getenv("DOCX_ENGINE", "python-docx").lower()
+
+# PPTX extraction engine: "python-pptx" loads the whole presentation,
+# "ooxml" reads one slide (and its notes) at a time straight from the zip
+PPTX_ENGINE = os.getenv("PPTX_ENGINE", "python-pptx").lower()
+
+# Batch parsing (/parse/batch)
+BATCH_MAX_BYTES = _env_int("BATCH_MAX_BYTES", 1024 * 1024 * 1024)  # whole request body / archive
+BATCH_MAX_FILES = _env_int("BATCH_MAX_FILES", 500)
+BATCH_CONCURRENCY = _env_int("BATCH_CONCURRENCY", _env_int("PARSER_WORKERS", os.cpu_count() or 1))
+
+# CPU executor used to run the parsers off the event loop
+PARSER_EXECUTOR = os.getenv("PARSER_EXECUTOR", "process").lower()  # "process" or "thread"
+PARSER_WORKERS = _env_int("PARSER_WORKERS", os.cpu_count() or 1)
+PARSER_MAX_QUEUE = _env_int("PARSER_MAX_QUEUE", PARSER_WORKERS * 4)
+PARSER_JOB_TIMEOUT = _env_float("PARSER_JOB_TIMEOUT", 120.0)  # seconds
+PARSER_MAX_JOBS_PER_WORKER = _env_int("PARSER_MAX_JOBS_PER_WORKER", 50)
+
+# Admission control: parses allowed in flight at once, by count and by
+# document bytes. Further requests wait, smaller documents first (each MB
+# counts as ADMISSION_SECONDS_PER_MB of extra queueing; 0 is FIFO), and are
+# turned away with 429 when ADMISSION_MAX_QUEUE are already waiting or 503
+# after waiting ADMISSION_MAX_WAIT seconds
+ADMISSION_MAX_JOBS = _env_int("ADMISSION_MAX_JOBS", PARSER_WORKERS * 2)
+ADMISSION_MAX_BYTES = _env_int("ADMISSION_MAX_BYTES", 512 * 1024 * 1024)
+ADMISSION_MAX_QUEUE = _env_int("ADMISSION_MAX_QUEUE", 100)
+ADMISSION_MAX_WAIT = _env_float("ADMISSION_MAX_WAIT", 30.0)  # seconds
+ADMISSION_SECONDS_PER_MB = _env_float("ADMISSION_SECONDS_PER_MB", 0.2)
+
+# PDFs with at least this many pages are split into page ranges parsed by
+# separate process workers (0 disables)
+PDF_PARALLEL_MIN_PAGES = _env_int("PDF_PARALLEL_MIN_PAGES", 100)
+
+# Asynchronous parse jobs (/parse-document, /status)
+JOB_STORE_URL = os.getenv("JOB_STORE_URL", "memory://")  # memory://, sqlite:///path.db or redis://host:6379/0
+JOB_CONCURRENCY = _env_int("JOB_CONCURRENCY", PARSER_WORKERS)
+JOB_QUEUE_SIZE = _env_int("JOB_QUEUE_SIZE", 1000)
+JOB_TTL = _env_int("JOB_TTL", 7 * 24 * 3600)  # seconds a job is kept after its last update (memory and Redis)
+JOB_MEMORY_MAX_FINISHED = _env_int("JOB_MEMORY_MAX_FINISHED", 1000)  # finished jobs, with results, a memory:// store holds
+# An unfinished job untouched for this long is presumed lost with the node
+# that ran it: it is recovered at start-up and may be resubmitted
+JOB_STALE_AFTER = _env_float("JOB_STALE_AFTER", 3600.0)
+
+# Where /parse-document reads uploads from
+SUPABASE_URL = os.getenv("SUPABASE_URL", "")
+SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
+STORAGE_BUCKET = os.getenv("STORAGE_BUCKET", "documents")
+# Local directory uploads are read from without Supabase; unset disables it
+DOCUMENT_ROOT = os.getenv("DOCUMENT_ROOT", "")
+
+# Parse result cache, keyed by document hash and parser version
+PARSE_CACHE_MEMORY_BYTES = _env_int("PARSE_CACHE_MEMORY_BYTES", 256 * 1024 * 1024)  # 0 disables the memory tier
+PARSE_CACHE_DIR = os.getenv("PARSE_CACHE_DIR", "")  # empty disables the disk tier
+PARSE_CACHE_DISK_BYTES = _env_int("PARSE_CACHE_DISK_BYTES", 2 * 1024 * 1024 * 1024)
+
+# Prometheus multiprocess mode: when the service runs as several processes
+# (uvicorn/gunicorn --workers), point PROMETHEUS_MULTIPROC_DIR at a directory
+# shared by all of them and emptied before they start, so /metrics reports
+# the whole instance rather than whichever process answered the scrape
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or os.getenv("prometheus_multiproc_dir") or ""
+
+# Runtime metrics: process resources of the service and its parser workers
+# are sampled every RUNTIME_METRICS_INTERVAL seconds; event loop lag and
+# parser pool utilisation every LOOP_LAG_INTERVAL seconds
+RUNTIME_METRICS_INTERVAL = _env_float("RUNTIME_METRICS_INTERVAL", 15.0)
+LOOP_LAG_INTERVAL = _env_float("LOOP_LAG_INTERVAL", 0.5)
+
+# Per-stage parse spans are exported to an OpenTelemetry collector over
+# OTLP/HTTP, e.g. http://localhost:4318/v1/traces (empty disables export)
+OTLP_ENDPOINT = os.getenv("OTLP_ENDPOINT", "")
+OTLP_SERVICE_NAME = os.getenv("OTLP_SERVICE_NAME", "parsing-service")
+OTLP_EXPORT_INTERVAL = _env_float("OTLP_EXPORT_INTERVAL", 5.0)  # seconds
+OTLP_MAX_QUEUE = _env_int("OTLP_MAX_QUEUE", 2048)  # traces buffered between exports
@@ -1,18 +1,33 @@
 class ParsingError(Exception):
     """Base exception for all parsing related errors."""
+    status_code = 400
+
     def __init__(self, message: str, document_type: str = None, details: dict = None):
         self.message = message
         self.document_type = document_type
         self.details = details or {}
         super().__init__(self.message)
 
+    def to_detail(self) -> dict:
+        """Error payload returned to API clients."""
+        return {
+            "error": str(self),
+            "type": self.__class__.__name__,
+            "document_type": self.document_type,
+            "details": self.details
+        }
+
+    def headers(self) -> dict:
+        """Extra HTTP headers for the error response."""
+        return {}
+
 class DocumentTypeError(ParsingError):
     """Raised when document type is unsupported or cannot be determined."""
     pass
 
 class DocumentSizeError(ParsingError):
     """Raised when document size exceeds limits."""
-    pass
+    status_code = 413
 
 class DocumentCorruptedError(ParsingError):
     """Raised when document content is corrupted or unreadable."""
@@ -32,4 +47,25 @@ class MetadataExtractionError(ParsingError):
 
 class NormalizationError(ParsingError):
     """Raised when content normalization fails."""
-    pass 
\ No newline at end of file
+    pass
+
+class ParsingTimeoutError(ParsingError):
+    """Raised when parsing a document exceeds the per-job time limit."""
+    status_code = 504
+
+class ServiceOverloadedError(ParsingError):
+    """Raised when the service is saturated and no more work can be accepted."""
+    status_code = 503
+
+    def __init__(self, message: str, document_type: str = None, details: dict = None, retry_after: int = None):
+        super().__init__(message, document_type, details)
+        self.retry_after = retry_after
+        if retry_after is not None:
+            self.details.setdefault("retry_after", retry_after)
+
+    def headers(self) -> dict:
+        return {"Retry-After": str(self.retry_after)} if self.retry_after is not None else {}
+
+class AdmissionQueueFullError(ServiceOverloadedError):
+    """Raised when too many requests are already waiting to be admitted."""
+    status_code = 429
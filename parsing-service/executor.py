@@ -0,0 +1,320 @@
+import asyncio
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+import config
+import tracing
+from exceptions import ParsingTimeoutError, ServiceOverloadedError
+
+_DONE = object()
+
+
+class ParseExecutor:
+    """Runs the CPU-bound parsers in a process or thread pool.
+
+    Admission is bounded: at most ``max_workers + max_queue`` jobs may be
+    in flight, anything beyond that is rejected instead of piling up in
+    memory. Process workers are replaced after ``max_jobs_per_worker``
+    jobs so leaks in the native PDF/Office libraries cannot accumulate.
+    A job running longer than ``job_timeout`` after a worker picked it up
+    fails with a timeout; time spent waiting for a worker does not count.
+    """
+
+    def __init__(
+        self,
+        mode: str = config.PARSER_EXECUTOR,
+        max_workers: int = config.PARSER_WORKERS,
+        max_queue: int = config.PARSER_MAX_QUEUE,
+        job_timeout: float = config.PARSER_JOB_TIMEOUT,
+        max_jobs_per_worker: int = config.PARSER_MAX_JOBS_PER_WORKER,
+    ):
+        if mode not in ("process", "thread"):
+            raise ValueError(f"Unknown parser executor mode: {mode}")
+        self.mode = mode
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.job_timeout = job_timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self._pool: Optional[Executor] = None
+        self._in_flight = 0
+        self._job_ids = itertools.count()
+        # Jobs waiting for a worker to pick them up: loop, start future, pool
+        self._starting: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Future, Executor]] = {}
+        # Callers waiting on each pool, and the worker processes of replaced
+        # pools still draining (shutting a pool down forgets its processes)
+        self._pool_jobs: Dict[Executor, int] = {}
+        self._retiring: Dict[Executor, list] = {}
+        # Process workers report job starts over this queue
+        self._started_events = None
+        self._reader: Optional[threading.Thread] = None
+
+    @property
+    def in_flight(self) -> int:
+        """Number of jobs currently running or waiting for a worker."""
+        return self._in_flight
+
+    @property
+    def busy_workers(self) -> int:
+        """Number of workers currently running a job."""
+        return min(self._in_flight, self.max_workers)
+
+    def worker_pids(self) -> List[int]:
+        """Process ids of the live pool workers (none in thread mode)."""
+        processes = (getattr(self._pool, "_processes", None) or {}) if self.mode == "process" else {}
+        return [process.pid for process in list(processes.values()) if process.is_alive()]
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of jobs accepted at once."""
+        return self.max_workers + self.max_queue
+
+    def start(self):
+        """Create the worker pool."""
+        if self._pool is None:
+            if self.mode == "process":
+                self._started_events = multiprocessing.get_context("spawn").SimpleQueue()
+                self._reader = threading.Thread(
+                    target=self._read_started, args=(self._started_events,), name="parser-starts", daemon=True
+                )
+                self._reader.start()
+            self._pool = self._create_pool()
+            logger.info(
+                f"Started {self.mode} parser pool with {self.max_workers} workers "
+                f"(queue={self.max_queue}, timeout={self.job_timeout}s)"
+            )
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker pool."""
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            pool.shutdown(wait=wait, cancel_futures=True)
+            for processes in self._retiring.values():
+                _terminate_workers(processes)
+            self._retiring.clear()
+            if self._reader is not None:
+                self._started_events.put(None)
+                self._reader.join()
+                self._reader = None
+
+    def _create_pool(self) -> Executor:
+        if self.mode == "thread":
+            return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="parser")
+        # Workers are spawned rather than forked so they never inherit the
+        # event loop, sockets or locks of the uvicorn process.
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            max_tasks_per_child=self.max_jobs_per_worker or None,
+            initializer=_init_worker,
+            initargs=(self._started_events,),
+        )
+
+    async def run(self, func: Callable[..., Any], *args: Any, document_type: str = None) -> Any:
+        """Run ``func(*args)`` on a worker and return its result."""
+        self._admit(document_type)
+        return await self._submit(func, *args, document_type=document_type)
+
+    async def run_all(self, calls: List[Callable[[], Any]], document_type: str = None) -> List[Any]:
+        """Run several calls belonging to one job concurrently.
+
+        The job is admitted once, then its calls fan out across the
+        workers; results are returned in the order of ``calls``.
+        """
+        self._admit(document_type)
+        return await asyncio.gather(*(self._submit(call, document_type=document_type) for call in calls))
+
+    async def stream(self, func: Callable[..., Iterator[Any]], *args: Any, document_type: str = None) -> AsyncIterator[Any]:
+        """Iterate the generator returned by ``func(*args)`` off the event loop.
+
+        Generators cannot cross process boundaries, so streamed jobs always
+        advance on a thread; they are still admitted and counted like any
+        other job, and each item is subject to the per-job timeout.
+        """
+        self._admit(document_type)
+        self._in_flight += 1
+        iterator = func(*args)
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(asyncio.to_thread(next, iterator, _DONE), timeout=self.job_timeout)
+                except asyncio.TimeoutError:
+                    raise ParsingTimeoutError(
+                        f"Parsing exceeded the {self.job_timeout:g}s time limit",
+                        document_type=document_type,
+                        details={"timeout": self.job_timeout}
+                    )
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            self._in_flight -= 1
+            try:
+                iterator.close()
+            except ValueError:
+                pass  # still running on a worker thread after a timeout
+
+    def _admit(self, document_type: str = None):
+        if self._in_flight >= self.capacity:
+            raise ServiceOverloadedError(
+                "Parser queue is full",
+                document_type=document_type,
+                details={"in_flight": self._in_flight, "capacity": self.capacity},
+                retry_after=1
+            )
+        self.start()
+
+    async def _submit(self, func: Callable[..., Any], *args: Any, document_type: str = None) -> Any:
+        self._in_flight += 1
+        # Stages timed on the worker are handed back to the request's trace
+        trace = tracing.current_trace()
+        if trace is not None:
+            func, args = tracing.run_traced, (time.time(), func, *args)
+        try:
+            while True:
+                pool = self._pool
+                self._pool_jobs[pool] = self._pool_jobs.get(pool, 0) + 1
+                try:
+                    result = await self._run_on(pool, func, args, document_type)
+                    break
+                except _Requeue:
+                    continue  # its pool was replaced before the job started
+                finally:
+                    self._leave(pool)
+            if trace is not None:
+                result, worker_trace = result
+                trace.merge(worker_trace)
+            return result
+        finally:
+            self._in_flight -= 1
+
+    async def _run_on(self, pool: Executor, func: Callable[..., Any], args: tuple, document_type: str = None) -> Any:
+        """Run one job on ``pool``; its time limit starts when a worker
+        picks it up, so time spent queued behind other jobs never counts."""
+        loop = asyncio.get_running_loop()
+        job_id = next(self._job_ids)
+        started = loop.create_future()
+        self._starting[job_id] = (loop, started, pool)
+        # Process workers report the start over the pool's queue
+        notify = None if self.mode == "process" else self._job_started
+        future = loop.run_in_executor(pool, _run_job, notify, job_id, func, *args)
+        try:
+            await asyncio.wait({future, started}, return_when=asyncio.FIRST_COMPLETED)
+            if not future.done():
+                if started.result() is None:
+                    raise _Requeue()
+                remaining = started.result() + self.job_timeout - time.time()
+                await asyncio.wait({future}, timeout=max(0.0, remaining))
+            if not future.done():
+                logger.warning(f"Parser job exceeded {self.job_timeout}s timeout")
+                self._recycle(pool)
+                raise ParsingTimeoutError(
+                    f"Parsing exceeded the {self.job_timeout:g}s time limit",
+                    document_type=document_type,
+                    details={"timeout": self.job_timeout}
+                )
+            if future.cancelled() and pool is not self._pool and self._pool is not None:
+                raise _Requeue()
+            return future.result()
+        finally:
+            self._starting.pop(job_id, None)
+            # No-op once done. An abandoned job is stopped if it has not
+            # started, and the BrokenProcessPool it gets when its worker is
+            # terminated is ignored
+            future.cancel()
+
+    def _job_started(self, job_id: int, started: Optional[float]):
+        """Called from worker threads, or the thread reading process
+        workers' start reports; ``None`` sends the job to the new pool."""
+        entry = self._starting.get(job_id)
+        if entry is None:
+            return
+        loop, waiter, _ = entry
+        try:
+            loop.call_soon_threadsafe(_resolve, waiter, started)
+        except RuntimeError:
+            pass  # the loop has closed
+
+    def _read_started(self, events):
+        while True:
+            event = events.get()
+            if event is None:
+                return
+            self._job_started(*event)
+
+    def _recycle(self, pool: Executor):
+        """Replace a pool that has a runaway job.
+
+        Threads cannot be interrupted, so only process pools are recycled.
+        New work goes to a fresh pool straight away and jobs the old pool
+        has not started move to it. Jobs already running on the old pool
+        finish; its processes are terminated once no caller is waiting on
+        it any more (see ``_leave``), which leaves only runaway or
+        abandoned jobs to kill.
+        """
+        if self.mode != "process" or pool is not self._pool:
+            return
+        self._pool = self._create_pool()
+        self._retiring[pool] = list(pool._processes.values())
+        for job_id, (_, waiter, job_pool) in list(self._starting.items()):
+            if job_pool is pool and not waiter.done():
+                self._job_started(job_id, None)
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _leave(self, pool: Executor):
+        """A caller stopped waiting on ``pool``; terminate the processes of
+        a replaced pool once the last one has."""
+        self._pool_jobs[pool] -= 1
+        if self._pool_jobs[pool]:
+            return
+        del self._pool_jobs[pool]
+        if pool in self._retiring:
+            _terminate_workers(self._retiring.pop(pool))
+
+
+class _Requeue(Exception):
+    """The job's pool was replaced before a worker picked the job up."""
+
+
+def _resolve(waiter: asyncio.Future, value: Any):
+    if not waiter.done():
+        waiter.set_result(value)
+
+
+# Where a process worker reports the jobs it starts, set by _init_worker
+_started_events = None
+
+
+def _run_job(notify: Optional[Callable[[int, float], None]], job_id: int, func: Callable[..., Any], *args: Any) -> Any:
+    """Report when a worker picks the job up, then run it."""
+    if notify is None:
+        _started_events.put((job_id, time.time()))
+    else:
+        notify(job_id, time.time())
+    return func(*args)
+
+
+def _init_worker(started_events):
+    global _started_events
+    _started_events = started_events
+    # Workers hand their stage timings and extraction counts back through
+    # the request trace and never record metrics themselves. Keep them on
+    # the in-memory registry so short-lived workers do not leave metric
+    # files behind in the shared multiprocess directory. This module must
+    # not import prometheus_client for that to take effect.
+    os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    os.environ.pop("prometheus_multiproc_dir", None)
+
+
+def _terminate_workers(processes: list):
+    # ProcessPoolExecutor has no public API to kill a busy worker.
+    for process in processes:
+        if process.is_alive():
+            logger.warning(f"Terminating stuck parser worker {process.pid}")
+            process.terminate()
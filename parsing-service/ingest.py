@@ -0,0 +1,275 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import zipfile
+from typing import AsyncIterator, BinaryIO, List, Optional, Tuple, Union
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+import config
+from exceptions import DocumentCorruptedError, DocumentSizeError, ParsingError
+
+# Allowance for multipart boundaries and part headers around the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+def _size_error(size: int, doc_type: str = None, max_bytes: int = config.MAX_DOCUMENT_BYTES) -> DocumentSizeError:
+    return DocumentSizeError(
+        f"Document exceeds size limit of {max_bytes // (1024 * 1024)}MB",
+        document_type=doc_type,
+        details={"size": size}
+    )
+
+
+class SpooledDocument:
+    """A document written to a temporary file while it was received.
+
+    Parsers are handed ``path`` rather than the bytes, so the upload is never
+    held in Python memory as a whole. ``digest`` is the SHA-256 of the
+    content, computed on the fly for the result cache. ``file`` is an open
+    upload that ``path`` refers to, closed along with the document.
+    """
+
+    def __init__(self, path: str, size: int, digest: str, owned: bool = True, file: BinaryIO = None):
+        self.path = path
+        self.size = size
+        self.digest = digest
+        self.owned = owned
+        self.file = file
+
+    def close(self):
+        """Delete the temporary file."""
+        if self.file is not None:
+            self.file.close()
+        if self.owned:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self) -> "SpooledDocument":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+async def spool_stream(
+    chunks: AsyncIterator[bytes],
+    doc_type: str = None,
+    max_bytes: int = config.MAX_DOCUMENT_BYTES,
+) -> SpooledDocument:
+    """Write an async stream of chunks to a temp file, enforcing ``max_bytes``.
+
+    Raises ``DocumentSizeError`` as soon as the limit is crossed instead of
+    after the whole body has been received.
+    """
+    fd, path = tempfile.mkstemp(suffix=f".{doc_type or 'bin'}", dir=config.SPOOL_DIR)
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise _size_error(size, doc_type, max_bytes)
+                hasher.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return SpooledDocument(path, size, hasher.hexdigest())
+
+
+async def spool_upload(
+    file: UploadFile,
+    doc_type: str = None,
+    max_bytes: int = config.MAX_DOCUMENT_BYTES,
+) -> SpooledDocument:
+    """Spool a multipart upload for parsing.
+
+    Starlette has already spooled the upload to a temporary file. Where open
+    files can be reopened through ``/proc`` that file is used in place,
+    rolled over to disk first if it was small enough to stay in memory;
+    elsewhere it is copied to a temp file in fixed-size chunks.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise _size_error(file.size, doc_type, max_bytes)
+    document = await asyncio.to_thread(_adopt_upload, file.file, doc_type, max_bytes)
+    if document is not None:
+        return document
+
+    async def chunks():
+        while True:
+            chunk = await file.read(config.UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+
+    return await spool_stream(chunks(), doc_type, max_bytes)
+
+
+def _adopt_upload(spooled: BinaryIO, doc_type: str = None, max_bytes: int = config.MAX_DOCUMENT_BYTES) -> Optional[SpooledDocument]:
+    # Anonymous temp files have no name; process workers reopen this one
+    # through the service process's descriptor table
+    fds = f"/proc/{os.getpid()}/fd"
+    if not hasattr(spooled, "rollover") or not os.path.isdir(fds):
+        return None
+    spooled.rollover()
+    spooled.flush()
+    path = f"{fds}/{spooled.fileno()}"
+    hasher = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(config.UPLOAD_CHUNK_BYTES), b""):
+            size += len(chunk)
+            if size > max_bytes:
+                raise _size_error(size, doc_type, max_bytes)
+            hasher.update(chunk)
+    return SpooledDocument(path, size, hasher.hexdigest(), owned=False, file=spooled)
+
+
+async def spool_file(path: str, doc_type: str = None, max_bytes: int = config.MAX_DOCUMENT_BYTES) -> SpooledDocument:
+    """Wrap an existing local file without copying it."""
+    def digest_file():
+        size = os.path.getsize(path)
+        if size > max_bytes:
+            raise _size_error(size, doc_type, max_bytes)
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(config.UPLOAD_CHUNK_BYTES), b""):
+                hasher.update(chunk)
+        return size, hasher.hexdigest()
+
+    size, digest = await asyncio.to_thread(digest_file)
+    return SpooledDocument(path, size, digest, owned=False)
+
+
+def extract_archive(
+    path: str,
+    max_files: int = config.BATCH_MAX_FILES,
+    max_bytes: int = config.MAX_DOCUMENT_BYTES,
+    max_total_bytes: int = config.BATCH_MAX_BYTES,
+) -> List[Tuple[str, Union[SpooledDocument, ParsingError]]]:
+    """Spool every file in a zip archive to its own temp file.
+
+    Returns ``(name, document)`` pairs in archive order; members over
+    ``max_bytes`` get a ``DocumentSizeError`` in place of the document so
+    one oversize file does not fail the rest. Blocking, run it on a thread.
+    """
+    try:
+        archive = zipfile.ZipFile(path)
+    except zipfile.BadZipFile as e:
+        raise DocumentCorruptedError(f"Invalid zip archive: {str(e)}", document_type="zip")
+
+    entries = []
+    total = 0
+    try:
+        with archive:
+            members = [
+                info for info in archive.infolist()
+                if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+            ]
+            if len(members) > max_files:
+                raise DocumentSizeError(
+                    f"Archive contains more than {max_files} files",
+                    document_type="zip",
+                    details={"files": len(members)}
+                )
+            for info in members:
+                suffix = os.path.splitext(info.filename)[1].lstrip(".").lower() or None
+                if info.file_size > max_bytes:
+                    entries.append((info.filename, _size_error(info.file_size, suffix, max_bytes)))
+                    continue
+                total += info.file_size
+                if total > max_total_bytes:
+                    raise _size_error(total, "zip", max_total_bytes)
+                entries.append((info.filename, _spool_member(archive, info, suffix, max_bytes)))
+    except BaseException as e:
+        for _, entry in entries:
+            if isinstance(entry, SpooledDocument):
+                entry.close()
+        if isinstance(e, zipfile.BadZipFile):
+            raise DocumentCorruptedError(f"Invalid zip archive: {str(e)}", document_type="zip")
+        raise
+    return entries
+
+
+def _spool_member(
+    archive: zipfile.ZipFile,
+    info: zipfile.ZipInfo,
+    doc_type: str = None,
+    max_bytes: int = config.MAX_DOCUMENT_BYTES,
+) -> Union[SpooledDocument, ParsingError]:
+    fd, path = tempfile.mkstemp(suffix=f".{doc_type or 'bin'}", dir=config.SPOOL_DIR)
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f, archive.open(info) as member:
+            for chunk in iter(lambda: member.read(config.UPLOAD_CHUNK_BYTES), b""):
+                # The sizes in the zip headers are not trusted
+                size += len(chunk)
+                if size > max_bytes:
+                    break
+                hasher.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    if size > max_bytes:
+        os.remove(path)
+        return _size_error(size, doc_type, max_bytes)
+    return SpooledDocument(path, size, hasher.hexdigest())
+
+
+class UploadSizeLimitMiddleware:
+    """Rejects oversize upload bodies before they are fully received.
+
+    Requests whose ``Content-Length`` already exceeds the limit get a 413
+    without reading the body; for the rest the received bytes are counted
+    and the request is aborted as soon as the limit is crossed.
+    """
+
+    def __init__(self, app, paths=("/parse",), max_bytes: int = config.MAX_DOCUMENT_BYTES):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = max_bytes
+        self.max_body_bytes = max_bytes + MULTIPART_OVERHEAD_BYTES
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = _content_length(scope)
+        if content_length is not None and content_length > self.max_body_bytes:
+            error = _size_error(content_length, max_bytes=self.max_bytes)
+            response = JSONResponse(status_code=error.status_code, content={"detail": error.to_detail()})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    error = _size_error(received, max_bytes=self.max_bytes)
+                    raise HTTPException(status_code=error.status_code, detail=error.to_detail())
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def _content_length(scope) -> Optional[int]:
+    for name, value in scope.get("headers", []):
+        if name == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
@@ -0,0 +1,350 @@
+import asyncio
+import json
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from enum import Enum
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from loguru import logger
+
+import config
+from exceptions import ParsingError, ServiceOverloadedError
+
+
+class JobStatus(str, Enum):
+    """Mirrors the ``parsing_status`` enum in the Supabase schema."""
+    PENDING = "pending"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+@dataclass
+class ParseJob:
+    upload_id: str
+    file_path: str
+    file_type: str
+    user_id: Optional[str] = None
+    status: JobStatus = JobStatus.PENDING
+    error: Optional[dict] = None
+    result: Optional[dict] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    completed_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED)
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["status"] = self.status.value
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ParseJob":
+        data = dict(data)
+        data["status"] = JobStatus(data["status"])
+        return cls(**data)
+
+    def status_dict(self) -> dict:
+        """Job state without the (potentially large) parse result."""
+        data = self.to_dict()
+        data.pop("result")
+        return data
+
+
+class JobStore(ABC):
+    """Persistence for parse jobs, keyed by upload id."""
+
+    # Whether other service nodes work on the jobs of this store too
+    shared = False
+
+    @abstractmethod
+    async def get(self, upload_id: str) -> Optional[ParseJob]:
+        ...
+
+    @abstractmethod
+    async def save(self, job: ParseJob) -> None:
+        ...
+
+    async def unfinished(self) -> List[ParseJob]:
+        """Jobs saved as pending or processing."""
+        return []
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryJobStore(JobStore):
+    """Process-local store, suitable for development and single workers.
+
+    Finished jobs carry their whole parse result, so they are dropped
+    ``ttl`` seconds after their last update, and the least recently saved
+    ones once more than ``max_finished`` are held.
+    """
+
+    def __init__(self, ttl: int = config.JOB_TTL, max_finished: int = config.JOB_MEMORY_MAX_FINISHED):
+        self.ttl = ttl
+        self.max_finished = max(0, max_finished)
+        self._jobs: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()  # least recently saved first
+
+    async def get(self, upload_id: str) -> Optional[ParseJob]:
+        entry = self._jobs.get(upload_id)
+        if entry is None or time.time() - entry[0] > self.ttl:
+            return None
+        return ParseJob.from_dict(entry[1])
+
+    async def save(self, job: ParseJob) -> None:
+        self._jobs[job.upload_id] = (time.time(), job.to_dict())
+        self._jobs.move_to_end(job.upload_id)
+        self._evict()
+
+    async def unfinished(self) -> List[ParseJob]:
+        return [
+            ParseJob.from_dict(data) for _, data in self._jobs.values()
+            if data["status"] in (JobStatus.PENDING.value, JobStatus.PROCESSING.value)
+        ]
+
+    def _evict(self):
+        now = time.time()
+        finished = [
+            upload_id for upload_id, (_, data) in self._jobs.items()
+            if data["status"] in (JobStatus.COMPLETED.value, JobStatus.FAILED.value)
+        ]
+        excess = len(finished) - self.max_finished
+        for upload_id in finished:
+            saved_at = self._jobs[upload_id][0]
+            if excess > 0 or now - saved_at > self.ttl:
+                del self._jobs[upload_id]
+                excess -= 1
+
+
+class SQLiteJobStore(JobStore):
+    """File-backed store that survives restarts of a single node."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS parse_jobs ("
+                "upload_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _get(self, upload_id: str) -> Optional[ParseJob]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT data FROM parse_jobs WHERE upload_id = ?", (upload_id,)
+            ).fetchone()
+        return ParseJob.from_dict(json.loads(row[0])) if row else None
+
+    def _save(self, job: ParseJob) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO parse_jobs (upload_id, data, updated_at) VALUES (?, ?, ?)",
+                (job.upload_id, json.dumps(job.to_dict()), time.time())
+            )
+
+    def _unfinished(self) -> List[ParseJob]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT data FROM parse_jobs WHERE json_extract(data, '$.status') IN (?, ?)",
+                (JobStatus.PENDING.value, JobStatus.PROCESSING.value)
+            ).fetchall()
+        return [ParseJob.from_dict(json.loads(row[0])) for row in rows]
+
+    async def get(self, upload_id: str) -> Optional[ParseJob]:
+        return await asyncio.to_thread(self._get, upload_id)
+
+    async def save(self, job: ParseJob) -> None:
+        await asyncio.to_thread(self._save, job)
+
+    async def unfinished(self) -> List[ParseJob]:
+        return await asyncio.to_thread(self._unfinished)
+
+
+class RedisJobStore(JobStore):
+    """Shared store for multi-node deployments.
+
+    Every job expires ``ttl`` seconds after it was last saved, so jobs of a
+    node that went away do not linger forever.
+    """
+
+    shared = True
+
+    def __init__(self, url: str, ttl: int = config.JOB_TTL, prefix: str = "parse_job:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("The redis package is required for a redis:// JOB_STORE_URL") from e
+        self._redis = redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, upload_id: str) -> Optional[ParseJob]:
+        data = await self._redis.get(self.prefix + upload_id)
+        return ParseJob.from_dict(json.loads(data)) if data else None
+
+    async def save(self, job: ParseJob) -> None:
+        await self._redis.set(self.prefix + job.upload_id, json.dumps(job.to_dict()), ex=self.ttl)
+
+    async def unfinished(self) -> List[ParseJob]:
+        jobs = []
+        async for key in self._redis.scan_iter(match=self.prefix + "*"):
+            data = await self._redis.get(key)
+            if data:
+                job = ParseJob.from_dict(json.loads(data))
+                if not job.finished:
+                    jobs.append(job)
+        return jobs
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def create_job_store(url: str = config.JOB_STORE_URL) -> JobStore:
+    """Build a job store from a ``memory://``, ``sqlite:///`` or ``redis://`` URL."""
+    if url.startswith("memory://"):
+        return InMemoryJobStore()
+    if url.startswith("sqlite://"):
+        return SQLiteJobStore(url[len("sqlite:///"):] or "parse_jobs.db")
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisJobStore(url)
+    raise ValueError(f"Unsupported JOB_STORE_URL: {url}")
+
+
+JobHandler = Callable[[ParseJob], Awaitable[dict]]
+
+
+class JobRunner:
+    """Queues parse jobs and works through them in the background.
+
+    The queue lives in this process, so on start-up jobs left unfinished by
+    a previous run are recovered: pending ones are queued again and ones
+    that were being processed are marked failed. In a shared store only
+    jobs untouched for ``stale_after`` seconds are recovered, leaving those
+    of other live nodes alone.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        handler: JobHandler,
+        concurrency: int = config.JOB_CONCURRENCY,
+        queue_size: int = config.JOB_QUEUE_SIZE,
+        stale_after: float = config.JOB_STALE_AFTER,
+    ):
+        self.store = store
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.stale_after = stale_after
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._workers: List[asyncio.Task] = []
+
+    def start(self):
+        """Start the background workers and recover unfinished jobs."""
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._work(), name=f"parse-job-worker-{i}")
+                for i in range(self.concurrency)
+            ]
+            self._workers.append(asyncio.create_task(self.recover(), name="parse-job-recovery"))
+
+    def _is_stale(self, job: ParseJob) -> bool:
+        return time.time() - (job.started_at or job.created_at) > self.stale_after
+
+    async def recover(self):
+        """Queue pending jobs again and fail interrupted ones."""
+        try:
+            jobs = await self.store.unfinished()
+        except Exception as e:
+            logger.error(f"Failed to list unfinished parse jobs: {str(e)}", exc_info=True)
+            return
+        for job in jobs:
+            if self.store.shared and not self._is_stale(job):
+                continue
+            if job.status == JobStatus.PROCESSING:
+                job.status = JobStatus.FAILED
+                job.error = {
+                    "error": "The service stopped while the document was being parsed",
+                    "type": "JobInterruptedError",
+                    "document_type": job.file_type
+                }
+                job.completed_at = time.time()
+                await self.store.save(job)
+                logger.warning(f"Parse job {job.upload_id} was interrupted and is marked failed")
+            elif self._queue.full():
+                logger.warning(f"Parse job queue is full, pending job {job.upload_id} was not requeued")
+            else:
+                self._queue.put_nowait(job.upload_id)
+                logger.info(f"Requeued pending parse job {job.upload_id}")
+
+    async def stop(self):
+        """Cancel the background workers and close the store."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await self.store.close()
+
+    async def submit(self, job: ParseJob) -> ParseJob:
+        """Record a job as pending and queue it.
+
+        Re-submitting an upload that is still pending or processing returns
+        the existing job instead of parsing it twice, unless the job has
+        gone stale and is replaced.
+        """
+        existing = await self.store.get(job.upload_id)
+        if existing and not existing.finished and not self._is_stale(existing):
+            return existing
+        if self._queue.full():
+            raise ServiceOverloadedError(
+                "Parse job queue is full",
+                document_type=job.file_type,
+                details={"queue_size": self._queue.maxsize}
+            )
+        await self.store.save(job)
+        self._queue.put_nowait(job.upload_id)
+        return job
+
+    async def _work(self):
+        while True:
+            upload_id = await self._queue.get()
+            try:
+                await self._process(upload_id)
+            except Exception as e:
+                logger.error(f"Parse job {upload_id} could not be recorded: {str(e)}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, upload_id: str):
+        job = await self.store.get(upload_id)
+        if job is None or job.status != JobStatus.PENDING:
+            return
+
+        job.status = JobStatus.PROCESSING
+        job.started_at = time.time()
+        await self.store.save(job)
+
+        try:
+            job.result = await self.handler(job)
+            job.status = JobStatus.COMPLETED
+        except ParsingError as e:
+            job.status = JobStatus.FAILED
+            job.error = e.to_detail()
+        except Exception as e:
+            logger.error(f"Unexpected error in parse job {upload_id}: {str(e)}", exc_info=True)
+            job.status = JobStatus.FAILED
+            job.error = {
+                "error": "An unexpected error occurred",
+                "type": "UnexpectedError",
+                "document_type": job.file_type
+            }
+        job.completed_at = time.time()
+        await self.store.save(job)
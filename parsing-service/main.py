@@ -1,21 +1,48 @@
-from fastapi import FastAPI, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
 from loguru import logger
 import time
-import psutil
 import asyncio
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+import functools
+import os
+import zipfile
+from typing import List, Optional
+from prometheus_client import CONTENT_TYPE_LATEST
 from starlette.responses import Response
 
-from parsers import parse_pdf, parse_docx, parse_pptx
-from exceptions import ParsingError, DocumentTypeError, DocumentSizeError
+import config
+from parsers import (
+    ParseOptions,
+    RECORD_ITERATORS,
+    detect_parser,
+    get_parser,
+    parse_fields,
+    parse_page_ranges,
+    parse_pdf,
+    parse_pdf_or_plan,
+    merge_pdf_results,
+    normalize_records
+)
+from exceptions import DocumentSizeError, ParsingError
+from executor import ParseExecutor
+from cache import ParseResultCache
+from runtime_metrics import RuntimeMetricsCollector
+from admission import AdmissionController
+from ingest import SpooledDocument, UploadSizeLimitMiddleware, extract_archive, spool_upload
+from jobs import JobRunner, JobStatus, ParseJob, create_job_store
+from storage import load_document
+from serialization import dumps_json, negotiate, render
+from tracing import SpanExporter, Trace, stage, start_trace
 from monitoring import (
     record_document_processed,
     record_processing_time,
     record_document_size,
     record_error,
-    update_resource_metrics
+    record_trace,
+    render_metrics,
+    mark_process_exited
 )
 
 # Configure logging
@@ -38,18 +65,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Background task for resource metrics
-async def update_resource_metrics_task():
-    while True:
-        process = psutil.Process()
-        memory = process.memory_info().rss
-        cpu = process.cpu_percent()
-        update_resource_metrics(memory, cpu)
-        await asyncio.sleep(15)  # Update every 15 seconds
+# Reject oversize uploads before their body has been received
+app.add_middleware(UploadSizeLimitMiddleware, paths=("/parse",))
+app.add_middleware(UploadSizeLimitMiddleware, paths=("/parse/batch",), max_bytes=config.BATCH_MAX_BYTES)
+
+# CPU-bound parsing runs here so it never blocks the event loop
+parse_executor = ParseExecutor()
+
+# Bounds the parses in flight so bursts queue up instead of exhausting memory
+admission = AdmissionController()
+
+# Repeat uploads of the same document are served from here
+parse_cache = ParseResultCache()
+
+# Per-stage parse spans go to an OpenTelemetry collector when configured
+span_exporter = SpanExporter()
+
+# Process, event loop and parser pool health for /metrics
+runtime_metrics = RuntimeMetricsCollector(parse_executor)
 
 @app.on_event("startup")
 async def startup_event():
-    asyncio.create_task(update_resource_metrics_task())
+    parse_executor.start()
+    job_runner.start()
+    span_exporter.start()
+    runtime_metrics.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await job_runner.stop()
+    await span_exporter.stop()
+    await runtime_metrics.stop()
+    parse_executor.shutdown(wait=False)
+    mark_process_exited()
 
 @app.get("/health")
 async def health_check():
@@ -57,79 +105,504 @@ async def health_check():
 
 @app.get("/metrics")
 async def metrics():
-    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
 
-@app.post("/parse")
-async def parse_document(file: UploadFile):
+async def _run_parser(parser, doc_type: str, path: str, options: ParseOptions) -> dict:
+    """Run a parser on the executor, fanning large PDFs out by page range."""
+    if doc_type == "pdf" and parse_executor.mode == "process" and config.PDF_PARALLEL_MIN_PAGES > 0:
+        # The worker parses the PDF outright unless enough pages are
+        # selected to split it, in which case it only plans the ranges
+        result, ranges = await parse_executor.run(
+            functools.partial(
+                parse_pdf_or_plan, path, options, parse_executor.max_workers, config.PDF_PARALLEL_MIN_PAGES
+            ),
+            document_type=doc_type
+        )
+        if result is not None:
+            return result
+        logger.info(f"Parsing PDF pages in {len(ranges)} parallel ranges")
+        parts = await parse_executor.run_all(
+            [functools.partial(parse_pdf, path, options, page_range) for page_range in ranges],
+            document_type=doc_type
+        )
+        return merge_pdf_results(parts)
+    return await parse_executor.run(functools.partial(parser, path, options), document_type=doc_type)
+
+async def _parse_content(
+    document: SpooledDocument,
+    doc_type: str,
+    parser,
+    filename: str,
+    options: ParseOptions = ParseOptions(),
+    bounded: bool = True
+) -> dict:
+    """Parse a spooled document, recording size and success metrics.
+
+    Cache misses are parsed once admission control lets them in; see
+    ``AdmissionController.acquire`` for ``bounded``.
+    """
     start_time = time.time()
-    doc_type = None
     
-    try:
-        # Determine document type
-        content_type = file.content_type.lower()
-        if "pdf" in content_type:
-            doc_type = "pdf"
-            parser = parse_pdf
-        elif "wordprocessingml" in content_type or "docx" in content_type:
-            doc_type = "docx"
-            parser = parse_docx
-        elif "presentationml" in content_type or "pptx" in content_type:
-            doc_type = "pptx"
-            parser = parse_pptx
-        else:
-            raise DocumentTypeError(f"Unsupported document type: {content_type}")
-
-        # Read file content
-        content = await file.read()
-        file_size = len(content)
-        
-        # Record metrics
-        record_document_size(doc_type, file_size)
-        
-        # Size validation (50MB limit)
-        if file_size > 50 * 1024 * 1024:  # 50MB
-            raise DocumentSizeError(
-                "Document exceeds size limit of 50MB",
-                document_type=doc_type,
-                details={"size": file_size}
-            )
+    # Record metrics
+    record_document_size(doc_type, document.size)
+
+    # Serve documents we have already parsed from the cache
+    result = None
+    cache_key = None
+    if parse_cache.enabled:
+        cache_key = parse_cache.key_for(document.digest, doc_type, options)
+        with stage("cache"):
+            result = await parse_cache.get(cache_key)
 
+    if result is not None:
+        logger.info(f"Serving cached result for {filename} ({doc_type})")
+    else:
         # Parse document
-        logger.info(f"Starting parsing of {file.filename} ({doc_type})")
-        result = await parser(content)
-        
-        # Record success metrics
-        processing_time = time.time() - start_time
-        record_processing_time(doc_type, processing_time)
-        record_document_processed(doc_type, "success")
-        
-        logger.info(f"Successfully parsed {file.filename}")
-        return result
+        async with admission.admit(document.size, doc_type, bounded):
+            logger.info(f"Starting parsing of {filename} ({doc_type})")
+            result = await _run_parser(parser, doc_type, document.path, options)
+        if cache_key is not None:
+            with stage("cache"):
+                await parse_cache.put(cache_key, result)
+    
+    # Record success metrics
+    processing_time = time.time() - start_time
+    record_processing_time(doc_type, processing_time)
+    record_document_processed(doc_type, "success")
+    
+    logger.info(f"Successfully parsed {filename}")
+    return result
 
-    except ParsingError as e:
+def _record_failure(doc_type: str, e: Exception):
+    """Log and count a failed parse."""
+    if isinstance(e, ParsingError):
         logger.error(f"Parsing error: {str(e)}", exc_info=True)
         record_error(doc_type or "unknown", e.__class__.__name__)
-        record_document_processed(doc_type or "unknown", "error")
-        raise HTTPException(
-            status_code=400,
-            detail={
-                "error": str(e),
-                "type": e.__class__.__name__,
-                "document_type": e.document_type,
-                "details": e.details
-            }
-        )
-    except Exception as e:
+    elif isinstance(e, HTTPException):
+        logger.warning(f"Request rejected with {e.status_code}: {e.detail}")
+        detail = e.detail if isinstance(e.detail, dict) else {}
+        record_error(doc_type or "unknown", detail.get("type", f"http_{e.status_code}"))
+    else:
         logger.error(f"Unexpected error: {str(e)}", exc_info=True)
         record_error(doc_type or "unknown", "unexpected")
-        record_document_processed(doc_type or "unknown", "error")
-        raise HTTPException(
-            status_code=500,
-            detail={
-                "error": "An unexpected error occurred",
-                "type": "UnexpectedError",
-                "document_type": doc_type
-            }
+    record_document_processed(doc_type or "unknown", "error")
+
+def _finish_trace(trace: Trace, doc_type: str, error: bool = False):
+    """Record the stage timings and extraction counts of a finished request
+    and export its spans."""
+    trace.finish(error)
+    trace.attributes["document.type"] = doc_type or "unknown"
+    record_trace(doc_type or "unknown", trace)
+    span_exporter.export(trace)
+
+def _unexpected_error(doc_type: str) -> HTTPException:
+    return HTTPException(
+        status_code=500,
+        detail={
+            "error": "An unexpected error occurred",
+            "type": "UnexpectedError",
+            "document_type": doc_type
+        }
+    )
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+async def _stream_parse(
+    document: SpooledDocument,
+    doc_type: str,
+    filename: str,
+    options: ParseOptions,
+    trace: Trace,
+    timings: bool = False
+) -> StreamingResponse:
+    """Parse a spooled document as NDJSON, one line per page, section or slide.
+
+    The first record is produced before the response starts, so admission
+    and open/metadata failures still become regular HTTP errors. Later
+    failures are reported in-band as a final ``{"type": "error"}`` line.
+    With ``timings`` the stream ends with a ``{"type": "timings"}`` line.
+    The response takes ownership of ``document`` and deletes it when done,
+    and finishes ``trace``.
+    """
+    start_time = time.time()
+    record_document_size(doc_type, document.size)
+    try:
+        with stage("admission"):
+            await admission.acquire(document.size, doc_type)
+    except BaseException:
+        document.close()
+        raise
+    admitted = time.time()
+    logger.info(f"Streaming parse of {filename} ({doc_type})")
+
+    records = parse_executor.stream(
+        normalize_records, RECORD_ITERATORS[doc_type](document.path, options), options, document_type=doc_type
+    )
+    try:
+        first = await records.__anext__()
+    except BaseException:
+        await records.aclose()
+        admission.release(document.size, time.time() - admitted)
+        document.close()
+        raise
+
+    async def lines():
+        failed = False
+        try:
+            with trace.stage("serialize"):
+                line = dumps_json(first) + b"\n"
+            yield line
+            async for record in records:
+                with trace.stage("serialize"):
+                    line = dumps_json(record) + b"\n"
+                yield line
+            record_processing_time(doc_type, time.time() - start_time)
+            record_document_processed(doc_type, "success")
+            logger.info(f"Successfully streamed {filename}")
+            if timings:
+                yield dumps_json({"type": "timings", **trace.timings()}) + b"\n"
+        except ParsingError as e:
+            failed = True
+            _record_failure(doc_type, e)
+            yield dumps_json({"type": "error", "detail": e.to_detail()}) + b"\n"
+        except Exception as e:
+            failed = True
+            _record_failure(doc_type, e)
+            yield dumps_json({"type": "error", "detail": _unexpected_error(doc_type).detail}) + b"\n"
+        finally:
+            await records.aclose()
+            admission.release(document.size, time.time() - admitted)
+            document.close()
+            _finish_trace(trace, doc_type, failed)
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+@app.post("/parse")
+async def parse_document(
+    request: Request,
+    file: UploadFile,
+    include_image_content: bool = False,
+    stream: bool = False,
+    fields: Optional[str] = None,
+    pages: Optional[str] = None,
+    slides: Optional[str] = None,
+    normalize: bool = False,
+    timings: bool = False
+):
+    """Parse one document.
+
+    The response format follows the Accept header: JSON by default,
+    ``application/msgpack``, ``application/vnd.apache.arrow.stream``
+    (normalized tables as an Arrow IPC stream, see
+    ``serialization.dumps_arrow``) or ``application/x-ndjson`` to stream.
+
+    Every response carries a ``Server-Timing`` header with the time spent
+    in each stage; ``timings=true`` also adds them to the result as a
+    ``timings`` block (which cannot include its own serialisation).
+    """
+    trace = start_trace("POST /parse")
+    streamed = False
+    failed = False
+    doc_type = None
+    accept = request.headers.get("accept", "")
+    stream = stream or NDJSON_MEDIA_TYPE in accept
+
+    try:
+        response_format = negotiate(accept)
+
+        # e.g. fields=text,metadata to skip table and image extraction
+        # and pages=1-5 (slides=1-5 for decks) to parse only part of a document
+        options = ParseOptions(
+            include_image_content=include_image_content,
+            fields=parse_fields(fields),
+            pages=parse_page_ranges(pages or slides),
+            # Arrow responses carry the normalized tables
+            normalize=normalize or response_format == "arrow"
         )
+
+        # Stream the upload to a temp file, enforcing the size limit as it arrives
+        doc_type = _declared_type(file.content_type, file.filename)
+        with stage("upload"):
+            document = await spool_upload(file, doc_type)
+
+        # Determine document type from its leading bytes rather than the label
+        try:
+            with stage("detect"):
+                doc_type, parser = await asyncio.to_thread(detect_parser, document.path, file.content_type, file.filename)
+        except BaseException:
+            document.close()
+            raise
+        if stream:
+            response = await _stream_parse(document, doc_type, file.filename, options, trace, timings)
+            streamed = True
+            return response
+        with document:
+            result = await _parse_content(document, doc_type, parser, file.filename, options)
+        if timings:
+            result = {**result, "timings": trace.timings()}
+        with stage("serialize"):
+            response = render(result, response_format)
+        response.headers["Server-Timing"] = trace.server_timing()
+        return response
+
+    except ParsingError as e:
+        failed = True
+        _record_failure(doc_type, e)
+        raise HTTPException(status_code=e.status_code, detail=e.to_detail(), headers=e.headers())
+    except HTTPException as e:
+        # e.g. a 406 from negotiate
+        failed = True
+        _record_failure(doc_type, e)
+        raise
+    except Exception as e:
+        failed = True
+        _record_failure(doc_type, e)
+        raise _unexpected_error(doc_type)
+    finally:
+        if not streamed:
+            # A streamed document may still be reading the upload; it is
+            # closed along with the document
+            await file.close()
+            _finish_trace(trace, doc_type, failed)
+
+ZIP_CONTENT_TYPES = ("application/zip", "application/x-zip-compressed")
+
+def _declared_type(content_type: str, filename: str = None) -> Optional[str]:
+    """Document type the client claims, used until the content has been sniffed."""
+    for hint in (content_type, os.path.splitext(filename or "")[1].lstrip(".")):
+        try:
+            return get_parser(hint)[0]
+        except ParsingError:
+            continue
+    return None
+
+def _batch_error(filename: str, doc_type: str, e: Exception, processing_time: float = 0.0) -> dict:
+    _record_failure(doc_type, e)
+    if isinstance(e, ParsingError):
+        status_code, detail = e.status_code, e.to_detail()
+    else:
+        status_code, detail = 500, _unexpected_error(doc_type).detail
+    return {
+        "filename": filename,
+        "document_type": doc_type,
+        "status": "error",
+        "status_code": status_code,
+        "error": detail,
+        "processing_time": processing_time
+    }
+
+async def _parse_batch_entry(
+    filename: str,
+    doc_type: str,
+    document: SpooledDocument,
+    semaphore: asyncio.Semaphore,
+    options: ParseOptions
+) -> dict:
+    """Parse one spooled batch entry once a concurrency slot is free."""
+    async with semaphore:
+        start_time = time.time()
+        trace = start_trace("POST /parse/batch")
+        try:
+            with document:
+                _, parser = get_parser(doc_type)
+                result = await _parse_content(document, doc_type, parser, filename, options, bounded=False)
+        except Exception as e:
+            _finish_trace(trace, doc_type, error=True)
+            return _batch_error(filename, doc_type, e, time.time() - start_time)
+        _finish_trace(trace, doc_type)
+        return {
+            "filename": filename,
+            "document_type": doc_type,
+            "status": "success",
+            "size": document.size,
+            "processing_time": time.time() - start_time,
+            "result": result
+        }
+
+async def _spool_batch_file(file: UploadFile) -> list:
+    """Spool one batch upload, expanding zip archives into their members.
+
+    Returns ``(filename, doc_type, entry)`` tuples where ``entry`` is a
+    ``SpooledDocument`` or, for files rejected up front, an error result.
+    """
+    declared_zip = file.content_type in ZIP_CONTENT_TYPES or (file.filename or "").lower().endswith(".zip")
+    doc_type = "zip" if declared_zip else _declared_type(file.content_type, file.filename)
+    upload = await spool_upload(file, doc_type, config.BATCH_MAX_BYTES if declared_zip else config.MAX_DOCUMENT_BYTES)
+    try:
+        doc_type, _ = await asyncio.to_thread(detect_parser, upload.path, file.content_type, file.filename)
+    except ParsingError:
+        # Not a document we parse; expand it if it is a plain zip archive
+        if not await asyncio.to_thread(zipfile.is_zipfile, upload.path):
+            upload.close()
+            raise
+    else:
+        if upload.size > config.MAX_DOCUMENT_BYTES:
+            upload.close()
+            raise DocumentSizeError(
+                f"Document exceeds size limit of {config.MAX_DOCUMENT_BYTES // (1024 * 1024)}MB",
+                document_type=doc_type,
+                details={"size": upload.size}
+            )
+        return [(file.filename, doc_type, upload)]
+
+    with upload:
+        members = await asyncio.to_thread(extract_archive, upload.path)
+    entries = []
+    for name, member in members:
+        name = f"{file.filename}/{name}"
+        doc_type = member.document_type if isinstance(member, ParsingError) else None
+        try:
+            if isinstance(member, ParsingError):
+                raise member
+            doc_type, _ = await asyncio.to_thread(detect_parser, member.path, None, name)
+        except ParsingError as e:
+            if isinstance(member, SpooledDocument):
+                member.close()
+            member = _batch_error(name, doc_type, e)
+        entries.append((name, doc_type, member))
+    return entries
+
+@app.post("/parse/batch")
+async def parse_batch(
+    files: List[UploadFile] = File(...),
+    include_image_content: bool = False,
+    fields: Optional[str] = None,
+    pages: Optional[str] = None,
+    slides: Optional[str] = None,
+    normalize: bool = False
+):
+    """Parse many documents in one request.
+
+    Zip uploads are expanded into their members. Entries are spooled first,
+    then parsed largest-first with at most ``BATCH_CONCURRENCY`` in flight
+    so big documents do not end up as the tail of the batch. Per-file
+    failures are reported in place and never fail the whole request.
+    """
+    start_time = time.time()
+    try:
+        options = ParseOptions(
+            include_image_content=include_image_content,
+            fields=parse_fields(fields),
+            pages=parse_page_ranges(pages or slides),
+            normalize=normalize
+        )
+    except ParsingError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.to_detail(), headers=e.headers())
+    concurrency = max(1, config.BATCH_CONCURRENCY)
+    entries = []  # (filename, doc_type, SpooledDocument or error result), in upload order
+    tasks = {}
+
+    try:
+        for file in files:
+            try:
+                # The spooled entries close the upload once they are parsed
+                entries.extend(await _spool_batch_file(file))
+            except ParsingError as e:
+                await file.close()
+                entries.append((file.filename, e.document_type, _batch_error(file.filename, e.document_type, e)))
+
+        if len(entries) > config.BATCH_MAX_FILES:
+            e = DocumentSizeError(
+                f"Batch contains more than {config.BATCH_MAX_FILES} files",
+                details={"files": len(entries)}
+            )
+            raise HTTPException(status_code=e.status_code, detail=e.to_detail(), headers=e.headers())
+
+        # Longest-processing-time-first: start the biggest documents first
+        semaphore = asyncio.Semaphore(concurrency)
+        pending = [i for i, (_, _, entry) in enumerate(entries) if isinstance(entry, SpooledDocument)]
+        for i in sorted(pending, key=lambda i: entries[i][2].size, reverse=True):
+            filename, doc_type, document = entries[i]
+            tasks[i] = asyncio.create_task(_parse_batch_entry(filename, doc_type, document, semaphore, options))
+        if tasks:
+            await asyncio.gather(*tasks.values())
+        results = [tasks[i].result() if i in tasks else entry for i, (_, _, entry) in enumerate(entries)]
     finally:
-        await file.close() 
\ No newline at end of file
+        for task in tasks.values():
+            task.cancel()
+        for _, _, entry in entries:
+            if isinstance(entry, SpooledDocument):
+                entry.close()
+
+    succeeded = sum(1 for result in results if result["status"] == "success")
+    return render({
+        "results": results,
+        "summary": {
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "total_bytes": sum(result.get("size", 0) for result in results),
+            "parse_time": sum(result["processing_time"] for result in results),
+            "wall_time": time.time() - start_time,
+            "concurrency": concurrency
+        }
+    })
+
+async def run_parse_job(job: ParseJob) -> dict:
+    """Parse the document behind a queued /parse-document job."""
+    trace = start_trace("parse job")
+    failed = False
+    doc_type = None
+    try:
+        doc_type = _declared_type(job.file_type, job.file_path)
+        with stage("download"):
+            document = await load_document(job.file_path, doc_type)
+        with document:
+            with stage("detect"):
+                doc_type, parser = await asyncio.to_thread(detect_parser, document.path, job.file_type, job.file_path)
+            return await _parse_content(document, doc_type, parser, job.file_path, bounded=False)
+    except Exception as e:
+        failed = True
+        if isinstance(e, ParsingError) and e.document_type is None:
+            e.document_type = doc_type
+        _record_failure(doc_type, e)
+        raise
+    finally:
+        _finish_trace(trace, doc_type, failed)
+
+job_runner = JobRunner(create_job_store(), run_parse_job)
+
+class ParseDocumentRequest(BaseModel):
+    upload_id: str
+    file_path: str
+    file_type: str
+    user_id: Optional[str] = None
+
+@app.post("/parse-document", status_code=202)
+async def parse_document_async(request: ParseDocumentRequest):
+    """Queue a stored upload for parsing and return immediately."""
+    try:
+        get_parser(request.file_type)
+        job = await job_runner.submit(ParseJob(
+            upload_id=request.upload_id,
+            file_path=request.file_path,
+            file_type=request.file_type,
+            user_id=request.user_id
+        ))
+    except ParsingError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.to_detail(), headers=e.headers())
+
+    logger.info(f"Queued parse job for upload {job.upload_id}")
+    return {
+        "status": "processing",
+        "upload_id": job.upload_id,
+        "message": "Document parsing started"
+    }
+
+@app.get("/status/{upload_id}")
+async def get_parse_status(upload_id: str):
+    job = await job_runner.store.get(upload_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown upload_id")
+    return job.status_dict()
+
+@app.get("/result/{upload_id}")
+async def get_parse_result(upload_id: str):
+    job = await job_runner.store.get(upload_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown upload_id")
+    if job.status == JobStatus.FAILED:
+        raise HTTPException(status_code=422, detail=job.error)
+    if job.status != JobStatus.COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Parse job is {job.status.value}")
+    return job.result
@@ -1,6 +1,25 @@
-from prometheus_client import Counter, Histogram, Gauge, Summary
+import glob
+import os
+import re
+from prometheus_client import CollectorRegistry, Counter, Histogram, Gauge, generate_latest, multiprocess
 from typing import Dict, Any
 
+import psutil
+
+import config
+from tracing import Trace, current_trace
+
+# In multiprocess mode every process writes its samples to files in the
+# shared directory and /metrics merges them. Gauges say how: "livesum" adds
+# up the processes still running, "liveall" keeps one series per process
+# (labelled by pid). Counters and histograms are always summed, including
+# what exited processes recorded.
+if config.PROMETHEUS_MULTIPROC_DIR:
+    os.makedirs(config.PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+# Live gauge files of a process, e.g. gauge_livesum_1234.db
+_LIVE_GAUGE_FILE = re.compile(r"gauge_live\w+_(\d+)\.db$")
+
 # Document processing metrics
 DOCUMENTS_PROCESSED = Counter(
     'documents_processed_total',
@@ -25,12 +44,79 @@ DOCUMENT_SIZE = Histogram(
 # Resource utilization metrics
 MEMORY_USAGE = Gauge(
     'parsing_service_memory_bytes',
-    'Current memory usage of the parsing service'
+    'Current memory usage of the parsing service',
+    multiprocess_mode='livesum'
 )
 
 CPU_USAGE = Gauge(
     'parsing_service_cpu_percent',
-    'Current CPU usage percentage of the parsing service'
+    'Current CPU usage percentage of the parsing service',
+    multiprocess_mode='livesum'
+)
+
+PROCESS_MEMORY = Gauge(
+    'parsing_service_process_memory_bytes',
+    'Resident memory of the service process and of its parser workers combined',
+    ['role'],
+    multiprocess_mode='livesum'
+)
+
+PROCESS_CPU = Gauge(
+    'parsing_service_process_cpu_percent',
+    'CPU usage percentage of the service process and of its parser workers combined',
+    ['role'],
+    multiprocess_mode='livesum'
+)
+
+OPEN_FDS = Gauge(
+    'parsing_service_open_fds',
+    'Open file descriptors of the service process and of its parser workers combined',
+    ['role'],
+    multiprocess_mode='livesum'
+)
+
+THREADS = Gauge(
+    'parsing_service_threads',
+    'Threads of the service process and of its parser workers combined',
+    ['role'],
+    multiprocess_mode='livesum'
+)
+
+WORKER_PROCESSES = Gauge(
+    'parser_worker_processes',
+    'Number of live parser worker processes',
+    multiprocess_mode='livesum'
+)
+
+PARSER_POOL_BUSY = Gauge(
+    'parser_pool_busy_workers',
+    'Parser pool workers running a job',
+    multiprocess_mode='livesum'
+)
+
+PARSER_POOL_WORKERS = Gauge(
+    'parser_pool_workers',
+    'Parser pool size',
+    multiprocess_mode='livesum'
+)
+
+PARSER_POOL_UTILIZATION = Gauge(
+    'parser_pool_utilization_ratio',
+    'Fraction of parser pool workers running a job',
+    multiprocess_mode='liveall'
+)
+
+EVENT_LOOP_LAG = Histogram(
+    'event_loop_lag_seconds',
+    'How late the event loop ran a scheduled wake-up',
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+GC_PAUSE_TIME = Histogram(
+    'parsing_service_gc_pause_seconds',
+    'Garbage collection pauses of the service process',
+    ['generation'],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
 )
 
 # Error tracking metrics
@@ -59,11 +145,89 @@ IMAGES_EXTRACTED = Counter(
     ['document_type']
 )
 
+PARAGRAPHS_EXTRACTED = Counter(
+    'paragraphs_extracted_total',
+    'Number of paragraphs extracted from documents',
+    ['document_type']
+)
+
+TEXT_SHAPES_EXTRACTED = Counter(
+    'text_shapes_extracted_total',
+    'Number of text shapes extracted from presentations',
+    ['document_type']
+)
+
+# Extraction metric types reported by the parsers
+EXTRACTION_COUNTERS = {
+    "tables": TABLES_EXTRACTED,
+    "text_chunks": TEXT_CHUNKS_EXTRACTED,
+    "images": IMAGES_EXTRACTED,
+    "paragraphs": PARAGRAPHS_EXTRACTED,
+    "text_shapes": TEXT_SHAPES_EXTRACTED,
+}
+
 # Performance metrics
-EXTRACTION_TIME = Summary(
-    'content_extraction_seconds',
-    'Time spent on content extraction',
-    ['content_type', 'document_type']
+STAGE_TIME = Histogram(
+    'parse_stage_seconds',
+    'Time spent in each stage of a parse request',
+    ['stage', 'document_type'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+
+# Parse result cache metrics
+CACHE_HITS = Counter(
+    'parse_cache_hits_total',
+    'Number of parse requests served from the result cache',
+    ['tier']
+)
+
+CACHE_MISSES = Counter(
+    'parse_cache_misses_total',
+    'Number of parse requests not found in the result cache'
+)
+
+CACHE_EVICTIONS = Counter(
+    'parse_cache_evictions_total',
+    'Number of cached parse results evicted',
+    ['tier']
+)
+
+CACHE_SIZE = Gauge(
+    'parse_cache_bytes',
+    'Bytes of parse results held in the cache (the memory tier is per process, the disk tier shared)',
+    ['tier'],
+    multiprocess_mode='liveall'
+)
+
+# Admission control metrics
+ADMISSION_QUEUE_DEPTH = Gauge(
+    'parse_admission_queue_depth',
+    'Number of parse requests waiting to be admitted',
+    multiprocess_mode='livesum'
+)
+
+ADMISSION_IN_FLIGHT_JOBS = Gauge(
+    'parse_admission_in_flight_jobs',
+    'Number of admitted parses in flight',
+    multiprocess_mode='livesum'
+)
+
+ADMISSION_IN_FLIGHT_BYTES = Gauge(
+    'parse_admission_in_flight_bytes',
+    'Document bytes of the admitted parses in flight',
+    multiprocess_mode='livesum'
+)
+
+ADMISSION_WAIT_TIME = Histogram(
+    'parse_admission_wait_seconds',
+    'Time parse requests waited to be admitted',
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+
+ADMISSION_REJECTIONS = Counter(
+    'parse_admission_rejections_total',
+    'Number of parse requests rejected by admission control',
+    ['reason']
 )
 
 def record_document_processed(doc_type: str, status: str = "success"):
@@ -84,18 +248,130 @@ def record_error(doc_type: str, error_type: str):
 
 def record_extraction_metric(metric_type: str, doc_type: str, count: int = 1):
     """Record content extraction metrics."""
-    if metric_type == "tables":
-        TABLES_EXTRACTED.labels(document_type=doc_type).inc(count)
-    elif metric_type == "text_chunks":
-        TEXT_CHUNKS_EXTRACTED.labels(document_type=doc_type).inc(count)
-    elif metric_type == "images":
-        IMAGES_EXTRACTED.labels(document_type=doc_type).inc(count)
+    counter = EXTRACTION_COUNTERS.get(metric_type)
+    if counter is None:
+        raise ValueError(f"Unknown extraction metric type: {metric_type}")
+    counter.labels(document_type=doc_type).inc(count)
+
+def record_extraction_metrics(doc_type: str, counts: Dict[str, int]):
+    """Record the extraction counts of a whole document at once.
+
+    Parsers tally ``counts`` locally while they walk a document and flush
+    them here once, keeping label lookups out of their inner loops. Under
+    a trace the counts are added to it instead and recorded with the rest
+    of the request by :func:`record_trace`, so parser worker processes
+    never write metrics of their own.
+    """
+    trace = current_trace()
+    for metric_type, count in counts.items():
+        if not count:
+            continue
+        if trace is not None:
+            if metric_type not in EXTRACTION_COUNTERS:
+                raise ValueError(f"Unknown extraction metric type: {metric_type}")
+            trace.count(doc_type, metric_type, count)
+        else:
+            record_extraction_metric(metric_type, doc_type, count)
 
-def record_extraction_time(content_type: str, doc_type: str, duration: float):
-    """Record time spent on specific content extraction."""
-    EXTRACTION_TIME.labels(content_type=content_type, document_type=doc_type).observe(duration)
+def record_stage_times(doc_type: str, stages: Dict[str, float]):
+    """Record the time a parse request spent in each of its stages."""
+    for stage, duration in stages.items():
+        STAGE_TIME.labels(stage=stage, document_type=doc_type).observe(duration)
+
+def record_trace(doc_type: str, trace: Trace):
+    """Record the stage times and extraction counts of a finished request."""
+    record_stage_times(doc_type, {name: seconds for name, (_, seconds) in trace.stages.items()})
+    for (counted_type, metric_type), count in trace.counts.items():
+        record_extraction_metric(metric_type, counted_type, count)
 
 def update_resource_metrics(memory_bytes: float, cpu_percent: float):
     """Update resource utilization metrics."""
     MEMORY_USAGE.set(memory_bytes)
-    CPU_USAGE.set(cpu_percent) 
\ No newline at end of file
+    CPU_USAGE.set(cpu_percent)
+
+def update_process_metrics(role: str, memory_bytes: float, cpu_percent: float, open_fds: int, threads: int):
+    """Update the resource usage of one process role ("main" or "workers")."""
+    PROCESS_MEMORY.labels(role=role).set(memory_bytes)
+    PROCESS_CPU.labels(role=role).set(cpu_percent)
+    OPEN_FDS.labels(role=role).set(open_fds)
+    THREADS.labels(role=role).set(threads)
+
+def update_worker_count(count: int):
+    """Update the number of live parser worker processes."""
+    WORKER_PROCESSES.set(count)
+
+def update_pool_metrics(busy: int, workers: int):
+    """Update how many parser pool workers are running a job."""
+    PARSER_POOL_BUSY.set(busy)
+    PARSER_POOL_WORKERS.set(workers)
+    PARSER_POOL_UTILIZATION.set(busy / workers if workers else 0.0)
+
+def record_loop_lag(lag: float):
+    """Record how late the event loop ran a scheduled wake-up."""
+    EVENT_LOOP_LAG.observe(lag)
+
+def record_gc_pause(generation: int, duration: float):
+    """Record a garbage collection pause."""
+    GC_PAUSE_TIME.labels(generation=str(generation)).observe(duration)
+
+def record_cache_hit(tier: str):
+    """Record a parse result served from the given cache tier."""
+    CACHE_HITS.labels(tier=tier).inc()
+
+def record_cache_miss():
+    """Record a parse result that had to be computed."""
+    CACHE_MISSES.inc()
+
+def record_cache_eviction(tier: str, count: int = 1):
+    """Record parse results evicted from the given cache tier."""
+    CACHE_EVICTIONS.labels(tier=tier).inc(count)
+
+def update_cache_size(tier: str, size_bytes: int):
+    """Update the number of bytes held by a cache tier."""
+    CACHE_SIZE.labels(tier=tier).set(size_bytes)
+
+def update_admission_state(jobs: int, size_bytes: int, waiting: int):
+    """Update the in-flight parses and the admission queue depth."""
+    ADMISSION_IN_FLIGHT_JOBS.set(jobs)
+    ADMISSION_IN_FLIGHT_BYTES.set(size_bytes)
+    ADMISSION_QUEUE_DEPTH.set(waiting)
+
+def record_admission_wait(duration: float):
+    """Record how long a parse request waited to be admitted."""
+    ADMISSION_WAIT_TIME.observe(duration)
+
+def record_admission_rejection(reason: str):
+    """Record a parse request turned away by admission control."""
+    ADMISSION_REJECTIONS.labels(reason=reason).inc()
+
+def render_metrics() -> bytes:
+    """The metrics exposition for /metrics: of every service process in
+    multiprocess mode, of this one otherwise."""
+    if not config.PROMETHEUS_MULTIPROC_DIR:
+        return generate_latest()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=config.PROMETHEUS_MULTIPROC_DIR)
+    return generate_latest(registry)
+
+def cleanup_dead_processes():
+    """Drop the live gauge files of service processes that have exited.
+
+    Without this a worker restarted by uvicorn or gunicorn keeps counting
+    towards "livesum" gauges until the directory is wiped. Counter and
+    histogram files are kept so totals do not go backwards.
+    """
+    if not config.PROMETHEUS_MULTIPROC_DIR:
+        return
+    pids = set()
+    for path in glob.glob(os.path.join(config.PROMETHEUS_MULTIPROC_DIR, "gauge_live*.db")):
+        match = _LIVE_GAUGE_FILE.search(os.path.basename(path))
+        if match:
+            pids.add(int(match.group(1)))
+    for pid in pids:
+        if not psutil.pid_exists(pid):
+            multiprocess.mark_process_dead(pid, config.PROMETHEUS_MULTIPROC_DIR)
+
+def mark_process_exited():
+    """Drop this process's live gauges when it shuts down."""
+    if config.PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid(), config.PROMETHEUS_MULTIPROC_DIR)
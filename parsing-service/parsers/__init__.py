@@ -1,5 +1,137 @@
-from .pdf_parser import parse_pdf
-from .docx_parser import parse_docx
-from .pptx_parser import parse_pptx
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, Optional, Tuple
 
-__all__ = ['parse_pdf', 'parse_docx', 'parse_pptx'] 
\ No newline at end of file
+from loguru import logger
+
+from exceptions import DocumentTypeError
+from .options import FIELDS, ParseOptions, parse_fields, parse_page_ranges
+from .normalize import normalize_tables, normalize_result, normalize_records
+from .pdf_parser import (
+    parse_pdf,
+    parse_pdf_or_plan,
+    iter_pdf,
+    count_pdf_pages,
+    merge_pdf_results,
+    plan_page_ranges,
+    split_page_ranges
+)
+from .docx_parser import parse_docx, iter_docx
+from .pptx_parser import parse_pptx, iter_pptx
+from .sniff import ZIP_SIGNATURE, central_zip_names, local_zip_names, read_head
+
+# Bump whenever parser output changes so cached results are not reused.
+PARSER_VERSION = "3"
+
+
+@dataclass(frozen=True)
+class ParserSpec:
+    """What a registered parser handles and how to recognise its documents."""
+    doc_type: str
+    parse: Callable[..., dict]
+    iterate: Optional[Callable[..., Iterator[dict]]] = None
+    # Substrings of a MIME type or file extension that select this parser
+    keywords: Tuple[str, ...] = ()
+    # Signatures expected within the first KB of the file
+    magic: Tuple[bytes, ...] = ()
+    # Zip member name prefixes identifying an OOXML package of this type
+    zip_prefixes: Tuple[str, ...] = ()
+
+
+PARSERS: Dict[str, ParserSpec] = {}
+
+# Incremental parsers yielding one record per page, section or slide
+RECORD_ITERATORS: Dict[str, Callable[..., Iterator[dict]]] = {}
+
+
+def register_parser(
+    doc_type: str,
+    parse: Callable[..., dict],
+    iterate: Callable[..., Iterator[dict]] = None,
+    keywords: Tuple[str, ...] = (),
+    magic: Tuple[bytes, ...] = (),
+    zip_prefixes: Tuple[str, ...] = ()
+) -> ParserSpec:
+    """Register (or replace) the parser for ``doc_type``."""
+    spec = ParserSpec(doc_type, parse, iterate, keywords or (doc_type,), magic, zip_prefixes)
+    PARSERS[doc_type] = spec
+    if iterate is not None:
+        RECORD_ITERATORS[doc_type] = iterate
+    else:
+        RECORD_ITERATORS.pop(doc_type, None)
+    return spec
+
+
+def get_parser(content_type: str) -> Tuple[str, Callable[..., dict]]:
+    """Return the document type and parser for a MIME type or file extension."""
+    content_type = (content_type or "").lower()
+    for spec in PARSERS.values():
+        if any(keyword in content_type for keyword in spec.keywords):
+            return spec.doc_type, spec.parse
+    raise DocumentTypeError(f"Unsupported document type: {content_type}")
+
+
+def sniff_document_type(path: str) -> Optional[str]:
+    """Recognise a document from its first few KB.
+
+    Magic signatures (``%PDF-``) are looked for in the head of the file.
+    Zips are told apart by their member names: first from the local
+    headers inside the head, then from the central directory at the end
+    of the file, so no member is ever decompressed.
+    """
+    head = read_head(path)
+    for spec in PARSERS.values():
+        if any(signature in head[:1024] for signature in spec.magic):
+            return spec.doc_type
+    if not head.startswith(ZIP_SIGNATURE):
+        return None
+
+    zip_specs = [spec for spec in PARSERS.values() if spec.zip_prefixes]
+    for names in (local_zip_names(head), central_zip_names(path)):
+        for name in names:
+            for spec in zip_specs:
+                if name.startswith(spec.zip_prefixes):
+                    return spec.doc_type
+    return None
+
+
+def detect_parser(path: str, content_type: str = None, filename: str = None) -> Tuple[str, Callable[..., dict]]:
+    """Pick the parser for a file by its content, falling back to the
+    declared content type and then the file extension."""
+    doc_type = sniff_document_type(path)
+    if doc_type is not None:
+        declared = None
+        for hint in (content_type, _extension(filename)):
+            try:
+                declared = get_parser(hint)[0]
+                break
+            except DocumentTypeError:
+                continue
+        if declared is not None and declared != doc_type:
+            logger.warning(f"{filename or path} is declared as {content_type} but looks like {doc_type}")
+        return doc_type, PARSERS[doc_type].parse
+    try:
+        return get_parser(content_type)
+    except DocumentTypeError:
+        if not _extension(filename):
+            raise
+        return get_parser(_extension(filename))
+
+
+def _extension(filename: Optional[str]) -> Optional[str]:
+    if not filename or "." not in filename:
+        return None
+    return filename.rsplit(".", 1)[-1]
+
+
+register_parser("pdf", parse_pdf, iter_pdf, keywords=("pdf",), magic=(b"%PDF-",))
+register_parser("docx", parse_docx, iter_docx, keywords=("wordprocessingml", "docx"), zip_prefixes=("word/",))
+register_parser("pptx", parse_pptx, iter_pptx, keywords=("presentationml", "pptx"), zip_prefixes=("ppt/",))
+
+
+__all__ = [
+    'parse_pdf', 'parse_docx', 'parse_pptx', 'get_parser', 'ParseOptions', 'parse_fields', 'parse_page_ranges', 'FIELDS', 'PARSER_VERSION',
+    'iter_pdf', 'iter_docx', 'iter_pptx', 'RECORD_ITERATORS',
+    'parse_pdf_or_plan', 'count_pdf_pages', 'merge_pdf_results', 'plan_page_ranges', 'split_page_ranges',
+    'ParserSpec', 'PARSERS', 'register_parser', 'sniff_document_type', 'detect_parser',
+    'normalize_tables', 'normalize_result', 'normalize_records'
+]
@@ -1,8 +1,16 @@
 from docx import Document
+from docx.opc.coreprops import CoreProperties
+from docx.opc.parts.coreprops import CorePropertiesPart
+from docx.oxml.ns import qn
+from docx.oxml.parser import parse_xml
+from docx.table import Table
+from docx.text.paragraph import Paragraph
 from loguru import logger
 import io
-import time
-from typing import List, Dict, Any
+from collections import Counter
+from typing import List, Dict, Any, Iterable, Iterator, Union
+
+import config
 
 from exceptions import (
     DocumentCorruptedError,
@@ -10,64 +18,273 @@ from exceptions import (
     TableExtractionError,
     MetadataExtractionError
 )
-from monitoring import record_extraction_metric, record_extraction_time
+from monitoring import record_extraction_metrics
+from tracing import clock, stage
+from .normalize import normalize_result
+from .options import ParseOptions
+from .ooxml import RT_CORE_PROPERTIES, RT_OFFICE_DOCUMENT, OoxmlPackage, count_tags, iter_children
+
+W_BODY = qn("w:body")
+W_P = qn("w:p")
+W_R = qn("w:r")
+W_HYPERLINK = qn("w:hyperlink")
+W_TBL = qn("w:tbl")
+W_TR = qn("w:tr")
+W_TC = qn("w:tc")
+W_SECTPR = qn("w:sectPr")
+W_VAL = qn("w:val")
+W_TYPE = qn("w:type")
+
+# Run children that carry text, mapped the way python-docx maps them
+_RUN_TEXT = {
+    qn("w:tab"): "\t",
+    qn("w:ptab"): "\t",
+    qn("w:cr"): "\n",
+    qn("w:noBreakHyphen"): "-",
+}
+
+def _table_rows(table: Table) -> List[List[str]]:
+    """Non-empty rows of a table as lists of stripped cell text."""
+    table_data = []
+    for row in table.rows:
+        row_data = [cell.text.strip() for cell in row.cells]
+        if any(row_data):  # Skip empty rows
+            table_data.append(row_data)
+    return table_data
+
+class _PythonDocxReader:
+    """Reads a DOCX through the full python-docx object model."""
+
+    def __init__(self, source: Union[str, bytes]):
+        self._stream = None if isinstance(source, str) else io.BytesIO(source)
+        self._doc = Document(source if self._stream is None else self._stream)
+
+    def core_properties(self):
+        return self._doc.core_properties
+
+    def section_count(self) -> int:
+        return len(self._doc.sections)
+
+    def body(self) -> Iterable:
+        return self._doc.element.body.iterchildren()
+
+    def paragraph_text(self, element) -> str:
+        return Paragraph(element, self._doc._body).text
+
+    def table_rows(self, element) -> List[List[str]]:
+        return _table_rows(Table(element, self._doc._body))
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+
+class _OoxmlDocxReader:
+    """Streams ``word/document.xml`` straight out of the zip.
+
+    Body paragraphs and tables are parsed one at a time with lxml's
+    incremental parser and their text read off the XML directly, mirroring
+    python-docx's rules for runs, hyperlinks and merged cells, so output is
+    identical without building the document object model.
+    """
+
+    def __init__(self, source: Union[str, bytes]):
+        self._package = OoxmlPackage(source)
+        self._main_part = self._package.related_one(RT_OFFICE_DOCUMENT) or "word/document.xml"
+        self._stream = None
+
+    def core_properties(self):
+        partname = self._package.related_one(RT_CORE_PROPERTIES)
+        if partname is None or not self._package.has_part(partname):
+            # python-docx substitutes default properties in this case
+            return CorePropertiesPart.default(None).core_properties
+        return CoreProperties(parse_xml(self._package.read(partname)))
+
+    def section_count(self) -> int:
+        # Every section ends in a w:sectPr; the ones nested in tracked
+        # w:sectPrChange revisions are not sections of their own
+        with self._package.open(self._main_part) as stream:
+            tags = count_tags(stream, "sectPr", "sectPrChange")
+        return tags["sectPr"] - tags["sectPrChange"]
+
+    def body(self) -> Iterable:
+        self._stream = self._package.open(self._main_part)
+        return iter_children(self._stream, W_BODY)
+
+    def paragraph_text(self, element) -> str:
+        parts = []
+        for child in element:
+            if child.tag == W_R:
+                _append_run_text(child, parts)
+            elif child.tag == W_HYPERLINK:
+                for run in child.iterchildren(W_R):
+                    _append_run_text(run, parts)
+        return "".join(parts)
+
+    def table_rows(self, element) -> List[List[str]]:
+        rows = list(element.iterchildren(W_TR))
+        cell_text = {}
+        table_data = []
+        for row_index, row in enumerate(rows):
+            row_data = []
+            for cell in row.iterchildren(W_TC):
+                row_data.extend(self._grid_cells(rows, row_index, cell, cell_text))
+            row_data = [text.strip() for text in row_data]
+            if any(row_data):  # Skip empty rows
+                table_data.append(row_data)
+        return table_data
+
+    def _grid_cells(self, rows, row_index: int, cell, cell_text: dict) -> List[str]:
+        """Text of ``cell`` once for every grid column it spans; vertically
+        merged continuation cells repeat the text of the cell that starts
+        the merge, as python-docx's ``row.cells`` does."""
+        properties = cell.find(qn("w:tcPr"))
+        vmerge = properties.find(qn("w:vMerge")) if properties is not None else None
+        if vmerge is not None and vmerge.get(W_VAL, "continue") == "continue":
+            if row_index == 0:
+                raise ValueError("no tr above topmost tr in w:tbl")
+            above = _cell_at_grid_offset(rows[row_index - 1], _grid_offset(rows[row_index], cell))
+            return self._grid_cells(rows, row_index - 1, above, cell_text)
+        if cell not in cell_text:
+            cell_text[cell] = "\n".join(self.paragraph_text(p) for p in cell.iterchildren(W_P))
+        return [cell_text[cell]] * _grid_span(cell)
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+        self._package.close()
+
+def _append_run_text(run, parts: List[str]):
+    for child in run:
+        if child.tag == qn("w:t"):
+            parts.append(child.text or "")
+        elif child.tag == qn("w:br"):
+            # Page and column breaks have no text equivalent
+            parts.append("\n" if child.get(W_TYPE, "textWrapping") == "textWrapping" else "")
+        else:
+            parts.append(_RUN_TEXT.get(child.tag, ""))
 
-async def parse_docx(file_content: bytes) -> dict:
-    """Parse DOCX file content and return structured data."""
+def _grid_span(cell) -> int:
+    span = cell.find(f"{qn('w:tcPr')}/{qn('w:gridSpan')}")
+    return int(span.get(W_VAL)) if span is not None else 1
+
+def _grid_before(row) -> int:
+    before = row.find(f"{qn('w:trPr')}/{qn('w:gridBefore')}")
+    return int(before.get(W_VAL)) if before is not None else 0
+
+def _grid_offset(row, cell) -> int:
+    offset = _grid_before(row)
+    for sibling in row.iterchildren(W_TC):
+        if sibling is cell:
+            return offset
+        offset += _grid_span(sibling)
+    raise ValueError("cell is not in row")
+
+def _cell_at_grid_offset(row, grid_offset: int):
+    remaining = grid_offset - _grid_before(row)
+    for cell in row.iterchildren(W_TC):
+        if remaining < 0:
+            break
+        if remaining == 0:
+            return cell
+        remaining -= _grid_span(cell)
+    raise ValueError(f"no `tc` element at grid_offset={grid_offset}")
+
+def _open_reader(source: Union[str, bytes]):
+    if config.DOCX_ENGINE == "ooxml":
+        return _OoxmlDocxReader(source)
+    return _PythonDocxReader(source)
+
+def _new_section(number: int, options: ParseOptions) -> dict:
+    section = {"type": "section", "section": number}
+    if options.wants("text"):
+        section["paragraphs"] = []
+    if options.wants("tables"):
+        section["tables"] = []
+    return section
+
+def iter_docx(source: Union[str, bytes], options: ParseOptions = None) -> Iterator[dict]:
+    """Parse a DOCX incrementally, yielding one record at a time.
+
+    The first record is ``{"type": "document", ...}`` with the metadata
+    and section count, followed by one ``{"type": "section", ...}`` record
+    per document section with its body paragraphs and tables. Sections
+    not selected by ``options.fields`` are left out and never extracted.
+    """
+    options = options or ParseOptions()
+    want_text = options.wants("text")
+    want_tables = options.wants("tables")
+    counts = Counter()  # flushed to Prometheus once per document
     try:
-        # Create document from bytes
-        doc_stream = io.BytesIO(file_content)
-        doc = Document(doc_stream)
+        # Open from the spooled file when we have one
+        with stage("open"):
+            reader = _open_reader(source)
         
+        document = {"type": "document", "content_type": "docx"}
+
         # Extract metadata
-        metadata_start = time.time()
-        try:
-            core_properties = doc.core_properties
-            metadata = {
-                "title": core_properties.title or "",
-                "author": core_properties.author or "",
-                "subject": core_properties.subject or "",
-                "keywords": core_properties.keywords or "",
-                "created": core_properties.created.isoformat() if core_properties.created else "",
-                "modified": core_properties.modified.isoformat() if core_properties.modified else "",
-            }
-            record_extraction_time("metadata", "docx", time.time() - metadata_start)
-        except Exception as e:
-            logger.error(f"Failed to extract DOCX metadata: {str(e)}")
-            raise MetadataExtractionError(
-                "Failed to extract DOCX metadata",
-                document_type="docx",
-                details={"error": str(e)}
-            )
-        
-        # Extract text and tables
-        text_content = []
-        tables = []
+        if options.wants("metadata"):
+            try:
+                with stage("metadata"):
+                    core_properties = reader.core_properties()
+                document["metadata"] = {
+                    "title": core_properties.title or "",
+                    "author": core_properties.author or "",
+                    "subject": core_properties.subject or "",
+                    "keywords": core_properties.keywords or "",
+                    "created": core_properties.created.isoformat() if core_properties.created else "",
+                    "modified": core_properties.modified.isoformat() if core_properties.modified else "",
+                }
+            except Exception as e:
+                logger.error(f"Failed to extract DOCX metadata: {str(e)}")
+                raise MetadataExtractionError(
+                    "Failed to extract DOCX metadata",
+                    document_type="docx",
+                    details={"error": str(e)}
+                )
+
+        with stage("open"):
+            document["sections"] = reader.section_count()
+        yield document
         
-        text_start = time.time()
+        # Extract text and tables, section by section in body order
+        timer = clock()
         try:
-            # Extract paragraphs
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    text_content.append(paragraph.text)
-                    record_extraction_metric("paragraphs", "docx")
-            
-            # Extract tables
-            for table in doc.tables:
-                table_data = []
-                try:
-                    for row in table.rows:
-                        row_data = [cell.text.strip() for cell in row.cells]
-                        if any(row_data):  # Skip empty rows
-                            table_data.append(row_data)
-                    if table_data:
-                        tables.append(table_data)
-                        record_extraction_metric("tables", "docx")
-                except Exception as e:
-                    logger.warning(f"Failed to extract table: {str(e)}")
-                    continue
-            
-            record_extraction_time("text", "docx", time.time() - text_start)
+            section = _new_section(1, options)
+            timer.enter("text")
+            for element in reader.body():
+                if element.tag == W_P:
+                    timer.enter("text")
+                    if want_text:
+                        text = reader.paragraph_text(element)
+                        if text.strip():
+                            section["paragraphs"].append(text)
+                            counts["paragraphs"] += 1
+                    # A paragraph carrying w:sectPr is the last one of its section
+                    ends_section = element.find(f"{qn('w:pPr')}/{W_SECTPR}") is not None
+                elif element.tag == W_TBL:
+                    ends_section = False
+                    if not want_tables:
+                        continue
+                    timer.enter("tables")
+                    try:
+                        table_data = reader.table_rows(element)
+                        if table_data:
+                            section["tables"].append(table_data)
+                            counts["tables"] += 1
+                    except Exception as e:
+                        logger.warning(f"Failed to extract table: {str(e)}")
+                else:
+                    ends_section = element.tag == W_SECTPR
+
+                if ends_section:
+                    timer.pause()
+                    yield section
+                    section = _new_section(section["section"] + 1, options)
+                    timer.enter("text")
+
+            timer.pause()
+            if section.get("paragraphs") or section.get("tables"):
+                yield section
             
         except Exception as e:
             logger.error(f"Failed to extract DOCX content: {str(e)}")
@@ -77,14 +294,6 @@ async def parse_docx(file_content: bytes) -> dict:
                 details={"error": str(e)}
             )
         
-        return {
-            "content_type": "docx",
-            "metadata": metadata,
-            "text": "\n".join(text_content),
-            "tables": tables,
-            "sections": len(doc.sections)
-        }
-        
     except (TextExtractionError, MetadataExtractionError) as e:
         raise e
     except Exception as e:
@@ -95,5 +304,26 @@ async def parse_docx(file_content: bytes) -> dict:
             details={"error": str(e)}
         )
     finally:
-        if 'doc_stream' in locals():
-            doc_stream.close() 
\ No newline at end of file
+        record_extraction_metrics("docx", counts)
+        if 'reader' in locals():
+            reader.close()
+
+def parse_docx(source: Union[str, bytes], options: ParseOptions = None) -> dict:
+    """Parse a DOCX, given as a file path or bytes, and return structured data."""
+    options = options or ParseOptions()
+    records = iter_docx(source, options)
+    document = next(records)
+
+    text_content = []
+    tables = []
+    for record in records:
+        text_content.extend(record.get("paragraphs", ()))
+        tables.extend(record.get("tables", ()))
+
+    return normalize_result(options.select({
+        "content_type": "docx",
+        "metadata": document.get("metadata"),
+        "text": "\n".join(text_content),
+        "tables": tables,
+        "sections": document["sections"]
+    }), options)
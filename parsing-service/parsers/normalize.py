@@ -0,0 +1,217 @@
+import re
+from typing import Iterator, List
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from exceptions import NormalizationError
+from tracing import stage
+from .options import ParseOptions
+
+# Financial cells such as "1,234", "$1.2M", "(2.5%)", "-€40k", "3.1x"
+_NUMBER_PATTERN = r"""^
+    (?P<open>\()?\s*
+    (?P<sign>[-+−])?\s*
+    (?P<currency>[$€£¥])?\s*
+    (?P<sign2>[-−])?\s*
+    (?P<number>\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?|\.\d+)\s*
+    (?P<scale>bn|mm|mn|[kmbt])?\s*
+    (?P<suffix>[%x])?\s*
+    (?P<close>\))?
+$"""
+
+_SCALE_EXPONENT = {"k": 3, "m": 6, "mm": 6, "mn": 6, "b": 9, "bn": 9, "t": 12}
+
+_CURRENCY_CODES = {"$": "USD", "€": "EUR", "£": "GBP", "¥": "JPY"}
+
+# Placeholder cells meaning "no value"
+_NULL_TOKENS = ["", "-", "--", "–", "—", "n/a", "na", "nm", "n.m.", "none", "null"]
+
+# Leading rows considered as header rows, at most
+MAX_HEADER_ROWS = 3
+
+
+def _parse_cells(cells: pd.Series) -> pd.DataFrame:
+    """Parse a flat series of cells in one vectorised pass.
+
+    Returns the stripped ``text``, the numeric ``value`` (NaN where the
+    cell is not a number), ``null`` for blank or placeholder cells,
+    ``year`` for bare four-digit years (header labels more often than
+    values), and the ``currency`` symbol and ``suffix`` (``%`` or ``x``)
+    of numeric cells, empty otherwise. Percentages become fractions and
+    ``K``/``M``/``B``/``T`` scales are applied, so "$1.2M" is 1200000.0
+    and "(2.5%)" is -0.025.
+    """
+    text = cells.str.strip()
+    parts = text.str.extract(_NUMBER_PATTERN, flags=re.X | re.I)
+    parsed = parts["number"].notna() & (parts["open"].isna() == parts["close"].isna())
+    negative = parts["open"].notna() | parts["sign"].isin(["-", "−"]) | parts["sign2"].notna()
+
+    # Shift the decimal exponent instead of multiplying, so "1.1M" is
+    # exactly 1100000.0 and "4.1%" exactly 0.041
+    suffix = parts["suffix"].str.lower().where(parsed).fillna("")
+    exponent = parts["scale"].str.lower().map(_SCALE_EXPONENT).fillna(0).astype(int)
+    exponent -= np.where(suffix == "%", 2, 0)
+    # Object dtype throughout: with pyarrow installed, newer pandas makes
+    # astype(str) an Arrow string column that cannot be added to the
+    # all-NaN number column of a table without numbers
+    literal = parts["number"].str.replace(",", "", regex=False) + "e" + exponent.astype(str).astype(object)
+    value = pd.to_numeric(literal.where(parsed), errors="coerce")
+    value = value.where(~negative, -value)
+
+    plain = parts[["open", "sign", "currency", "sign2", "scale", "suffix"]].isna().all(axis=1)
+    return pd.DataFrame({
+        "text": text,
+        "value": value,
+        "null": text.str.lower().isin(_NULL_TOKENS),
+        "year": parsed & plain & parts["number"].str.fullmatch(r"(?:19|20)\d\d", na=False),
+        "currency": parts["currency"].where(parsed).fillna(""),
+        "suffix": suffix,
+    })
+
+
+def _header_row_count(value: np.ndarray, year: np.ndarray) -> int:
+    """Leading rows holding only labels (text or bare years) are headers.
+
+    A table with no numbers below its leading label rows is a text table,
+    and only its first row is taken as the header.
+    """
+    label_rows = (np.isnan(value) | year).all(axis=1)
+    limit = min(MAX_HEADER_ROWS, len(value) - 1)
+    count = 0
+    while count < limit and label_rows[count]:
+        count += 1
+    if count and label_rows[count:].all():
+        count = 1
+    return count
+
+
+def _column_names(header: np.ndarray) -> List[str]:
+    """One name per column from its header cells, unique and never empty."""
+    names = []
+    seen = {}
+    for index in range(header.shape[1]):
+        name = " ".join(cell for cell in header[:, index] if cell) or f"column_{index + 1}"
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+    return names
+
+
+def _column_type(suffix: np.ndarray, currency: np.ndarray):
+    """Type and unit of a numeric column from the markers on its values."""
+    suffixes = set(suffix)
+    if suffixes == {"%"}:
+        return "percent", None
+    if suffixes == {"x"}:
+        return "multiple", None
+    symbols = set(currency) - {""}
+    if suffixes == {""} and symbols:
+        return "currency", _CURRENCY_CODES[symbols.pop()] if len(symbols) == 1 else None
+    return "number", None
+
+
+def _frame(cells: dict, row_count: int) -> dict:
+    """Column-oriented frame of one table from its parsed cells (arrays in
+    row-major order)."""
+    grid = {name: column.reshape(row_count, -1) for name, column in cells.items()}
+    value = grid["value"]
+    header_rows = _header_row_count(value, grid["year"])
+
+    body = slice(header_rows, None)
+    types, units, data = [], [], []
+    for index in range(value.shape[1]):
+        column_value = value[body, index]
+        numeric = ~np.isnan(column_value)
+        if numeric.any() and (numeric | grid["null"][body, index]).all():
+            kind, unit = _column_type(grid["suffix"][body, index][numeric], grid["currency"][body, index][numeric])
+            column = [float(number) if ok else None for number, ok in zip(column_value, numeric)]
+        else:
+            kind, unit = "text", None
+            column = [cell or None for cell in grid["text"][body, index]]
+        types.append(kind)
+        units.append(unit)
+        data.append(column)
+
+    return {
+        "header_rows": header_rows,
+        "columns": _column_names(grid["text"][:header_rows]),
+        "types": types,
+        "units": units,
+        "data": data
+    }
+
+
+def normalize_tables(tables: list) -> List[dict]:
+    """Typed, column-oriented frames for ``tables``, one per table and in
+    the same order.
+
+    Each frame holds ``columns`` (names taken from the detected header
+    rows), per-column ``types`` (``number``, ``currency``, ``percent``,
+    ``multiple`` or ``text``) and ``units`` (ISO currency codes), and
+    ``data`` as one list of values per column. PDF frames also carry the
+    table's ``page``. The cells of all tables are parsed together, so a
+    document costs one vectorised pass however many tables it has.
+    """
+    grids = []
+    for table in tables:
+        rows = table["rows"] if isinstance(table, dict) else table
+        width = max((len(row) for row in rows), default=0)
+        grids.append([list(row) + [""] * (width - len(row)) for row in rows])
+
+    cells = pd.Series([cell for grid in grids for row in grid for cell in row], dtype=object)
+    parsed = {}
+    if len(cells):
+        parsed = {name: column.to_numpy() for name, column in _parse_cells(cells).items()}
+        parsed["value"] = parsed["value"].astype(float)
+
+    frames = []
+    offset = 0
+    for table, grid in zip(tables, grids):
+        size = sum(len(row) for row in grid)
+        if size:
+            frame = _frame({name: column[offset:offset + size] for name, column in parsed.items()}, len(grid))
+        else:
+            frame = {"header_rows": 0, "columns": [], "types": [], "units": [], "data": []}
+        offset += size
+        if isinstance(table, dict) and "page" in table:
+            frame = {"page": table["page"], **frame}
+        frames.append(frame)
+    return frames
+
+
+def _normalize(tables: list, document_type: str = None) -> List[dict]:
+    try:
+        with stage("normalize"):
+            return normalize_tables(tables)
+    except Exception as e:
+        logger.error(f"Failed to normalize tables: {str(e)}")
+        raise NormalizationError(
+            "Failed to normalize tables",
+            document_type=document_type,
+            details={"error": str(e)}
+        )
+
+
+def normalize_result(result: dict, options: ParseOptions) -> dict:
+    """Add ``normalized_tables`` to a parse result when requested."""
+    if options.normalize and "tables" in result:
+        result["normalized_tables"] = _normalize(result["tables"], result.get("content_type"))
+    return result
+
+
+def normalize_records(records: Iterator[dict], options: ParseOptions) -> Iterator[dict]:
+    """Normalize the tables of streamed records as they pass through.
+
+    Records listing ``tables`` get ``normalized_tables``; table shapes of
+    PPTX slide records get a ``normalized`` frame next to their content.
+    """
+    for record in records:
+        if options.normalize:
+            if "tables" in record:
+                record["normalized_tables"] = _normalize(record["tables"], record.get("content_type"))
+            else:
+                shapes = [shape for shape in record.get("shapes", ()) if shape["type"] == "table"]
+                for shape, frame in zip(shapes, _normalize([shape["content"] for shape in shapes], "pptx")):
+                    shape["normalized"] = frame
+        yield record
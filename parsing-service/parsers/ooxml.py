@@ -0,0 +1,135 @@
+import io
+import posixpath
+import re
+import zipfile
+from collections import Counter
+from typing import IO, Iterator, List, Optional, Union
+
+from lxml import etree
+
+# Relationship types are matched on their last path segment so both the
+# transitional and the strict OOXML namespaces resolve
+RT_OFFICE_DOCUMENT = "officeDocument"
+RT_CORE_PROPERTIES = "core-properties"
+RT_SLIDE = "slide"
+RT_NOTES_SLIDE = "notesSlide"
+RT_SLIDE_LAYOUT = "slideLayout"
+RT_SLIDE_MASTER = "slideMaster"
+
+_RELS_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+_PARSER = etree.XMLParser(resolve_entities=False, no_network=True, huge_tree=True)
+
+
+def parse_part(data: bytes) -> etree._Element:
+    """Parse a whole (small) part, such as a relationships or properties part."""
+    return etree.fromstring(data, _PARSER)
+
+
+class OoxmlPackage:
+    """Read-only access to the parts of an OOXML (zip) package.
+
+    Unlike python-docx/python-pptx nothing is loaded up front: parts are
+    opened one at a time as streams and the caller decides how much of
+    each to parse.
+    """
+
+    def __init__(self, source: Union[str, bytes]):
+        self._zip = zipfile.ZipFile(source if isinstance(source, str) else io.BytesIO(source))
+        self._rels = {}
+
+    def close(self):
+        self._zip.close()
+
+    def open(self, partname: str) -> IO[bytes]:
+        """Stream the (decompressed) bytes of a part."""
+        return self._zip.open(partname)
+
+    def read(self, partname: str) -> bytes:
+        return self._zip.read(partname)
+
+    def has_part(self, partname: str) -> bool:
+        try:
+            self._zip.getinfo(partname)
+            return True
+        except KeyError:
+            return False
+
+    def related(self, rel_type: str, partname: str = "") -> List[str]:
+        """Names of the parts ``partname`` (the package itself by default)
+        relates to with ``rel_type``, in relationship file order."""
+        return [target for kind, target in self._relationships(partname) if kind == rel_type]
+
+    def related_one(self, rel_type: str, partname: str = "") -> Optional[str]:
+        targets = self.related(rel_type, partname)
+        return targets[0] if targets else None
+
+    def rel_targets(self, partname: str = "") -> dict:
+        """Relationship id -> target part name for ``partname``."""
+        return self._load_rels(partname)[1]
+
+    def _relationships(self, partname: str):
+        return self._load_rels(partname)[0]
+
+    def _load_rels(self, partname: str):
+        if partname in self._rels:
+            return self._rels[partname]
+        directory, filename = posixpath.split(partname)
+        rels_name = posixpath.join(directory, "_rels", f"{filename}.rels")
+        relationships = []
+        by_id = {}
+        if self.has_part(rels_name):
+            root = parse_part(self.read(rels_name))
+            for rel in root.iter(f"{_RELS_NS}Relationship"):
+                if rel.get("TargetMode") == "External":
+                    continue
+                target = rel.get("Target", "")
+                if target.startswith("/"):
+                    target = target[1:]
+                else:
+                    target = posixpath.normpath(posixpath.join(directory, target))
+                kind = rel.get("Type", "").rsplit("/", 1)[-1]
+                relationships.append((kind, target))
+                by_id[rel.get("Id")] = target
+        self._rels[partname] = (relationships, by_id)
+        return self._rels[partname]
+
+
+def iter_children(stream: IO[bytes], parent_tag: str) -> Iterator[etree._Element]:
+    """Yield each complete child element of the first ``parent_tag`` element.
+
+    Children are parsed incrementally and discarded once the caller moves
+    on, so memory stays proportional to the largest single child (one
+    paragraph or table) rather than the whole part.
+    """
+    events = etree.iterparse(stream, events=("end",), huge_tree=True, resolve_entities=False, no_network=True)
+    for _, element in events:
+        if element.tag == parent_tag:
+            return
+        parent = element.getparent()
+        if parent is not None and parent.tag == parent_tag:
+            yield element
+            # Drop this and any earlier siblings that are fully processed
+            element.clear()
+            while element.getprevious() is not None:
+                del parent[0]
+
+
+def count_tags(stream: IO[bytes], *local_names: str, chunk_size: int = 1024 * 1024) -> Counter:
+    """Count start tags with the given local names (any prefix) in an XML stream.
+
+    A byte-level scan, far cheaper than parsing the document.
+    """
+    names = b"|".join(re.escape(name.encode()) for name in local_names)
+    pattern = re.compile(rb"<(?:[A-Za-z_][\w.-]*:)?(" + names + rb")[\s/>]")
+    counts = Counter()
+    tail = b""
+    overlap = max(len(name) for name in local_names) + 256
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        data = tail + chunk
+        for match in pattern.finditer(data):
+            # Matches lying wholly inside the carried-over tail were counted already
+            if match.end() > len(tail):
+                counts[match.group(1).decode()] += 1
+        tail = data[-overlap:]
+    return counts
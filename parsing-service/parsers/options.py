@@ -0,0 +1,95 @@
+from dataclasses import asdict, dataclass
+from typing import FrozenSet, Iterator, Optional, Tuple
+
+from exceptions import ParsingError
+
+# Result sections a caller can select with ``fields``; everything else in a
+# result (content type, page/section/slide counts) is always returned.
+FIELDS = ("metadata", "text", "tables", "images", "slides")
+
+
+def parse_fields(value: Optional[str]) -> Optional[FrozenSet[str]]:
+    """Parse a ``fields=text,metadata`` selector; empty means every field."""
+    if not value:
+        return None
+    fields = frozenset(field.strip().lower() for field in value.split(",") if field.strip())
+    unknown = fields - set(FIELDS)
+    if unknown:
+        raise ParsingError(
+            f"Unknown fields: {', '.join(sorted(unknown))}",
+            details={"allowed": list(FIELDS)}
+        )
+    return fields or None
+
+
+def parse_page_ranges(value: Optional[str]) -> Optional[Tuple[Tuple[int, Optional[int]], ...]]:
+    """Parse a 1-based ``pages=1-5,9,12-`` selector into zero-based
+    ``(start, stop)`` ranges; ``stop`` is None for an open-ended range."""
+    if not value:
+        return None
+    ranges = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        try:
+            start = int(first)
+            stop = int(last) if last.strip() else None if "-" in part else start
+        except ValueError:
+            start = stop = 0
+        if start < 1 or (stop is not None and stop < start):
+            raise ParsingError(
+                f"Invalid page range: {part}",
+                details={"expected": "comma-separated 1-based pages or ranges, e.g. 1-5,9,12-"}
+            )
+        ranges.append((start - 1, stop))
+    return tuple(sorted(ranges, key=lambda r: r[0])) or None
+
+
+@dataclass(frozen=True)
+class ParseOptions:
+    """Per-request switches honoured by the parsers."""
+
+    # Embed the encoded bytes of each distinct PDF image in the result
+    include_image_content: bool = False
+
+    # Result sections to extract; None extracts all of them
+    fields: Optional[FrozenSet[str]] = None
+
+    # Zero-based (start, stop) page or slide ranges to extract; None for all
+    pages: Optional[Tuple[Tuple[int, Optional[int]], ...]] = None
+
+    # Add typed, column-oriented frames of the tables as ``normalized_tables``
+    normalize: bool = False
+
+    def wants(self, field: str) -> bool:
+        """Whether the ``field`` section should be extracted."""
+        return self.fields is None or field in self.fields
+
+    def page_indices(self, total: int, start: int = 0, stop: int = None) -> Iterator[int]:
+        """Selected zero-based page indices in ``[start, stop)``, in order."""
+        stop = total if stop is None else min(stop, total)
+        if self.pages is None:
+            yield from range(start, stop)
+            return
+        previous = start - 1
+        for range_start, range_stop in self.pages:
+            range_stop = stop if range_stop is None else min(range_stop, stop)
+            for index in range(max(range_start, previous + 1), range_stop):
+                yield index
+                previous = index
+
+    def select(self, result: dict) -> dict:
+        """Drop the sections of ``result`` the caller did not ask for."""
+        if self.fields is None:
+            return result
+        return {key: value for key, value in result.items() if key not in FIELDS or key in self.fields}
+
+    def cache_token(self) -> str:
+        """Stable string identifying options that change parser output."""
+        values = {
+            name: ",".join(sorted(value)) if isinstance(value, frozenset) else value
+            for name, value in asdict(self).items()
+        }
+        return ",".join(f"{name}={value}" for name, value in sorted(values.items()))
@@ -1,8 +1,11 @@
 import fitz  # PyMuPDF
 from loguru import logger
-import io
-import time
-from typing import List, Dict, Any
+import base64
+import mmap
+from collections import Counter
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
+
+import config
 
 from exceptions import (
     DocumentCorruptedError,
@@ -10,77 +13,241 @@ from exceptions import (
     TableExtractionError,
     MetadataExtractionError
 )
-from monitoring import record_extraction_metric, record_extraction_time
+from monitoring import record_extraction_metrics
+from tracing import clock, stage
+from .normalize import normalize_result
+from .options import ParseOptions
+from .pdf_tables import find_tables
+
+# Image formats that extract_image() returns unchanged; MuPDF re-encodes
+# every other filter (Flate, LZW, RunLength, CCITT, unfiltered) as PNG.
+_IMAGE_FORMATS = {
+    "DCTDecode": "jpeg",
+    "JPXDecode": "jpx",
+    "JBIG2Decode": "jb2",
+}
+
+def _open_document(source: Union[str, bytes]) -> Tuple[fitz.Document, Optional[memoryview]]:
+    """Open a PDF without copying it into Python memory.
+
+    Paths are opened by MuPDF directly, or in ``mmap`` mode through a
+    read-only mapping so pages are faulted in lazily and concurrent parses
+    of the same file share the OS page cache. Bytes are handed over as-is.
+    """
+    if not isinstance(source, str):
+        return fitz.open(stream=source, filetype="pdf"), None
+    if config.PDF_OPEN_MODE != "mmap":
+        return fitz.open(source, filetype="pdf"), None
+
+    with open(source, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapping)
+    try:
+        return fitz.open(stream=view, filetype="pdf"), view
+    except TypeError:
+        # Older PyMuPDF releases only accept bytes streams
+        _release(view)
+        logger.warning("PyMuPDF cannot open memoryview streams, falling back to file mode")
+        return fitz.open(source, filetype="pdf"), None
+    except Exception:
+        _release(view)
+        raise
+
+def _release(view: memoryview):
+    """Unmap the buffer behind an mmap-opened document."""
+    mapping = view.obj
+    view.release()
+    mapping.close()
+
+def _extract_page_text(page: fitz.Page) -> Tuple[str, fitz.TextPage]:
+    """Lay out a page once and return its plain text and the text page.
+
+    The text page is kept so table detection reads the page's words from
+    the same layout instead of running a second pass.
+    """
+    textpage = page.get_textpage(flags=fitz.TEXTFLAGS_TEXT)
+    return textpage.extractText(), textpage
+
+def _image_info(img: tuple) -> dict:
+    """Image dimensions and format read from an xref's object dictionary.
+
+    ``img`` is an entry of ``page.get_images(full=True)``; nothing here
+    touches, let alone decompresses, the image stream itself.
+    """
+    return {
+        "width": img[2],
+        "height": img[3],
+        "format": _IMAGE_FORMATS.get(img[8], "png")
+    }
 
-async def parse_pdf(file_content: bytes) -> dict:
-    """Parse PDF file content and return structured data."""
+def count_pdf_pages(source: Union[str, bytes]) -> int:
+    """Page count of a PDF, without extracting any content."""
     try:
-        # Create PDF document from bytes
-        pdf_stream = io.BytesIO(file_content)
-        doc = fitz.open(stream=pdf_stream, filetype="pdf")
+        with stage("open"):
+            doc, view = _open_document(source)
+    except Exception as e:
+        logger.error(f"Failed to open PDF: {str(e)}")
+        raise DocumentCorruptedError(
+            "Failed to parse PDF document",
+            document_type="pdf",
+            details={"error": str(e)}
+        )
+    try:
+        return len(doc)
+    finally:
+        doc.close()
+        if view is not None:
+            _release(view)
+
+def split_page_ranges(page_count: int, parts: int) -> List[Tuple[int, int]]:
+    """Split ``range(page_count)`` into at most ``parts`` contiguous
+    ``(start, stop)`` ranges of near-equal size."""
+    parts = max(1, min(parts, page_count))
+    size, extra = divmod(page_count, parts)
+    ranges = []
+    start = 0
+    for part in range(parts):
+        stop = start + size + (1 if part < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+def plan_page_ranges(options: ParseOptions, page_count: int, parts: int, min_pages: int) -> List[Tuple[int, int]]:
+    """Page ranges to parse a document in: the whole document, or when at
+    least ``min_pages`` pages are selected, the selected pages split
+    evenly into at most ``parts`` ranges."""
+    selected = list(options.page_indices(page_count))
+    if min_pages <= 0 or len(selected) < min_pages:
+        return [(0, page_count)]
+    return [
+        (selected[start], selected[stop - 1] + 1)
+        for start, stop in split_page_ranges(len(selected), parts)
+    ]
+
+def merge_pdf_results(parts: List[dict]) -> dict:
+    """Combine ``parse_pdf`` results for consecutive page ranges, in order,
+    into the result a single pass over the whole document would give."""
+    result = dict(parts[0])
+    if "text" in result:
+        result["text"] = "\n".join(part["text"] for part in parts if part["text"])
+    for key in ("tables", "normalized_tables", "images"):
+        if key in result:
+            result[key] = [item for part in parts for item in part[key]]
+    if "image_content" in result:
+        result["image_content"] = {}
+        for part in parts:
+            result["image_content"].update(part["image_content"])
+    return result
+
+def iter_pdf(
+    source: Union[str, bytes],
+    options: ParseOptions = None,
+    page_range: Tuple[int, int] = None
+) -> Iterator[dict]:
+    """Parse a PDF incrementally, yielding one record at a time.
+
+    The first record is ``{"type": "document", ...}`` with the metadata
+    and page count, followed by one ``{"type": "page", ...}`` record per
+    page. ``page_range`` restricts extraction to pages ``start <= n < stop``
+    (zero-based) on top of any ``options.pages`` selection; the page count
+    still covers the whole document. Sections
+    not selected by ``options.fields`` are left out of the records and
+    never extracted.
+    """
+    options = options or ParseOptions()
+    counts = Counter()  # flushed to Prometheus once per document
+    try:
+        with stage("open"):
+            doc, view = _open_document(source)
         
+        document = {"type": "document", "content_type": "pdf"}
+
         # Extract metadata
-        metadata_start = time.time()
-        try:
-            metadata = doc.metadata
-            record_extraction_time("metadata", "pdf", time.time() - metadata_start)
-        except Exception as e:
-            logger.error(f"Failed to extract PDF metadata: {str(e)}")
-            raise MetadataExtractionError(
-                "Failed to extract PDF metadata",
-                document_type="pdf",
-                details={"error": str(e)}
-            )
+        if options.wants("metadata"):
+            try:
+                with stage("metadata"):
+                    document["metadata"] = doc.metadata
+            except Exception as e:
+                logger.error(f"Failed to extract PDF metadata: {str(e)}")
+                raise MetadataExtractionError(
+                    "Failed to extract PDF metadata",
+                    document_type="pdf",
+                    details={"error": str(e)}
+                )
+
+        document["pages"] = len(doc)
+        yield document
         
         # Extract text and images
-        text_content = []
-        images = []
-        tables = []
+        image_info_by_xref = {}  # logos etc. repeat across pages
+        want_text = options.wants("text")
+        want_tables = options.wants("tables")
+        want_images = options.wants("images")
         
-        text_start = time.time()
+        start_page, stop_page = page_range or (0, len(doc))
+        timer = clock()
         try:
-            for page_num in range(len(doc)):
+            # Pages are loaded by index, so unselected pages are never touched
+            for page_num in options.page_indices(len(doc), start_page, stop_page):
+                timer.enter("text")
                 page = doc[page_num]
+                record = {"type": "page", "page": page_num + 1}
+                tables = []
+                images = []
+                image_content = {}
                 
-                # Extract text
-                text = page.get_text()
-                if text.strip():
-                    text_content.append(text)
-                    record_extraction_metric("text_chunks", "pdf")
+                # Extract text and positioned words in a single layout pass
+                if want_text or want_tables:
+                    text, textpage = _extract_page_text(page)
+                    if want_text:
+                        record["text"] = text
+                        if text.strip():
+                            counts["text_chunks"] += 1
                 
-                # Extract tables (using text blocks with position analysis)
-                blocks = page.get_text("blocks")
-                potential_tables = [b for b in blocks if len(b) > 4 and isinstance(b[4], str) and "\t" in b[4]]
-                if potential_tables:
-                    for table_block in potential_tables:
-                        table_data = [
-                            [cell.strip() for cell in row.split("\t")]
-                            for row in table_block[4].split("\n")
-                            if row.strip()
-                        ]
-                        if len(table_data) > 1:  # At least header and one row
-                            tables.append(table_data)
-                            record_extraction_metric("tables", "pdf")
+                # Extract tables from word geometry and ruling lines
+                if want_tables:
+                    timer.enter("tables")
+                    try:
+                        for table in find_tables(page, textpage):
+                            tables.append({"page": page_num + 1, **table})
+                            counts["tables"] += 1
+                    except Exception as e:
+                        logger.warning(f"Failed to extract tables from page {page_num + 1}: {str(e)}")
                 
                 # Extract images
-                for img_index, img in enumerate(page.get_images()):
+                timer.enter("images")
+                for img_index, img in enumerate(page.get_images(full=True) if want_images else ()):
                     try:
                         xref = img[0]
-                        base_image = doc.extract_image(xref)
-                        if base_image:
-                            image_info = {
-                                "page": page_num + 1,
-                                "index": img_index + 1,
-                                "width": base_image["width"],
-                                "height": base_image["height"],
-                                "format": base_image["ext"]
-                            }
-                            images.append(image_info)
-                            record_extraction_metric("images", "pdf")
+                        info = image_info_by_xref.get(xref)
+                        if info is None:
+                            info = image_info_by_xref[xref] = _image_info(img)
+                            # Only decode image streams when the caller asks for them
+                            if options.include_image_content:
+                                base_image = doc.extract_image(xref)
+                                if base_image:
+                                    image_content[str(xref)] = {
+                                        "format": base_image["ext"],
+                                        "data": base64.b64encode(base_image["image"]).decode("ascii")
+                                    }
+                        images.append({
+                            "page": page_num + 1,
+                            "index": img_index + 1,
+                            "xref": xref,
+                            **info
+                        })
+                        counts["images"] += 1
                     except Exception as e:
                         logger.warning(f"Failed to extract image {img_index} from page {page_num + 1}: {str(e)}")
-            
-            record_extraction_time("text", "pdf", time.time() - text_start)
+
+                if want_tables:
+                    record["tables"] = tables
+                if want_images:
+                    record["images"] = images
+                    if options.include_image_content:
+                        record["image_content"] = image_content
+                timer.pause()
+                yield record
             
         except Exception as e:
             logger.error(f"Failed to extract PDF content: {str(e)}")
@@ -90,15 +257,6 @@ async def parse_pdf(file_content: bytes) -> dict:
                 details={"error": str(e)}
             )
         
-        return {
-            "content_type": "pdf",
-            "metadata": metadata,
-            "text": "\n".join(text_content),
-            "tables": tables,
-            "images": images,
-            "pages": len(doc)
-        }
-        
     except (TextExtractionError, MetadataExtractionError) as e:
         raise e
     except Exception as e:
@@ -109,7 +267,71 @@ async def parse_pdf(file_content: bytes) -> dict:
             details={"error": str(e)}
         )
     finally:
+        record_extraction_metrics("pdf", counts)
         if 'doc' in locals():
             doc.close()
-        if 'pdf_stream' in locals():
-            pdf_stream.close() 
\ No newline at end of file
+            if view is not None:
+                _release(view)
+
+def parse_pdf(
+    source: Union[str, bytes],
+    options: ParseOptions = None,
+    page_range: Tuple[int, int] = None
+) -> dict:
+    """Parse a PDF, given as a file path or bytes, and return structured data.
+
+    ``page_range`` restricts extraction to pages ``start <= n < stop``
+    (zero-based), so page-parallel workers can each take a slice of the
+    same file; ``pages`` still reports the document's total page count.
+    """
+    options = options or ParseOptions()
+    records = iter_pdf(source, options, page_range)
+    return _collect_pdf(next(records), records, options)
+
+def parse_pdf_or_plan(
+    source: Union[str, bytes],
+    options: ParseOptions,
+    parts: int,
+    min_pages: int
+) -> Tuple[Optional[dict], List[Tuple[int, int]]]:
+    """Parse a PDF in one go, unless it is large enough to split.
+
+    Returns the result and ``[(0, page_count)]`` when fewer than
+    ``min_pages`` pages are selected. Otherwise nothing is extracted and
+    the result is ``None``, with the ranges from :func:`plan_page_ranges`
+    for ``parse_pdf`` to parse in parallel. The page count comes from the
+    same open as the parse, so small documents are opened only once.
+    """
+    options = options or ParseOptions()
+    records = iter_pdf(source, options)
+    document = next(records)
+    ranges = plan_page_ranges(options, document["pages"], parts, min_pages)
+    if len(ranges) > 1:
+        records.close()
+        return None, ranges
+    return _collect_pdf(document, records, options), ranges
+
+def _collect_pdf(document: dict, records: Iterator[dict], options: ParseOptions) -> dict:
+    """Assemble the ``parse_pdf`` result from the records of ``iter_pdf``."""
+    text_content = []
+    tables = []
+    images = []
+    image_content = {}
+    for record in records:
+        if record.get("text", "").strip():
+            text_content.append(record["text"])
+        tables.extend(record.get("tables", ()))
+        images.extend(record.get("images", ()))
+        image_content.update(record.get("image_content", {}))
+
+    result = {
+        "content_type": "pdf",
+        "metadata": document.get("metadata"),
+        "text": "\n".join(text_content),
+        "tables": tables,
+        "images": images,
+        "pages": document["pages"]
+    }
+    if options.include_image_content and options.wants("images"):
+        result["image_content"] = image_content
+    return normalize_result(options.select(result), options)
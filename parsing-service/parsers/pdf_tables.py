@@ -0,0 +1,258 @@
+import fitz  # PyMuPDF
+import numpy as np
+import re
+from typing import List, Optional, Tuple
+
+# Thresholds are in multiples of the page's median word height, so they
+# scale with the font size rather than being tied to points.
+
+# Horizontal space between two words that starts a new cell (a plain
+# space is roughly a third of the font height)
+COLUMN_GAP = 1.2
+# Vertical distance between word centres still counted as the same line
+LINE_TOLERANCE = 0.5
+# Largest blank space between consecutive rows of one table
+ROW_GAP = 1.6
+
+# Smallest table: rows with at least two cells, and columns
+MIN_ROWS = 3
+MIN_COLUMNS = 2
+# Tables found from text alignment alone, without vertical rulings, must
+# be this densely filled and have short cells, which keeps two-column
+# prose and bulleted layouts out
+MIN_FILL = 0.5
+MAX_WORDS_PER_CELL = 6.0
+
+# Bullets and list numbers; a first column of nothing else is a list
+_LIST_MARKER = re.compile(r"^(?:[^\w\s]|\d{1,3}[.)]|[A-Za-z][.)])$")
+
+# Drawn lines (or rectangles) no thicker than this count as rulings
+RULE_THICKNESS = 2.0
+# Rulings closer than this (points) are the same line
+RULE_MERGE = 2.0
+
+
+def find_tables(page: fitz.Page, textpage: fitz.TextPage = None) -> List[dict]:
+    """Detect tables on a page from word positions and ruling lines.
+
+    Words are clustered into lines by their vertical centre and split into
+    cells at wide horizontal gaps; runs of consecutive lines with two or
+    more cells form table regions. Columns come from the page's vertical
+    rulings inside a region when there are any, otherwise from the
+    horizontal extent of the cells of its fullest rows. When horizontal
+    rulings separate most rows, wrapped lines between two rulings are
+    merged into one row.
+
+    All geometry runs on numpy arrays over the page's words. Pages with
+    fewer than ``MIN_ROWS`` multi-cell lines return before the page's
+    drawings are read, so prose pages cost one vectorised pass.
+
+    Returns ``{"bbox": [x0, y0, x1, y1], "rows": [[cell, ...], ...]}``
+    for each table, top to bottom.
+    """
+    words = page.get_text("words", textpage=textpage)
+    if len(words) < MIN_ROWS * MIN_COLUMNS:
+        return []
+    boxes = np.array([word[:4] for word in words], dtype=float)
+    texts = np.array([word[4] for word in words], dtype=object)
+    unit = float(np.median(boxes[:, 3] - boxes[:, 1])) or 1.0
+
+    lines = _cluster_lines(boxes, unit)
+    order, segment = _split_cells(boxes, lines, unit)
+    boxes, texts, lines, segment = boxes[order], texts[order], lines[order], segment[order]
+
+    # Per-line cell counts decide everything that follows
+    line_count = int(lines.max()) + 1
+    segment_line = np.zeros(int(segment.max()) + 1, dtype=int)
+    segment_line[segment] = lines
+    cells_per_line = np.bincount(segment_line, minlength=line_count)
+    if np.count_nonzero(cells_per_line >= MIN_COLUMNS) < MIN_ROWS:
+        return []
+
+    line_top = np.full(line_count, np.inf)
+    line_bottom = np.full(line_count, -np.inf)
+    np.minimum.at(line_top, lines, boxes[:, 1])
+    np.maximum.at(line_bottom, lines, boxes[:, 3])
+
+    horizontal, vertical = _ruling_lines(page)
+    tables = []
+    for first, last in _table_regions(cells_per_line, line_top, line_bottom, unit):
+        in_region = (lines >= first) & (lines <= last)
+        table = _build_table(
+            boxes[in_region], texts[in_region], lines[in_region] - first, segment[in_region],
+            cells_per_line[first:last + 1], horizontal, vertical, unit
+        )
+        if table is not None:
+            tables.append(table)
+    return tables
+
+
+def _cluster_lines(boxes: np.ndarray, unit: float) -> np.ndarray:
+    """Line number of each word, counted top to bottom."""
+    centre = (boxes[:, 1] + boxes[:, 3]) / 2
+    order = np.argsort(centre, kind="stable")
+    breaks = np.diff(centre[order]) > LINE_TOLERANCE * unit
+    lines = np.empty(len(boxes), dtype=int)
+    lines[order] = np.concatenate(([0], np.cumsum(breaks)))
+    return lines
+
+
+def _split_cells(boxes: np.ndarray, lines: np.ndarray, unit: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Reading order (by line, then left to right) and, for each word in
+    that order, the number of the cell it belongs to."""
+    order = np.lexsort((boxes[:, 0], lines))
+    x0, x1, sorted_lines = boxes[order, 0], boxes[order, 2], lines[order]
+    new_cell = (sorted_lines[1:] != sorted_lines[:-1]) | (x0[1:] - x1[:-1] > COLUMN_GAP * unit)
+    segment = np.empty(len(order), dtype=int)
+    segment[order] = np.concatenate(([0], np.cumsum(new_cell)))
+    return order, segment
+
+
+def _table_regions(cells_per_line: np.ndarray, top: np.ndarray, bottom: np.ndarray, unit: float) -> List[Tuple[int, int]]:
+    """(first, last) line ranges of runs of closely spaced multi-cell lines.
+
+    A single one-cell line (a row label such as "Operating expenses") may
+    sit inside a run, but a run never starts or ends with one.
+    """
+    multi = cells_per_line >= MIN_COLUMNS
+    close = (top[1:] - bottom[:-1]) <= ROW_GAP * unit  # line i + 1 follows line i closely
+    # Line i + 1 joins the run of line i when it follows a multi-cell line
+    # closely, or is a multi-cell line closely following a one-cell line
+    # that did so itself
+    after_multi = multi[:-1] & close
+    bridged = np.zeros_like(after_multi)
+    bridged[1:] = ~multi[1:-1] & multi[2:] & close[1:] & after_multi[:-1]
+    run = np.concatenate(([0], np.cumsum(~(after_multi | bridged))))
+
+    multi_lines = np.flatnonzero(multi)
+    _, first = np.unique(run[multi_lines], return_index=True)
+    last = np.append(first[1:], len(multi_lines)) - 1
+    keep = (last - first + 1) >= MIN_ROWS
+    return list(zip(multi_lines[first[keep]].tolist(), multi_lines[last[keep]].tolist()))
+
+
+def _ruling_lines(page: fitz.Page) -> Tuple[np.ndarray, np.ndarray]:
+    """Horizontal ``(y, x0, x1)`` and vertical ``(x, y0, y1)`` rulings
+    drawn on the page, from stroked lines and the edges of thin or
+    cell-sized rectangles."""
+    horizontal = []
+    vertical = []
+    for path in page.get_drawings():
+        for item in path["items"]:
+            if item[0] == "l":
+                start, end = item[1], item[2]
+                if abs(start.y - end.y) <= RULE_THICKNESS:
+                    horizontal.append((start.y, min(start.x, end.x), max(start.x, end.x)))
+                elif abs(start.x - end.x) <= RULE_THICKNESS:
+                    vertical.append((start.x, min(start.y, end.y), max(start.y, end.y)))
+            elif item[0] == "re":
+                rect = item[1]
+                if rect.height <= RULE_THICKNESS:
+                    horizontal.append(((rect.y0 + rect.y1) / 2, rect.x0, rect.x1))
+                elif rect.width <= RULE_THICKNESS:
+                    vertical.append(((rect.x0 + rect.x1) / 2, rect.y0, rect.y1))
+                else:
+                    horizontal += [(rect.y0, rect.x0, rect.x1), (rect.y1, rect.x0, rect.x1)]
+                    vertical += [(rect.x0, rect.y0, rect.y1), (rect.x1, rect.y0, rect.y1)]
+    return np.array(horizontal, dtype=float).reshape(-1, 3), np.array(vertical, dtype=float).reshape(-1, 3)
+
+
+def _interior_rulings(rulings: np.ndarray, low: float, high: float, span_low: float, span_high: float) -> np.ndarray:
+    """Distinct positions of the rulings strictly inside ``(low, high)``
+    that cross at least half of the ``(span_low, span_high)`` extent."""
+    if not len(rulings):
+        return rulings[:, 0]
+    overlap = np.minimum(rulings[:, 2], span_high) - np.maximum(rulings[:, 1], span_low)
+    keep = (rulings[:, 0] > low + RULE_MERGE) & (rulings[:, 0] < high - RULE_MERGE) & \
+        (overlap >= (span_high - span_low) / 2)
+    positions = np.sort(rulings[keep, 0])
+    if len(positions):
+        positions = positions[np.concatenate(([True], np.diff(positions) > RULE_MERGE))]
+    return positions
+
+
+def _text_columns(boxes: np.ndarray, segment: np.ndarray, cells_per_line: np.ndarray, lines: np.ndarray) -> np.ndarray:
+    """Column boundaries from the cells of the rows with the most cells:
+    their horizontal extents are merged where they overlap, and each
+    boundary sits halfway across the gap between two columns."""
+    fullest = np.flatnonzero(cells_per_line == cells_per_line.max())
+    mask = np.isin(lines, fullest)
+    cells, index = np.unique(segment[mask], return_inverse=True)
+    x0 = np.full(len(cells), np.inf)
+    x1 = np.full(len(cells), -np.inf)
+    np.minimum.at(x0, index, boxes[mask, 0])
+    np.maximum.at(x1, index, boxes[mask, 2])
+    order = np.argsort(x0)
+    x0, x1 = x0[order], np.maximum.accumulate(x1[order])
+    gap = np.flatnonzero(x0[1:] > x1[:-1])
+    return (x1[gap] + x0[gap + 1]) / 2
+
+
+def _build_table(boxes, texts, lines, segment, cells_per_line, horizontal, vertical, unit) -> Optional[dict]:
+    """Lay the words of one region out on a grid, or None when the grid
+    does not look like a table."""
+    left, top = boxes[:, 0].min(), boxes[:, 1].min()
+    right, bottom = boxes[:, 2].max(), boxes[:, 3].max()
+
+    # Columns: vertical rulings when the region has them, else text alignment
+    ruled = _interior_rulings(vertical, left, right, top, bottom)
+    text_boundaries = _text_columns(boxes, segment, cells_per_line, lines)
+    if len(ruled) >= max(len(text_boundaries), MIN_COLUMNS - 1):
+        boundaries = ruled
+        # Ruled cells may sit closer than a column gap, so place words individually
+        column = np.searchsorted(boundaries, (boxes[:, 0] + boxes[:, 2]) / 2)
+    else:
+        ruled = None
+        boundaries = text_boundaries
+        # Keep each cell together, so a header spanning columns lands in one
+        centre = np.zeros(int(segment.max()) + 1)
+        count = np.bincount(segment, minlength=len(centre))
+        np.add.at(centre, segment, (boxes[:, 0] + boxes[:, 2]) / 2)
+        column = np.searchsorted(boundaries, (centre / np.maximum(count, 1))[segment])
+    column_count = len(boundaries) + 1
+    if column_count < MIN_COLUMNS:
+        return None
+
+    # Rows: text lines, except that when horizontal rulings separate most
+    # rows (at most two lines between rulings on average), a line filling
+    # fewer columns than the first line between the same two rulings
+    # continues that row (wrapped cell text)
+    row = lines
+    line_count = len(cells_per_line)
+    separators = _interior_rulings(horizontal, top, bottom, left, right)
+    if len(separators) + 1 >= line_count / 2:
+        line_top = np.full(line_count, np.inf)
+        np.minimum.at(line_top, lines, boxes[:, 1])
+        band = np.searchsorted(separators, line_top + unit / 2)
+        filled = np.bincount(np.unique(lines * column_count + column) // column_count, minlength=line_count)
+        band_start = np.concatenate(([True], band[1:] != band[:-1]))
+        band_filled = filled[np.maximum.accumulate(np.where(band_start, np.arange(line_count), 0))]
+        new_row = band_start | (filled >= band_filled)
+        row = (np.cumsum(new_row) - 1)[lines]
+
+    # Group the words by cell, keeping reading order within each (a
+    # stable sort, so wrapped lines stay in sequence), and join each group
+    cell = row * column_count + column
+    order = np.argsort(cell, kind="stable")
+    cell, words = cell[order], texts[order].tolist()
+    starts = np.flatnonzero(np.concatenate(([True], cell[1:] != cell[:-1])))
+    ends = np.append(starts[1:], len(cell))
+    grid = np.full((int(row.max()) + 1) * column_count, "", dtype=object)
+    grid[cell[starts]] = [" ".join(words[start:end]) for start, end in zip(starts.tolist(), ends.tolist())]
+    grid = grid.reshape(-1, column_count)
+    rows = grid[grid.astype(bool).any(axis=1)].tolist()
+    if len(rows) < MIN_ROWS:
+        return None
+
+    if ruled is None:
+        filled = sum(1 for cells_in_row in rows for cell in cells_in_row if cell)
+        if filled < MIN_FILL * len(rows) * column_count or len(texts) > MAX_WORDS_PER_CELL * filled:
+            return None
+        first_column = [cells_in_row[0] for cells_in_row in rows if cells_in_row[0]]
+        if first_column and all(_LIST_MARKER.match(cell) for cell in first_column):
+            return None
+
+    return {
+        "bbox": [round(float(value), 2) for value in (left, top, right, bottom)],
+        "rows": rows
+    }
@@ -1,8 +1,14 @@
 from pptx import Presentation
+from pptx.opc.constants import CONTENT_TYPE as CT
+from pptx.opc.packuri import PackURI
+from pptx.oxml.ns import qn
+from pptx.parts.coreprops import CorePropertiesPart
 from loguru import logger
 import io
-import time
-from typing import List, Dict, Any
+from collections import Counter
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple, Union
+
+import config
 
 from exceptions import (
     DocumentCorruptedError,
@@ -10,86 +16,389 @@ from exceptions import (
     TableExtractionError,
     MetadataExtractionError
 )
-from monitoring import record_extraction_metric, record_extraction_time
+from monitoring import record_extraction_metrics
+from tracing import clock, stage
+from .normalize import normalize_result
+from .options import ParseOptions
+from .ooxml import (
+    RT_CORE_PROPERTIES,
+    RT_NOTES_SLIDE,
+    RT_OFFICE_DOCUMENT,
+    RT_SLIDE_LAYOUT,
+    RT_SLIDE_MASTER,
+    OoxmlPackage,
+    iter_children,
+    parse_part
+)
+
+P_SP = qn("p:sp")
+P_PIC = qn("p:pic")
+P_GRAPHIC_FRAME = qn("p:graphicFrame")
+P_SPTREE = qn("p:spTree")
+P_TXBODY = qn("p:txBody")
+A_P = qn("a:p")
+A_T = qn("a:t")
+A_TR = qn("a:tr")
+A_TC = qn("a:tc")
+A_TXBODY = qn("a:txBody")
+A_EXT = qn("a:ext")
+
+# Elements python-pptx treats as shapes when walking a shape tree
+_SHAPE_TAGS = (P_SP, qn("p:grpSp"), P_GRAPHIC_FRAME, qn("p:cxnSp"), P_PIC, qn("p:contentPart"))
+
+TABLE_GRAPHIC_DATA_URI = "http://schemas.openxmlformats.org/drawingml/2006/table"
+
+# Master placeholder a layout placeholder inherits its size from, by type,
+# as python-pptx's LayoutPlaceholder resolves it
+_BASE_PLACEHOLDER_TYPE = {
+    "body": "body",
+    "chart": "body",
+    "clipArt": "body",
+    "ctrTitle": "title",
+    "dgm": "body",
+    "dt": "dt",
+    "ftr": "ftr",
+    "media": "body",
+    "obj": "body",
+    "pic": "body",
+    "sldNum": "sldNum",
+    "subTitle": "body",
+    "tbl": "body",
+    "title": "title",
+}
+
+def _table_data(rows: Iterable[Iterable[str]]) -> List[List[str]]:
+    """Non-empty rows of a table as lists of stripped cell text."""
+    table_data = []
+    for row in rows:
+        row_data = [text.strip() for text in row]
+        if any(row_data):  # Skip empty rows
+            table_data.append(row_data)
+    return table_data
+
+class _PythonPptxReader:
+    """Reads a PPTX through the full python-pptx object model."""
+
+    def __init__(self, source: Union[str, bytes]):
+        self._stream = None if isinstance(source, str) else io.BytesIO(source)
+        self._prs = Presentation(source if self._stream is None else self._stream)
+
+    def core_properties(self):
+        return self._prs.core_properties
+
+    def slide_count(self) -> int:
+        return len(self._prs.slides)
+
+    def slide(self, index: int):
+        return self._prs.slides[index]
+
+    def notes(self, slide) -> str:
+        return slide.notes_slide.notes_text_frame.text if slide.has_notes_slide else ""
+
+    def shapes(self, slide) -> Iterable:
+        return slide.shapes
+
+    def shape_kind(self, slide, shape, images: bool) -> Optional[str]:
+        if shape.has_text_frame:
+            return "text"
+        if shape.has_table:
+            return "table"
+        if images and hasattr(shape, "image"):
+            return "image"
+        return None
+
+    def shape_text(self, shape) -> str:
+        return shape.text
+
+    def table_rows(self, shape) -> List[List[str]]:
+        return _table_data([cell.text for cell in row.cells] for row in shape.table.rows)
+
+    def image_size(self, slide, shape) -> Tuple[Optional[int], Optional[int]]:
+        return shape.width, shape.height
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+
+class _OoxmlPptxReader:
+    """Reads slides straight out of the zip, one ``ppt/slides/slideN.xml``
+    at a time.
+
+    Each slide's shape tree is parsed incrementally and its notes part
+    only when notes are asked for, so memory stays proportional to one
+    slide. Text, tables, image sizes (including sizes picture
+    placeholders inherit from their layout and master) follow python-pptx's
+    rules, so output is identical without loading the presentation.
+    """
+
+    def __init__(self, source: Union[str, bytes]):
+        self._package = OoxmlPackage(source)
+        self._main_part = self._package.related_one(RT_OFFICE_DOCUMENT) or "ppt/presentation.xml"
+        presentation = parse_part(self._package.read(self._main_part))
+        self._slide_ids = [
+            slide_id.get(qn("r:id"))
+            for slide_id in presentation.iterfind(f"{qn('p:sldIdLst')}/{qn('p:sldId')}")
+        ]
+        self._placeholders = {}
+
+    def core_properties(self):
+        partname = self._package.related_one(RT_CORE_PROPERTIES)
+        if partname is None or not self._package.has_part(partname):
+            # python-pptx substitutes default properties in this case
+            return CorePropertiesPart.default(None)
+        return CorePropertiesPart.load(
+            PackURI(f"/{partname}"), CT.OPC_CORE_PROPERTIES, None, self._package.read(partname)
+        )
+
+    def slide_count(self) -> int:
+        return len(self._slide_ids)
+
+    def slide(self, index: int) -> str:
+        return self._package.rel_targets(self._main_part)[self._slide_ids[index]]
+
+    def notes(self, slide: str) -> str:
+        partname = self._package.related_one(RT_NOTES_SLIDE, slide)
+        if partname is None:
+            return ""
+        for element, placeholder in self._placeholder_shapes(partname):
+            if placeholder.get("type", "obj") == "body":
+                return _text_body(element.find(P_TXBODY))
+        raise ValueError(f"{partname} has no notes placeholder")
+
+    def shapes(self, slide: str) -> Iterator:
+        with self._package.open(slide) as stream:
+            yield from iter_children(stream, P_SPTREE)
+
+    def shape_kind(self, slide: str, shape, images: bool) -> Optional[str]:
+        if shape.tag == P_SP:
+            return "text"
+        if shape.tag == P_GRAPHIC_FRAME:
+            graphic_data = shape.find(f"{qn('a:graphic')}/{qn('a:graphicData')}")
+            if graphic_data is None:
+                raise ValueError("graphic frame has no a:graphicData")
+            return "table" if graphic_data.get("uri") == TABLE_GRAPHIC_DATA_URI else None
+        if shape.tag == P_PIC and images:
+            # Movies are pictures too, but carry a poster frame rather than an image
+            if _placeholder(shape) is None and shape.find(f"{qn('p:nvPicPr')}/{qn('p:nvPr')}/{qn('a:videoFile')}") is not None:
+                return None
+            blip = shape.find(f"{qn('p:blipFill')}/{qn('a:blip')}")
+            image_id = blip.get(qn("r:embed")) if blip is not None else None
+            if image_id is None:
+                raise ValueError("no embedded image")
+            if image_id not in self._package.rel_targets(slide):
+                raise KeyError(f"no image part for {image_id}")
+            return "image"
+        return None
 
-async def parse_pptx(file_content: bytes) -> dict:
-    """Parse PPTX file content and return structured data."""
+    def shape_text(self, shape) -> str:
+        return _text_body(shape.find(P_TXBODY))
+
+    def table_rows(self, shape) -> List[List[str]]:
+        table = shape.find(f"{qn('a:graphic')}/{qn('a:graphicData')}/{qn('a:tbl')}")
+        if table is None:
+            raise ValueError("graphic frame does not contain a table")
+        return _table_data(
+            [_text_body(cell.find(A_TXBODY)) for cell in row.iterchildren(A_TC)]
+            for row in table.iterchildren(A_TR)
+        )
+
+    def image_size(self, slide: str, shape) -> Tuple[Optional[int], Optional[int]]:
+        return self._dimension(slide, shape, "cx"), self._dimension(slide, shape, "cy")
+
+    def _dimension(self, slide: str, shape, name: str) -> Optional[int]:
+        """Size of a picture, falling back for placeholders to the layout
+        placeholder with the same idx and then to the master placeholder."""
+        value = _extent(shape, name)
+        placeholder = _placeholder(shape)
+        if value is not None or placeholder is None:
+            return value
+        layout = self._related_part(RT_SLIDE_LAYOUT, slide)
+        idx = int(placeholder.get("idx", "0"))
+        for element, layout_placeholder in self._placeholder_shapes(layout):
+            if int(layout_placeholder.get("idx", "0")) != idx:
+                continue
+            value = _extent(element, name)
+            if value is not None or element.tag != P_SP:
+                return value
+            base_type = _BASE_PLACEHOLDER_TYPE[layout_placeholder.get("type", "obj")]
+            master = self._related_part(RT_SLIDE_MASTER, layout)
+            for master_element, master_placeholder in self._placeholder_shapes(master):
+                if master_placeholder.get("type", "obj") == base_type:
+                    return _extent(master_element, name)
+            return None
+        return None
+
+    def _related_part(self, rel_type: str, partname: str) -> str:
+        related = self._package.related_one(rel_type, partname)
+        if related is None:
+            raise KeyError(f"no {rel_type} relationship on {partname}")
+        return related
+
+    def _placeholder_shapes(self, partname: str) -> list:
+        """(shape, p:ph) pairs of the top-level placeholders in a (small)
+        layout, master or notes part, parsed once per part."""
+        if partname not in self._placeholders:
+            tree = parse_part(self._package.read(partname)).find(f"{qn('p:cSld')}/{P_SPTREE}")
+            shapes = [] if tree is None else [element for element in tree if element.tag in _SHAPE_TAGS]
+            self._placeholders[partname] = [
+                (element, _placeholder(element)) for element in shapes if _placeholder(element) is not None
+            ]
+        return self._placeholders[partname]
+
+    def close(self):
+        self._package.close()
+
+def _placeholder(shape):
+    """The p:ph element of a placeholder shape, None for other shapes."""
+    properties = shape[0] if len(shape) else None
+    return properties.find(f"{qn('p:nvPr')}/{qn('p:ph')}") if properties is not None else None
+
+def _extent(shape, name: str) -> Optional[int]:
+    if shape.tag == P_GRAPHIC_FRAME:
+        transform = shape.find(qn("p:xfrm"))
+    else:
+        transform = shape.find(f"{qn('p:spPr')}/{qn('a:xfrm')}")
+    extent = transform.find(A_EXT) if transform is not None else None
+    return int(extent.get(name)) if extent is not None else None
+
+def _text_body(body) -> str:
+    """Text of a p:txBody or a:txBody: paragraphs joined by newlines, line
+    breaks as vertical tabs, as python-pptx's ``TextFrame.text``."""
+    if body is None:
+        return ""
+    paragraphs = []
+    for paragraph in body.iterchildren(A_P):
+        parts = []
+        for child in paragraph:
+            if child.tag == qn("a:r"):
+                text = child.find(A_T)
+                if text is None:
+                    raise ValueError("a:r has no a:t")
+                parts.append(text.text or "")
+            elif child.tag == qn("a:br"):
+                parts.append("\v")
+            elif child.tag == qn("a:fld"):
+                text = child.find(A_T)
+                parts.append((text.text or "") if text is not None else "")
+        paragraphs.append("".join(parts))
+    return "\n".join(paragraphs)
+
+def _open_reader(source: Union[str, bytes]):
+    if config.PPTX_ENGINE == "ooxml":
+        return _OoxmlPptxReader(source)
+    return _PythonPptxReader(source)
+
+def _add_content(slide_content: dict, kind: str, content: Any):
+    """Record a text or table shape, as a shape dict only when slides were requested."""
+    if "shapes" in slide_content:
+        slide_content["shapes"].append({
+            "type": kind,
+            "content": content
+        })
+    else:
+        slide_content["text" if kind == "text" else "tables"].append(content)
+
+def iter_pptx(source: Union[str, bytes], options: ParseOptions = None) -> Iterator[dict]:
+    """Parse a PPTX incrementally, yielding one record at a time.
+
+    The first record is ``{"type": "document", ...}`` with the metadata
+    and slide count, followed by one ``{"type": "slide", ...}`` record per
+    selected slide (``options.pages``) holding its shapes and notes. When ``options.fields`` does not
+    select ``slides``, slide records carry only the ``text`` and ``tables``
+    that were asked for instead of the shape list.
+    """
+    options = options or ParseOptions()
+    want_text = options.wants("text")
+    want_tables = options.wants("tables")
+    want_slides = options.wants("slides")
+    counts = Counter()  # flushed to Prometheus once per document
     try:
-        # Create presentation from bytes
-        pptx_stream = io.BytesIO(file_content)
-        prs = Presentation(pptx_stream)
+        # Open from the spooled file when we have one
+        with stage("open"):
+            reader = _open_reader(source)
         
+        document = {"type": "document", "content_type": "pptx"}
+
         # Extract metadata
-        metadata_start = time.time()
-        try:
-            core_properties = prs.core_properties
-            metadata = {
-                "title": core_properties.title or "",
-                "author": core_properties.author or "",
-                "subject": core_properties.subject or "",
-                "keywords": core_properties.keywords or "",
-                "created": core_properties.created.isoformat() if core_properties.created else "",
-                "modified": core_properties.modified.isoformat() if core_properties.modified else "",
-            }
-            record_extraction_time("metadata", "pptx", time.time() - metadata_start)
-        except Exception as e:
-            logger.error(f"Failed to extract PPTX metadata: {str(e)}")
-            raise MetadataExtractionError(
-                "Failed to extract PPTX metadata",
-                document_type="pptx",
-                details={"error": str(e)}
-            )
+        if options.wants("metadata"):
+            try:
+                with stage("metadata"):
+                    core_properties = reader.core_properties()
+                document["metadata"] = {
+                    "title": core_properties.title or "",
+                    "author": core_properties.author or "",
+                    "subject": core_properties.subject or "",
+                    "keywords": core_properties.keywords or "",
+                    "created": core_properties.created.isoformat() if core_properties.created else "",
+                    "modified": core_properties.modified.isoformat() if core_properties.modified else "",
+                }
+            except Exception as e:
+                logger.error(f"Failed to extract PPTX metadata: {str(e)}")
+                raise MetadataExtractionError(
+                    "Failed to extract PPTX metadata",
+                    document_type="pptx",
+                    details={"error": str(e)}
+                )
+
+        slide_count = reader.slide_count()
+        document["total_slides"] = slide_count
+        yield document
         
         # Extract slides content
-        slides = []
-        text_content = []
-        tables = []
-        
-        text_start = time.time()
+        timer = clock()
         try:
-            for slide_num, slide in enumerate(prs.slides, 1):
-                slide_content = {
-                    "number": slide_num,
-                    "shapes": [],
-                    "notes": slide.notes_slide.notes_text_frame.text if slide.has_notes_slide else ""
-                }
+            selected = options.page_indices(slide_count) if want_slides or want_text or want_tables else ()
+            for index in selected:
+                timer.enter("text")
+                # Notes and shapes are only materialised for selected slides
+                slide_num, slide = index + 1, reader.slide(index)
+                if want_slides:
+                    slide_content = {
+                        "type": "slide",
+                        "number": slide_num,
+                        "shapes": [],
+                        "notes": reader.notes(slide)
+                    }
+                else:
+                    slide_content = {"type": "slide", "number": slide_num}
+                    if want_text:
+                        slide_content["text"] = []
+                    if want_tables:
+                        slide_content["tables"] = []
                 
                 # Process shapes
-                for shape in slide.shapes:
+                for shape in reader.shapes(slide):
+                    timer.enter("text")
                     try:
-                        if shape.has_text_frame:
-                            text = shape.text.strip()
+                        kind = reader.shape_kind(slide, shape, want_slides)
+                        if kind == "text":
+                            if not (want_slides or want_text):
+                                continue
+                            text = reader.shape_text(shape).strip()
                             if text:
-                                slide_content["shapes"].append({
-                                    "type": "text",
-                                    "content": text
-                                })
-                                text_content.append(text)
-                                record_extraction_metric("text_shapes", "pptx")
+                                _add_content(slide_content, "text", text)
+                                counts["text_shapes"] += 1
                                 
-                        elif shape.has_table:
-                            table_data = []
-                            for row in shape.table.rows:
-                                row_data = [cell.text.strip() for cell in row.cells]
-                                if any(row_data):  # Skip empty rows
-                                    table_data.append(row_data)
+                        elif kind == "table":
+                            if not (want_slides or want_tables):
+                                continue
+                            timer.enter("tables")
+                            table_data = reader.table_rows(shape)
                             if table_data:
-                                tables.append(table_data)
-                                slide_content["shapes"].append({
-                                    "type": "table",
-                                    "content": table_data
-                                })
-                                record_extraction_metric("tables", "pptx")
+                                _add_content(slide_content, "table", table_data)
+                                counts["tables"] += 1
                                 
-                        elif hasattr(shape, "image"):
+                        elif kind == "image":
+                            timer.enter("images")
                             try:
+                                width, height = reader.image_size(slide, shape)
                                 image_info = {
                                     "type": "image",
-                                    "width": shape.width,
-                                    "height": shape.height
+                                    "width": width,
+                                    "height": height
                                 }
                                 slide_content["shapes"].append(image_info)
-                                record_extraction_metric("images", "pptx")
+                                counts["images"] += 1
                             except Exception as e:
                                 logger.warning(f"Failed to extract image from slide {slide_num}: {str(e)}")
                                 
@@ -97,9 +406,8 @@ async def parse_pptx(file_content: bytes) -> dict:
                         logger.warning(f"Failed to process shape in slide {slide_num}: {str(e)}")
                         continue
                 
-                slides.append(slide_content)
-            
-            record_extraction_time("text", "pptx", time.time() - text_start)
+                timer.pause()
+                yield slide_content
             
         except Exception as e:
             logger.error(f"Failed to extract PPTX content: {str(e)}")
@@ -109,15 +417,6 @@ async def parse_pptx(file_content: bytes) -> dict:
                 details={"error": str(e)}
             )
         
-        return {
-            "content_type": "pptx",
-            "metadata": metadata,
-            "text": "\n".join(text_content),
-            "tables": tables,
-            "slides": slides,
-            "total_slides": len(prs.slides)
-        }
-        
     except (TextExtractionError, MetadataExtractionError) as e:
         raise e
     except Exception as e:
@@ -128,5 +427,37 @@ async def parse_pptx(file_content: bytes) -> dict:
             details={"error": str(e)}
         )
     finally:
-        if 'pptx_stream' in locals():
-            pptx_stream.close() 
\ No newline at end of file
+        record_extraction_metrics("pptx", counts)
+        if 'reader' in locals():
+            reader.close()
+
+def parse_pptx(source: Union[str, bytes], options: ParseOptions = None) -> dict:
+    """Parse a PPTX, given as a file path or bytes, and return structured data."""
+    options = options or ParseOptions()
+    records = iter_pptx(source, options)
+    document = next(records)
+
+    slides = []
+    text_content = []
+    tables = []
+    for record in records:
+        if "shapes" not in record:
+            text_content.extend(record.get("text", ()))
+            tables.extend(record.get("tables", ()))
+            continue
+        slide_content = {key: value for key, value in record.items() if key != "type"}
+        for shape in slide_content["shapes"]:
+            if shape["type"] == "text":
+                text_content.append(shape["content"])
+            elif shape["type"] == "table":
+                tables.append(shape["content"])
+        slides.append(slide_content)
+
+    return normalize_result(options.select({
+        "content_type": "pptx",
+        "metadata": document.get("metadata"),
+        "text": "\n".join(text_content),
+        "tables": tables,
+        "slides": slides,
+        "total_slides": document["total_slides"]
+    }), options)
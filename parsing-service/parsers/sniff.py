@@ -0,0 +1,48 @@
+import struct
+import zipfile
+from typing import Iterator
+
+# Only this much of a document is read to recognise it
+SNIFF_BYTES = 4096
+
+ZIP_SIGNATURE = b"PK\x03\x04"
+
+# signature, version, flags, method, mtime, mdate, crc32, compressed size,
+# uncompressed size, name length, extra field length
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+
+
+def read_head(path: str, size: int = SNIFF_BYTES) -> bytes:
+    """First ``size`` bytes of a file."""
+    with open(path, "rb") as f:
+        return f.read(size)
+
+
+def local_zip_names(head: bytes) -> Iterator[str]:
+    """Member names from the local file headers at the start of a zip.
+
+    Stops at the end of ``head`` or at the first entry whose size is only
+    recorded after its data, since the next header cannot be located.
+    """
+    offset = 0
+    while offset + _LOCAL_HEADER.size <= len(head):
+        signature, _, flags, _, _, _, _, compressed_size, _, name_length, extra_length = \
+            _LOCAL_HEADER.unpack_from(head, offset)
+        if signature != ZIP_SIGNATURE:
+            return
+        name_start = offset + _LOCAL_HEADER.size
+        if name_start + name_length > len(head):
+            return
+        yield head[name_start:name_start + name_length].decode("utf-8", "replace")
+        if flags & 0x08:
+            return
+        offset = name_start + name_length + extra_length + compressed_size
+
+
+def central_zip_names(path: str) -> Iterator[str]:
+    """Member names from the zip central directory, without reading any member data."""
+    try:
+        with zipfile.ZipFile(path) as archive:
+            yield from archive.namelist()
+    except (zipfile.BadZipFile, OSError):
+        return
@@ -0,0 +1,155 @@
+import asyncio
+import collections
+import gc
+import time
+from typing import Dict, Iterable, List, Optional
+
+import psutil
+from loguru import logger
+
+import config
+from executor import ParseExecutor
+from monitoring import (
+    cleanup_dead_processes,
+    record_gc_pause,
+    record_loop_lag,
+    update_pool_metrics,
+    update_process_metrics,
+    update_resource_metrics,
+    update_worker_count
+)
+
+# GC pauses held between two loop lag samples, at most; older ones are
+# dropped if the loop stalls
+_MAX_QUEUED_GC_PAUSES = 10000
+
+
+class RuntimeMetricsCollector:
+    """Samples the health of the service process for Prometheus.
+
+    - Resident memory, CPU, open file descriptors and threads of the
+      service process and, summed, of its parser worker processes, every
+      ``interval`` seconds. psutil handles are kept across samples, so
+      CPU percentages cover the time since the previous sample; a worker
+      seen for the first time reports 0% until its second sample.
+    - Event loop lag, as how late a wake-up scheduled every
+      ``lag_interval`` seconds actually ran, and parser pool utilisation
+      at the same rate.
+    - Garbage collection pauses of the service process, per generation,
+      from ``gc.callbacks``. The callback only queues each pause; they are
+      recorded at the loop lag rate, because a collection can start inside
+      a metric update and prometheus_client's multiprocess lock is not
+      re-entrant.
+
+    In Prometheus multiprocess mode each sample also drops the live gauges
+    of sibling service processes that have exited.
+
+    Process sampling runs on a thread so it never adds to the lag it is
+    measuring.
+    """
+
+    def __init__(
+        self,
+        executor: ParseExecutor,
+        interval: float = config.RUNTIME_METRICS_INTERVAL,
+        lag_interval: float = config.LOOP_LAG_INTERVAL,
+    ):
+        self.executor = executor
+        self.interval = interval
+        self.lag_interval = lag_interval
+        self._process = psutil.Process()
+        self._workers: Dict[int, psutil.Process] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._gc_started: Optional[float] = None
+        self._gc_pauses = collections.deque(maxlen=_MAX_QUEUED_GC_PAUSES)
+
+    def start(self):
+        if self._tasks:
+            return
+        self._process.cpu_percent()  # the first reading only sets the baseline
+        gc.callbacks.append(self._on_gc)
+        self._tasks = [
+            asyncio.create_task(self._sample_processes()),
+            asyncio.create_task(self._watch_loop()),
+        ]
+
+    async def stop(self):
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._record_gc_pauses()
+
+    def _on_gc(self, phase: str, info: dict):
+        # No metric calls here: the collection may have started while a
+        # metric held its lock
+        if phase == "start":
+            self._gc_started = time.perf_counter()
+        elif self._gc_started is not None:
+            self._gc_pauses.append((info["generation"], time.perf_counter() - self._gc_started))
+            self._gc_started = None
+
+    def _record_gc_pauses(self):
+        # Only the pauses queued so far: recording can itself collect
+        for _ in range(len(self._gc_pauses)):
+            record_gc_pause(*self._gc_pauses.popleft())
+
+    async def _watch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            record_loop_lag(max(0.0, loop.time() - expected))
+            self._record_gc_pauses()
+            update_pool_metrics(self.executor.busy_workers, self.executor.max_workers)
+
+    async def _sample_processes(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.sample)
+            except Exception as e:
+                logger.warning(f"Failed to sample process metrics: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def sample(self):
+        """Take one sample of the service and worker processes."""
+        main = _usage([self._process])
+        workers = _usage(self._worker_processes())
+        update_process_metrics("main", *main)
+        update_process_metrics("workers", *workers)
+        update_worker_count(len(self._workers))
+        update_resource_metrics(main[0] + workers[0], main[1] + workers[1])
+        cleanup_dead_processes()
+
+    def _worker_processes(self) -> List[psutil.Process]:
+        """Long-lived handles on the live pool workers; workers replaced
+        by the pool are dropped and new ones are primed for CPU."""
+        pids = set(self.executor.worker_pids())
+        for pid in list(self._workers):
+            if pid not in pids:
+                del self._workers[pid]
+        for pid in pids - self._workers.keys():
+            try:
+                process = psutil.Process(pid)
+                process.cpu_percent()
+                self._workers[pid] = process
+            except psutil.Error:
+                continue
+        return list(self._workers.values())
+
+
+def _usage(processes: Iterable[psutil.Process]):
+    """Summed RSS, CPU percent, open file descriptors and threads."""
+    memory = cpu = fds = threads = 0
+    for process in processes:
+        try:
+            with process.oneshot():
+                memory += process.memory_info().rss
+                cpu += process.cpu_percent()
+                fds += process.num_fds() if hasattr(process, "num_fds") else process.num_handles()
+                threads += process.num_threads()
+        except psutil.Error:
+            continue  # exited between listing and sampling
+    return memory, cpu, fds, threads
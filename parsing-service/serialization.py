@@ -0,0 +1,155 @@
+import json
+from typing import Optional
+
+from fastapi import HTTPException
+from starlette.responses import Response
+
+# Faster encoders are used when installed; JSON falls back to the stdlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# Accept header values selecting each format
+_FORMATS = {
+    JSON_MEDIA_TYPE: "json",
+    MSGPACK_MEDIA_TYPE: "msgpack",
+    "application/x-msgpack": "msgpack",
+    "application/vnd.msgpack": "msgpack",
+    ARROW_MEDIA_TYPE: "arrow",
+}
+
+# Schema metadata key holding the rest of the result in Arrow responses
+ARROW_RESULT_KEY = b"parse_result"
+
+
+def dumps_json(obj) -> bytes:
+    """Compact UTF-8 JSON, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+def dumps_msgpack(obj) -> bytes:
+    return msgpack.packb(obj, use_bin_type=True, default=str)
+
+
+def dumps_arrow(result: dict) -> bytes:
+    """Arrow IPC stream of the result's normalized tables.
+
+    One row per table, in ``normalized_tables`` order: ``page`` (PDF only),
+    ``header_rows``, and the per-column ``columns``, ``types`` and
+    ``units`` lists. Cells are in ``values`` (float64) for numeric columns
+    and ``text`` for text columns, as one list per column with null in
+    place of the columns of the other kind. Everything else in the result
+    is attached as JSON under the ``parse_result`` schema metadata key.
+    """
+    frames = result.get("normalized_tables", [])
+    columns = {
+        "page": [frame.get("page") for frame in frames],
+        "header_rows": [frame["header_rows"] for frame in frames],
+        "columns": [frame["columns"] for frame in frames],
+        "types": [frame["types"] for frame in frames],
+        "units": [frame["units"] for frame in frames],
+        "values": [
+            [None if kind == "text" else data for kind, data in zip(frame["types"], frame["data"])]
+            for frame in frames
+        ],
+        "text": [
+            [data if kind == "text" else None for kind, data in zip(frame["types"], frame["data"])]
+            for frame in frames
+        ],
+    }
+    rest = {key: value for key, value in result.items() if key != "normalized_tables"}
+    schema = pa.schema(
+        [
+            ("page", pa.int32()),
+            ("header_rows", pa.int32()),
+            ("columns", pa.list_(pa.string())),
+            ("types", pa.list_(pa.string())),
+            ("units", pa.list_(pa.string())),
+            ("values", pa.list_(pa.list_(pa.float64()))),
+            ("text", pa.list_(pa.list_(pa.string()))),
+        ],
+        metadata={ARROW_RESULT_KEY: dumps_json(rest)}
+    )
+    batch = pa.record_batch([pa.array(columns[field.name], type=field.type) for field in schema], schema=schema)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """Pick ``json``, ``msgpack`` or ``arrow`` from an Accept header.
+
+    The format with the highest q-value wins, the one listed first on a
+    tie; ``q=0`` refuses a type and wildcards count as JSON. A header with
+    nothing recognisable falls back to JSON. Formats whose encoder is not
+    installed are passed over, and a 406 is raised if that leaves none.
+    """
+    candidates = []
+    for item in (accept or "").split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        media_type = media_type.lower()
+        selected = "json" if media_type in ("*/*", "application/*") else _FORMATS.get(media_type)
+        if selected is None:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0  # malformed, ignore the type
+        if quality > 0:
+            candidates.append((-quality, len(candidates), media_type, selected))
+    if not candidates:
+        return "json"
+    candidates.sort()
+    for _, _, _, selected in candidates:
+        if not (selected == "msgpack" and msgpack is None) and not (selected == "arrow" and pa is None):
+            return selected
+    raise HTTPException(
+        status_code=406,
+        detail={
+            "error": f"{candidates[0][2]} responses are not available on this server",
+            "type": "NotAcceptable",
+            "available": available_media_types()
+        }
+    )
+
+
+def available_media_types() -> list:
+    media_types = [JSON_MEDIA_TYPE]
+    if msgpack is not None:
+        media_types.append(MSGPACK_MEDIA_TYPE)
+    if pa is not None:
+        media_types.append(ARROW_MEDIA_TYPE)
+    return media_types
+
+
+def render(result: dict, response_format: str = "json") -> Response:
+    """Serialise a parse result in the negotiated format."""
+    if response_format == "msgpack":
+        content, media_type = dumps_msgpack(result), MSGPACK_MEDIA_TYPE
+    elif response_format == "arrow":
+        content, media_type = dumps_arrow(result), ARROW_MEDIA_TYPE
+    else:
+        content, media_type = dumps_json(result), JSON_MEDIA_TYPE
+    return Response(content=content, media_type=media_type, headers={"Vary": "Accept"})
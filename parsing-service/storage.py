@@ -0,0 +1,48 @@
+import os
+
+import httpx
+from loguru import logger
+
+import config
+from exceptions import DocumentCorruptedError
+from ingest import SpooledDocument, spool_file, spool_stream
+
+
+async def load_document(file_path: str, doc_type: str = None) -> SpooledDocument:
+    """Fetch an uploaded document by its storage path.
+
+    Streams from the Supabase Storage bucket into a temp file when
+    credentials are configured and reads from ``DOCUMENT_ROOT`` on the
+    local filesystem otherwise. With neither configured no document can
+    be loaded, and paths never resolve outside ``DOCUMENT_ROOT``.
+    """
+    if config.SUPABASE_URL and config.SUPABASE_SERVICE_ROLE_KEY:
+        url = f"{config.SUPABASE_URL.rstrip('/')}/storage/v1/object/{config.STORAGE_BUCKET}/{file_path.lstrip('/')}"
+        headers = {"Authorization": f"Bearer {config.SUPABASE_SERVICE_ROLE_KEY}"}
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            async with client.stream("GET", url, headers=headers) as response:
+                if response.status_code != 200:
+                    logger.error(f"Failed to download {file_path}: HTTP {response.status_code}")
+                    raise DocumentCorruptedError(
+                        "Failed to download document from storage",
+                        document_type=doc_type,
+                        details={"file_path": file_path, "status": response.status_code}
+                    )
+                return await spool_stream(response.aiter_bytes(config.UPLOAD_CHUNK_BYTES), doc_type)
+
+    if not config.DOCUMENT_ROOT:
+        logger.error(f"Cannot load {file_path}: neither Supabase nor DOCUMENT_ROOT is configured")
+        raise DocumentCorruptedError(
+            "Document storage is not configured",
+            document_type=doc_type,
+            details={"file_path": file_path}
+        )
+    root = os.path.realpath(config.DOCUMENT_ROOT)
+    path = os.path.realpath(os.path.join(root, file_path.lstrip("/")))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        raise DocumentCorruptedError(
+            "Document not found in storage",
+            document_type=doc_type,
+            details={"file_path": file_path}
+        )
+    return await spool_file(path, doc_type)
@@ -0,0 +1,59 @@
+import os
+
+# Settings are read when config is imported, so they are set first: parse
+# on threads (no worker processes to spawn), keep the parse cache and the
+# job store in memory, and never write metric files.
+os.environ.setdefault("PARSER_EXECUTOR", "thread")
+os.environ.setdefault("PARSER_WORKERS", "2")
+os.environ["PARSE_CACHE_MEMORY_BYTES"] = "0"
+os.environ["PARSE_CACHE_DIR"] = ""
+os.environ["JOB_STORE_URL"] = "memory://"
+os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+os.environ.pop("prometheus_multiproc_dir", None)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from benchmarks.corpus import build, get_fixtures
+
+
+@pytest.fixture(scope="session")
+def client():
+    """The app with its startup and shutdown handlers run."""
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def pdf_bytes() -> bytes:
+    """Five pages with a table on every other page and two images."""
+    return build(get_fixtures(["pdf-small"])[0])
+
+
+@pytest.fixture(scope="session")
+def docx_bytes() -> bytes:
+    return build(get_fixtures(["docx-small"])[0])
+
+
+@pytest.fixture(scope="session")
+def pptx_bytes() -> bytes:
+    """Ten slides, two of them with a table."""
+    return build(get_fixtures(["pptx-small"])[0])
+
+
+@pytest.fixture
+def corrupt_pdf_bytes() -> bytes:
+    """A PDF header followed by garbage."""
+    return b"%PDF-1.7\n" + bytes(range(256)) * 8
+
+
+@pytest.fixture
+def write_file(tmp_path):
+    """Write bytes to a file in the test's temporary directory and return its path."""
+    def write(name: str, data: bytes) -> str:
+        path = tmp_path / name
+        path.write_bytes(data)
+        return str(path)
+    return write
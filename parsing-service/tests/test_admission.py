@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController
+from benchmarks.corpus import MIME_TYPES
+from exceptions import AdmissionQueueFullError, ServiceOverloadedError
+
+MB = 1024 * 1024
+
+
+async def settle():
+    """Let woken waiters run."""
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+class TestAdmissionController:
+    async def test_admits_while_within_limits(self):
+        admission = AdmissionController(max_jobs=2, max_bytes=10 * MB)
+        await admission.acquire(4 * MB)
+        await admission.acquire(4 * MB)
+        assert (admission.jobs, admission.bytes, admission.waiting) == (2, 8 * MB, 0)
+        admission.release(4 * MB)
+        admission.release(4 * MB)
+        assert (admission.jobs, admission.bytes) == (0, 0)
+
+    async def test_bytes_limit_queues_until_release(self):
+        admission = AdmissionController(max_jobs=4, max_bytes=10 * MB)
+        await admission.acquire(8 * MB)
+        waiter = asyncio.create_task(admission.acquire(4 * MB))
+        await settle()
+        assert not waiter.done() and admission.waiting == 1
+        admission.release(8 * MB)
+        await waiter
+        assert (admission.jobs, admission.bytes) == (1, 4 * MB)
+
+    async def test_oversized_document_runs_alone(self):
+        admission = AdmissionController(max_jobs=4, max_bytes=MB)
+        await admission.acquire(5 * MB)
+        assert admission.jobs == 1
+
+    async def test_queue_full_is_429(self):
+        admission = AdmissionController(max_jobs=1, max_queue=1, max_wait=5)
+        await admission.acquire(1)
+        waiter = asyncio.create_task(admission.acquire(1))
+        await settle()
+        with pytest.raises(AdmissionQueueFullError) as excinfo:
+            await admission.acquire(1, "pdf")
+        assert excinfo.value.status_code == 429
+        assert excinfo.value.details["waiting"] == 1
+        assert excinfo.value.headers() == {"Retry-After": "2"}
+        admission.release(1)
+        await waiter
+
+    async def test_wait_timeout_is_503(self):
+        admission = AdmissionController(max_jobs=1, max_queue=5, max_wait=0.05)
+        await admission.acquire(1)
+        with pytest.raises(ServiceOverloadedError) as excinfo:
+            await admission.acquire(1)
+        assert excinfo.value.status_code == 503
+        assert int(excinfo.value.headers()["Retry-After"]) >= 1
+        assert admission.waiting == 0 and admission.jobs == 1
+
+    async def test_small_documents_overtake_large_ones(self):
+        admission = AdmissionController(max_jobs=1, seconds_per_mb=1.0, max_wait=5)
+        await admission.acquire(1)
+        order = []
+
+        async def parse(name, size):
+            await admission.acquire(size)
+            order.append(name)
+
+        large = asyncio.create_task(parse("large", 50 * MB))
+        await settle()
+        small = asyncio.create_task(parse("small", 1024))
+        await settle()
+        admission.release(1)
+        await small
+        admission.release(1024)
+        await large
+        assert order == ["small", "large"]
+
+    async def test_fifo_without_size_priority(self):
+        admission = AdmissionController(max_jobs=1, seconds_per_mb=0, max_wait=5)
+        await admission.acquire(1)
+        large = asyncio.create_task(admission.acquire(50 * MB))
+        await settle()
+        small = asyncio.create_task(admission.acquire(1024))
+        await settle()
+        admission.release(1)
+        await large
+        assert not small.done()
+        admission.release(50 * MB)
+        await small
+
+    async def test_unbounded_callers_are_never_rejected(self):
+        admission = AdmissionController(max_jobs=1, max_queue=0, max_wait=0.01)
+        await admission.acquire(1)
+        waiter = asyncio.create_task(admission.acquire(1, bounded=False))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        admission.release(1)
+        await waiter
+
+    async def test_cancelled_waiter_leaves_the_queue(self):
+        admission = AdmissionController(max_jobs=1, max_wait=5)
+        await admission.acquire(1)
+        waiter = asyncio.create_task(admission.acquire(1))
+        await settle()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert admission.waiting == 0
+        admission.release(1)
+        assert admission.jobs == 0
+
+    async def test_admit_releases_after_the_block(self):
+        admission = AdmissionController(max_jobs=1)
+        async with admission.admit(MB):
+            assert admission.jobs == 1
+        assert (admission.jobs, admission.bytes) == (0, 0)
+
+
+class TestEndpoint:
+    def test_saturated_service_answers_429(self, client, monkeypatch, pdf_bytes):
+        import main
+
+        admission = AdmissionController(max_jobs=1, max_queue=0)
+        admission.jobs = 1
+        monkeypatch.setattr(main, "admission", admission)
+        response = client.post("/parse", files={"file": ("report.pdf", pdf_bytes, MIME_TYPES["pdf"])})
+        assert response.status_code == 429
+        assert response.json()["detail"]["type"] == "AdmissionQueueFullError"
+        assert response.headers["retry-after"] == "1"
@@ -0,0 +1,134 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+from benchmarks.corpus import MIME_TYPES
+from executor import ParseExecutor
+
+PDF_TYPE, DOCX_TYPE, PPTX_TYPE = MIME_TYPES["pdf"], MIME_TYPES["docx"], MIME_TYPES["pptx"]
+
+
+class TestParse:
+    def test_health(self, client):
+        assert client.get("/health").json() == {"status": "healthy"}
+
+    def test_parses_pdf(self, client, pdf_bytes):
+        response = client.post("/parse", files={"file": ("report.pdf", pdf_bytes, PDF_TYPE)})
+        assert response.status_code == 200
+        result = response.json()
+        assert result["content_type"] == "pdf"
+        assert result["pages"] == 5
+        assert "Segment" in result["text"]
+
+    def test_parses_office_documents(self, client, docx_bytes, pptx_bytes):
+        docx = client.post("/parse", files={"file": ("memo.docx", docx_bytes, DOCX_TYPE)}).json()
+        pptx = client.post("/parse", files={"file": ("deck.pptx", pptx_bytes, PPTX_TYPE)}).json()
+        assert docx["content_type"] == "docx" and docx["text"].startswith("Section 1")
+        assert pptx["content_type"] == "pptx" and pptx["total_slides"] == 10
+
+    def test_corrupt_pdf_is_a_client_error(self, client, corrupt_pdf_bytes):
+        response = client.post("/parse", files={"file": ("broken.pdf", corrupt_pdf_bytes, PDF_TYPE)})
+        assert response.status_code == 400
+        assert response.json()["detail"]["type"] == "DocumentCorruptedError"
+
+
+@pytest.fixture(scope="class")
+def process_executor():
+    """Two spawned parser processes; the thread executor never splits PDFs."""
+    executor = ParseExecutor(mode="process", max_workers=2)
+    executor.start()
+    yield executor
+    executor.shutdown()
+
+
+class TestPageParallelParse:
+    @pytest.fixture(autouse=True)
+    def use_process_executor(self, monkeypatch, process_executor):
+        import main
+
+        monkeypatch.setattr(main, "parse_executor", process_executor)
+        monkeypatch.setattr("config.PDF_PARALLEL_MIN_PAGES", 2)
+
+    def test_split_parse_matches_single_pass(self, client, monkeypatch, pdf_bytes):
+        files = {"file": ("report.pdf", pdf_bytes, PDF_TYPE)}
+        split = client.post("/parse", files=files, params={"normalize": True})
+        monkeypatch.setattr("config.PDF_PARALLEL_MIN_PAGES", 0)
+        whole = client.post("/parse", files=files, params={"normalize": True})
+        assert split.status_code == whole.status_code == 200
+        assert split.json() == whole.json()
+
+    def test_corrupt_pdf_is_a_client_error(self, client, corrupt_pdf_bytes):
+        response = client.post("/parse", files={"file": ("broken.pdf", corrupt_pdf_bytes, PDF_TYPE)})
+        assert response.status_code == 400
+        assert response.json()["detail"]["type"] == "DocumentCorruptedError"
+
+
+def ndjson(response) -> list:
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+class TestStreaming:
+    def test_streams_one_record_per_page(self, client, pdf_bytes):
+        response = client.post("/parse", files={"file": ("report.pdf", pdf_bytes, PDF_TYPE)}, params={"stream": True})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        records = ndjson(response)
+        assert records[0]["type"] == "document" and records[0]["pages"] == 5
+        assert [record["page"] for record in records[1:]] == [1, 2, 3, 4, 5]
+        assert sum(len(record["tables"]) for record in records[1:]) == 2
+
+    def test_accept_header_selects_streaming(self, client, pptx_bytes):
+        response = client.post(
+            "/parse",
+            files={"file": ("deck.pptx", pptx_bytes, PPTX_TYPE)},
+            headers={"Accept": "application/x-ndjson"}
+        )
+        records = ndjson(response)
+        assert records[0]["total_slides"] == 10
+        assert [record["number"] for record in records if record["type"] == "slide"] == list(range(1, 11))
+
+    def test_open_failure_is_an_http_error(self, client, corrupt_pdf_bytes):
+        response = client.post(
+            "/parse", files={"file": ("broken.pdf", corrupt_pdf_bytes, PDF_TYPE)}, params={"stream": True}
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"]["type"] == "DocumentCorruptedError"
+
+
+class TestBatch:
+    def test_reports_each_file_in_upload_order(self, client, pdf_bytes, docx_bytes, pptx_bytes, corrupt_pdf_bytes):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("decks/deck.pptx", pptx_bytes)
+            zf.writestr("notes.txt", "not a document")
+        files = [
+            ("files", ("report.pdf", pdf_bytes, PDF_TYPE)),
+            ("files", ("broken.pdf", corrupt_pdf_bytes, PDF_TYPE)),
+            ("files", ("bundle.zip", archive.getvalue(), "application/zip")),
+            ("files", ("memo.docx", docx_bytes, DOCX_TYPE)),
+        ]
+        response = client.post("/parse/batch", files=files, params={"fields": "text"})
+        assert response.status_code == 200
+        body = response.json()
+        results = body["results"]
+        assert [(result["filename"], result["status"]) for result in results] == [
+            ("report.pdf", "success"),
+            ("broken.pdf", "error"),
+            ("bundle.zip/decks/deck.pptx", "success"),
+            ("bundle.zip/notes.txt", "error"),
+            ("memo.docx", "success"),
+        ]
+        assert results[0]["result"]["pages"] == 5 and "tables" not in results[0]["result"]
+        assert results[1]["status_code"] == 400 and results[1]["error"]["type"] == "DocumentCorruptedError"
+        assert results[2]["document_type"] == "pptx"
+        assert results[3]["error"]["type"] == "DocumentTypeError"
+        assert body["summary"]["total"] == 5
+        assert body["summary"]["succeeded"] == 3 and body["summary"]["failed"] == 2
+
+    def test_too_many_files(self, client, monkeypatch, pdf_bytes):
+        monkeypatch.setattr("config.BATCH_MAX_FILES", 1)
+        files = [("files", (f"{i}.pdf", pdf_bytes, PDF_TYPE)) for i in range(2)]
+        response = client.post("/parse/batch", files=files)
+        assert response.status_code == 413
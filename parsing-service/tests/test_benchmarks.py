@@ -0,0 +1,79 @@
+import dataclasses
+import json
+
+import pytest
+
+from benchmarks import suite
+from benchmarks.corpus import CORPUS, Fixture, build, get_fixtures, write_corpus
+from parsers import sniff_document_type
+
+
+def case(p95: float, peak_alloc_bytes: int = 1000) -> dict:
+    return {"p95": p95, "peak_alloc_bytes": peak_alloc_bytes}
+
+
+class TestCorpus:
+    @pytest.mark.parametrize("name", ["pdf-small", "docx-small", "pptx-small"])
+    def test_builds_are_reproducible(self, name):
+        fixture, = get_fixtures([name])
+        assert build(fixture) == build(fixture)
+        assert build(fixture) != build(dataclasses.replace(fixture, seed=1))
+
+    def test_get_fixtures(self):
+        assert get_fixtures() == list(CORPUS)
+        assert {fixture.document_type for fixture in get_fixtures(document_type="pptx")} == {"pptx"}
+        assert [fixture.name for fixture in get_fixtures(["pptx-small", "pdf-small"])] == ["pptx-small", "pdf-small"]
+        with pytest.raises(ValueError):
+            get_fixtures(["pdf-small"], document_type="docx")
+
+    def test_tables_and_images_are_spread_over_pages(self):
+        fixture = Fixture("f", "pdf", pages=8, tables=0.25, images=3)
+        assert [fixture.tables_on(page) for page in range(8)] == [0, 0, 0, 1, 0, 0, 0, 1]
+        assert sum(fixture.images_on(page) for page in range(8)) == 3
+
+    def test_write_corpus(self, tmp_path):
+        paths = write_corpus(str(tmp_path / "corpus"), get_fixtures(["docx-small", "pptx-small"]))
+        assert [sniff_document_type(path) for path in paths] == ["docx", "pptx"]
+
+
+class TestSuite:
+    def test_percentile(self):
+        assert suite.percentile([4.0, 1.0, 3.0, 2.0], 0.5) == 2.5
+        assert suite.percentile([1.0, 2.0], 0.99) == pytest.approx(1.99)
+        assert suite.percentile([5.0], 0.95) == 5.0
+
+    def test_regressions(self):
+        previous = {"cases": {"a/direct": case(0.100), "b/direct": case(0.001), "c/direct": case(0.1, 1000)}}
+        cases = {
+            "a/direct": case(0.150),
+            "b/direct": case(0.002),  # doubled, but within the noise floor
+            "c/direct": case(0.1, 1500),
+            "new/direct": case(1.0),
+        }
+        found = suite.regressions(cases, previous, threshold=0.2)
+        assert [line.split(":")[0] for line in found] == ["a/direct", "c/direct"]
+        assert suite.regressions(cases, None, threshold=0.2) == []
+
+    def test_load_previous_matches_host(self, tmp_path):
+        history = tmp_path / "history.jsonl"
+        history.write_text("\n".join(json.dumps(record) for record in [
+            {"host": "a", "run": 1}, {"host": "b", "run": 2}, {"host": "a", "run": 3}
+        ]) + "\n")
+        assert suite.load_previous(str(history), "a")["run"] == 3
+        assert suite.load_previous(str(history), "c") is None
+        assert suite.load_previous(str(tmp_path / "missing.jsonl"), "a") is None
+
+    def test_run_records_history_and_compares(self, monkeypatch, tmp_path, capsys):
+        history = tmp_path / "cache" / "history.jsonl"
+        argv = [
+            "suite", "--fixture", "pdf-small", "--mode", "direct",
+            "--iterations", "2", "--warmup", "0", "--history", str(history), "--threshold", "100"
+        ]
+        monkeypatch.setattr("sys.argv", argv)
+        assert suite.main() == 0
+        assert suite.main() == 0
+        runs = [json.loads(line) for line in history.read_text().splitlines()]
+        assert len(runs) == 2 and list(runs[1]["cases"]) == ["pdf-small/direct"]
+        result = runs[1]["cases"]["pdf-small/direct"]
+        assert result["iterations"] == 2 and result["p50"] <= result["p95"] <= result["p99"]
+        assert "Comparing with the run of" in capsys.readouterr().out
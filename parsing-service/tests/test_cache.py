@@ -0,0 +1,79 @@
+import pytest
+
+from benchmarks.corpus import MIME_TYPES
+from cache import ParseResultCache
+from parsers import PARSER_VERSION, ParseOptions, parse_fields
+
+DIGEST = "ab" * 32
+
+
+@pytest.mark.asyncio
+class TestParseResultCache:
+    async def test_disabled_without_tiers(self):
+        cache = ParseResultCache(memory_bytes=0, directory="")
+        assert not cache.enabled
+
+    async def test_key_covers_type_version_and_options(self):
+        key = ParseResultCache.key_for(DIGEST, "pdf", ParseOptions())
+        assert key.startswith(f"pdf-v{PARSER_VERSION}-{DIGEST}-")
+        assert key != ParseResultCache.key_for(DIGEST, "docx", ParseOptions())
+        assert key != ParseResultCache.key_for(DIGEST, "pdf", ParseOptions(fields=parse_fields("text")))
+        assert key == ParseResultCache.key_for(DIGEST, "pdf", ParseOptions())
+
+    async def test_hits_are_copies(self):
+        cache = ParseResultCache(memory_bytes=1024 * 1024, directory="")
+        await cache.put("key", {"text": "hello", "tables": []})
+        hit = await cache.get("key")
+        hit["tables"].append(["changed"])
+        assert await cache.get("key") == {"text": "hello", "tables": []}
+        assert await cache.get("other") is None
+
+    async def test_memory_tier_evicts_least_recently_used(self):
+        cache = ParseResultCache(memory_bytes=100, directory="")
+        await cache.put("a", {"text": "a" * 30})
+        await cache.put("b", {"text": "b" * 30})
+        await cache.get("a")
+        await cache.put("c", {"text": "c" * 30})
+        assert await cache.get("b") is None
+        assert await cache.get("a") is not None and await cache.get("c") is not None
+        assert cache.memory.size <= 100
+
+    async def test_disk_tier_survives_restart(self, tmp_path):
+        first = ParseResultCache(memory_bytes=1024, directory=str(tmp_path))
+        await first.put("key", {"text": "on disk"})
+        second = ParseResultCache(memory_bytes=1024, directory=str(tmp_path))
+        assert second.memory.get("key") is None
+        assert await second.get("key") == {"text": "on disk"}
+        # A disk hit is promoted into memory
+        assert second.memory.get("key") is not None
+
+    async def test_disk_tier_evicts_by_size(self, tmp_path):
+        cache = ParseResultCache(memory_bytes=0, directory=str(tmp_path), disk_bytes=100)
+        for key in "abc":
+            await cache.put(key, {"text": key * 30})
+        assert cache.disk.size <= 100
+        assert await cache.get("a") is None
+        assert await cache.get("c") == {"text": "c" * 30}
+
+
+def test_repeat_upload_is_served_from_cache(client, monkeypatch, pdf_bytes):
+    import main
+
+    calls = []
+    run_parser = main._run_parser
+
+    async def counting_run_parser(*args):
+        calls.append(args)
+        return await run_parser(*args)
+
+    monkeypatch.setattr(main, "parse_cache", ParseResultCache(memory_bytes=16 * 1024 * 1024, directory=""))
+    monkeypatch.setattr(main, "_run_parser", counting_run_parser)
+    files = {"file": ("report.pdf", pdf_bytes, MIME_TYPES["pdf"])}
+    first = client.post("/parse", files=files)
+    second = client.post("/parse", files=files)
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert len(calls) == 1
+    # Different options are a different cache entry
+    client.post("/parse", files=files, params={"fields": "text"})
+    assert len(calls) == 2
@@ -0,0 +1,104 @@
+import asyncio
+import functools
+import threading
+import time
+
+import pytest
+
+from exceptions import ParsingTimeoutError, ServiceOverloadedError
+from executor import ParseExecutor
+from parsers import ParseOptions, parse_pdf
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestParseExecutor:
+    async def test_runs_job_on_thread_pool(self):
+        executor = ParseExecutor(mode="thread", max_workers=1)
+        try:
+            assert await executor.run(sum, [1, 2, 3]) == 6
+            assert executor.in_flight == 0
+        finally:
+            executor.shutdown()
+
+    async def test_rejects_jobs_beyond_capacity(self):
+        executor = ParseExecutor(mode="thread", max_workers=1, max_queue=0)
+        release = threading.Event()
+        try:
+            running = asyncio.create_task(executor.run(release.wait, 5))
+            await asyncio.sleep(0.05)
+            with pytest.raises(ServiceOverloadedError) as excinfo:
+                await executor.run(sum, [1])
+            assert excinfo.value.status_code == 503
+            assert excinfo.value.headers() == {"Retry-After": "1"}
+            release.set()
+            assert await running is True
+        finally:
+            release.set()
+            executor.shutdown()
+
+    async def test_job_timeout(self):
+        executor = ParseExecutor(mode="thread", max_workers=1, job_timeout=0.05)
+        release = threading.Event()
+        try:
+            with pytest.raises(ParsingTimeoutError) as excinfo:
+                await executor.run(release.wait, 5, document_type="pdf")
+            assert excinfo.value.status_code == 504
+            assert executor.in_flight == 0
+        finally:
+            release.set()
+            executor.shutdown()
+
+    async def test_process_pool_parses_document(self, pdf_bytes, write_file):
+        path = write_file("doc.pdf", pdf_bytes)
+        executor = ParseExecutor(mode="process", max_workers=1)
+        try:
+            result = await executor.run(functools.partial(parse_pdf, path, ParseOptions()), document_type="pdf")
+        finally:
+            executor.shutdown()
+        assert result == parse_pdf(path, ParseOptions())
+
+    async def test_queue_wait_does_not_count_towards_the_timeout(self):
+        executor = ParseExecutor(mode="process", max_workers=1, job_timeout=1)
+        try:
+            await executor.run(time.sleep, 0)  # start the worker
+            # Each job is within the limit, together they are well over it
+            results = await asyncio.gather(*[executor.run(time.sleep, 0.4) for _ in range(4)])
+        finally:
+            executor.shutdown()
+        assert results == [None] * 4
+
+    async def test_timeout_only_fails_the_runaway_job(self):
+        executor = ParseExecutor(mode="process", max_workers=1, job_timeout=1)
+        try:
+            await executor.run(time.sleep, 0)
+            runaway = asyncio.create_task(executor.run(time.sleep, 30))
+            await asyncio.sleep(0.2)
+            queued = [asyncio.create_task(executor.run(time.sleep, 0.1)) for _ in range(3)]
+            with pytest.raises(ParsingTimeoutError):
+                await runaway
+            # Jobs queued behind it move to the new pool
+            assert await asyncio.gather(*queued) == [None] * 3
+        finally:
+            executor.shutdown()
+
+    async def test_recycle_lets_running_jobs_finish(self):
+        executor = ParseExecutor(mode="process", max_workers=2, job_timeout=1)
+        try:
+            await asyncio.gather(executor.run(time.sleep, 0.2), executor.run(time.sleep, 0.2))
+            old_pool = executor._pool
+            workers = list(old_pool._processes.values())
+            runaway = asyncio.create_task(executor.run(time.sleep, 30))
+            await asyncio.sleep(0.5)
+            running = asyncio.create_task(executor.run(time.sleep, 0.8))
+            with pytest.raises(ParsingTimeoutError):
+                await runaway
+            assert executor._pool is not old_pool
+            assert all(process.is_alive() for process in workers)
+            assert await running is None
+            # The last caller has left the old pool: its workers go
+            for process in workers:
+                process.join(5)
+                assert not process.is_alive()
+        finally:
+            executor.shutdown()
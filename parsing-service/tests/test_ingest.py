@@ -0,0 +1,136 @@
+import functools
+import hashlib
+import io
+import os
+import tempfile
+
+import pytest
+from fastapi import FastAPI, Request, UploadFile
+from fastapi.testclient import TestClient
+
+from exceptions import DocumentSizeError
+from executor import ParseExecutor
+from ingest import MULTIPART_OVERHEAD_BYTES, UploadSizeLimitMiddleware, spool_file, spool_stream, spool_upload
+
+
+async def stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.mark.asyncio
+class TestSpooling:
+    async def test_spools_chunks_to_temp_file(self, monkeypatch, tmp_path):
+        monkeypatch.setattr("config.SPOOL_DIR", str(tmp_path))
+        with await spool_stream(stream(b"%PDF-", b"1.7 body"), "pdf") as document:
+            assert os.path.dirname(document.path) == str(tmp_path)
+            assert document.size == 13
+            assert document.digest == hashlib.sha256(b"%PDF-1.7 body").hexdigest()
+            with open(document.path, "rb") as f:
+                assert f.read() == b"%PDF-1.7 body"
+        assert os.listdir(tmp_path) == []
+
+    async def test_rejects_oversize_stream_and_cleans_up(self, monkeypatch, tmp_path):
+        monkeypatch.setattr("config.SPOOL_DIR", str(tmp_path))
+        with pytest.raises(DocumentSizeError) as excinfo:
+            await spool_stream(stream(b"x" * 60, b"x" * 60), "pdf", max_bytes=100)
+        assert excinfo.value.status_code == 413
+        assert excinfo.value.details == {"size": 120}
+        assert os.listdir(tmp_path) == []
+
+    async def test_local_file_is_not_copied_or_deleted(self, write_file):
+        path = write_file("doc.pdf", b"%PDF-1.7")
+        with await spool_file(path, "pdf") as document:
+            assert document.path == path and document.size == 8
+        assert os.path.exists(path)
+        with pytest.raises(DocumentSizeError):
+            await spool_file(path, "pdf", max_bytes=4)
+
+
+def read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def starlette_upload(data: bytes) -> UploadFile:
+    """An upload as Starlette's form parser leaves it, small enough to still be in memory."""
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    spooled.write(data)
+    spooled.seek(0)
+    return UploadFile(spooled, size=len(data), filename="doc.pdf")
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc")
+class TestSpoolUpload:
+    async def test_uses_starlettes_temp_file_in_place(self, monkeypatch, tmp_path):
+        monkeypatch.setattr("config.SPOOL_DIR", str(tmp_path))
+        upload = starlette_upload(b"%PDF-1.7 body")
+        document = await spool_upload(upload, "pdf")
+        assert os.listdir(tmp_path) == []
+        assert document.size == 13 and document.digest == hashlib.sha256(b"%PDF-1.7 body").hexdigest()
+        assert read_file(document.path) == b"%PDF-1.7 body"
+        document.close()
+        assert upload.file.closed
+
+    async def test_process_workers_read_the_upload(self):
+        executor = ParseExecutor(mode="process", max_workers=1)
+        try:
+            with await spool_upload(starlette_upload(b"%PDF-1.7 body"), "pdf") as document:
+                assert await executor.run(read_file, document.path) == b"%PDF-1.7 body"
+        finally:
+            executor.shutdown()
+
+    async def test_rejects_oversize_upload(self):
+        upload = starlette_upload(b"x" * 120)
+        upload.size = None
+        with pytest.raises(DocumentSizeError):
+            await spool_upload(upload, "pdf", max_bytes=100)
+
+    async def test_copies_other_files(self, monkeypatch, tmp_path):
+        monkeypatch.setattr("config.SPOOL_DIR", str(tmp_path))
+        with await spool_upload(UploadFile(io.BytesIO(b"%PDF-1.7"), filename="doc.pdf"), "pdf") as document:
+            assert os.path.dirname(document.path) == str(tmp_path)
+            assert read_file(document.path) == b"%PDF-1.7"
+
+
+@pytest.fixture
+def limited_client():
+    app = FastAPI()
+
+    @app.post("/parse")
+    async def parse(request: Request):
+        return {"size": len(await request.body())}
+
+    app.add_middleware(UploadSizeLimitMiddleware, paths=("/parse",), max_bytes=1024)
+    return TestClient(app)
+
+
+class TestUploadSizeLimitMiddleware:
+    limit = 1024 + MULTIPART_OVERHEAD_BYTES
+
+    def test_accepts_body_within_limit(self, limited_client):
+        response = limited_client.post("/parse", content=b"x" * 1000)
+        assert response.json() == {"size": 1000}
+
+    def test_rejects_declared_content_length(self, limited_client):
+        response = limited_client.post("/parse", content=b"x" * (self.limit + 1))
+        assert response.status_code == 413
+        assert response.json()["detail"]["type"] == "DocumentSizeError"
+
+    def test_rejects_chunked_body_while_receiving(self, limited_client):
+        chunks = (b"x" * 16384 for _ in range(self.limit // 16384 + 2))
+        response = limited_client.post("/parse", content=chunks)
+        assert response.status_code == 413
+
+    def test_other_paths_are_not_limited(self, limited_client):
+        assert limited_client.post("/other", content=b"x" * (self.limit + 1)).status_code == 404
+
+
+def test_parse_rejects_oversize_upload(client, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "spool_upload", functools.partial(spool_upload, max_bytes=1024))
+    response = client.post("/parse", files={"file": ("big.pdf", b"%PDF-1.7" + b"x" * 2048, "application/pdf")})
+    assert response.status_code == 413
+    assert response.json()["detail"]["type"] == "DocumentSizeError"
@@ -0,0 +1,175 @@
+import asyncio
+import time
+
+import pytest
+
+from exceptions import DocumentCorruptedError, ServiceOverloadedError
+from jobs import InMemoryJobStore, JobRunner, JobStatus, ParseJob, SQLiteJobStore, create_job_store
+
+
+def job(upload_id: str, status: JobStatus = JobStatus.PENDING, **fields) -> ParseJob:
+    return ParseJob(upload_id, f"{upload_id}.pdf", "pdf", status=status, **fields)
+
+
+async def until_finished(store, upload_id: str, timeout: float = 5.0) -> ParseJob:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        found = await store.get(upload_id)
+        if found is not None and found.finished:
+            return found
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {upload_id} did not finish")
+
+
+@pytest.mark.asyncio
+class TestJobStores:
+    async def test_memory_store_evicts_oldest_finished_jobs(self):
+        store = InMemoryJobStore(max_finished=2)
+        for i in range(4):
+            await store.save(job(str(i), JobStatus.COMPLETED, result={"text": str(i)}))
+        await store.save(job("pending"))
+        assert await store.get("0") is None and await store.get("1") is None
+        assert (await store.get("3")).result == {"text": "3"}
+        assert [found.upload_id for found in await store.unfinished()] == ["pending"]
+
+    async def test_memory_store_expires_finished_jobs(self):
+        store = InMemoryJobStore(ttl=0)
+        await store.save(job("done", JobStatus.COMPLETED))
+        await asyncio.sleep(0.01)
+        assert await store.get("done") is None
+        await store.save(job("next"))
+        assert list(store._jobs) == ["next"]
+
+    async def test_sqlite_store_round_trip(self, tmp_path):
+        store = SQLiteJobStore(str(tmp_path / "jobs.db"))
+        await store.save(job("a", JobStatus.PROCESSING, started_at=1.0))
+        await store.save(job("b", JobStatus.FAILED, error={"type": "DocumentCorruptedError"}))
+        loaded = await store.get("a")
+        assert loaded.status == JobStatus.PROCESSING and loaded.started_at == 1.0
+        assert [found.upload_id for found in await store.unfinished()] == ["a"]
+        assert await store.get("missing") is None
+
+    async def test_create_job_store(self, tmp_path):
+        assert isinstance(create_job_store("memory://"), InMemoryJobStore)
+        assert isinstance(create_job_store(f"sqlite:///{tmp_path}/jobs.db"), SQLiteJobStore)
+        with pytest.raises(ValueError):
+            create_job_store("postgres://localhost/jobs")
+
+
+@pytest.mark.asyncio
+class TestJobRunner:
+    async def test_completes_and_fails_jobs(self):
+        async def handler(parse_job):
+            if parse_job.upload_id == "bad":
+                raise DocumentCorruptedError("Failed to parse PDF document", document_type="pdf")
+            return {"text": parse_job.upload_id}
+
+        runner = JobRunner(InMemoryJobStore(), handler, concurrency=2)
+        runner.start()
+        try:
+            await runner.submit(job("good"))
+            await runner.submit(job("bad"))
+            good = await until_finished(runner.store, "good")
+            bad = await until_finished(runner.store, "bad")
+        finally:
+            await runner.stop()
+        assert good.status == JobStatus.COMPLETED and good.result == {"text": "good"}
+        assert bad.status == JobStatus.FAILED and bad.error["type"] == "DocumentCorruptedError"
+
+    async def test_resubmitting_unfinished_job_returns_it(self):
+        runner = JobRunner(InMemoryJobStore(), None)
+        first = await runner.submit(job("a", user_id="first"))
+        again = await runner.submit(job("a", user_id="second"))
+        assert again.user_id == first.user_id == "first"
+
+    async def test_stale_job_is_replaced(self):
+        runner = JobRunner(InMemoryJobStore(), None, stale_after=10)
+        await runner.store.save(job("a", JobStatus.PROCESSING, user_id="lost", started_at=time.time() - 60))
+        replaced = await runner.submit(job("a", user_id="retry"))
+        assert replaced.user_id == "retry" and replaced.status == JobStatus.PENDING
+
+    async def test_rejects_jobs_when_queue_is_full(self):
+        runner = JobRunner(InMemoryJobStore(), None, queue_size=1)
+        await runner.submit(job("a"))
+        with pytest.raises(ServiceOverloadedError):
+            await runner.submit(job("b"))
+
+    async def test_recovers_unfinished_jobs_after_restart(self, tmp_path):
+        path = str(tmp_path / "jobs.db")
+        store = SQLiteJobStore(path)
+        await store.save(job("queued"))
+        await store.save(job("running", JobStatus.PROCESSING, started_at=time.time()))
+
+        async def handler(parse_job):
+            return {"text": "parsed"}
+
+        runner = JobRunner(SQLiteJobStore(path), handler)
+        runner.start()
+        try:
+            queued = await until_finished(runner.store, "queued")
+            running = await until_finished(runner.store, "running")
+        finally:
+            await runner.stop()
+        assert queued.status == JobStatus.COMPLETED and queued.result == {"text": "parsed"}
+        assert running.status == JobStatus.FAILED and running.error["type"] == "JobInterruptedError"
+
+
+def wait_for_status(client, upload_id: str, timeout: float = 10.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(f"/status/{upload_id}").json()
+        if status["status"] in ("completed", "failed"):
+            return status
+        time.sleep(0.02)
+    raise AssertionError(f"job {upload_id} did not finish")
+
+
+class TestParseDocumentEndpoint:
+    def submit(self, client, upload_id: str, file_path: str):
+        return client.post("/parse-document", json={
+            "upload_id": upload_id,
+            "file_path": file_path,
+            "file_type": "application/pdf",
+            "user_id": "user-1"
+        })
+
+    def test_parses_stored_document(self, client, monkeypatch, tmp_path, pdf_bytes):
+        (tmp_path / "uploads").mkdir()
+        (tmp_path / "uploads" / "report.pdf").write_bytes(pdf_bytes)
+        monkeypatch.setattr("config.DOCUMENT_ROOT", str(tmp_path))
+
+        response = self.submit(client, "upload-ok", "uploads/report.pdf")
+        assert response.status_code == 202
+        assert response.json()["status"] == "processing"
+        status = wait_for_status(client, "upload-ok")
+        assert status["status"] == "completed" and "result" not in status
+        result = client.get("/result/upload-ok").json()
+        assert result["content_type"] == "pdf" and result["pages"] == 5
+
+    def test_local_storage_is_disabled_by_default(self, client, monkeypatch):
+        monkeypatch.setattr("config.DOCUMENT_ROOT", "")
+        self.submit(client, "upload-unconfigured", "report.pdf")
+        status = wait_for_status(client, "upload-unconfigured")
+        assert status["status"] == "failed"
+        assert status["error"]["error"] == "Document storage is not configured"
+        assert client.get("/result/upload-unconfigured").status_code == 422
+
+    def test_paths_cannot_leave_document_root(self, client, monkeypatch, tmp_path, pdf_bytes):
+        (tmp_path / "outside.pdf").write_bytes(pdf_bytes)
+        (tmp_path / "root").mkdir()
+        monkeypatch.setattr("config.DOCUMENT_ROOT", str(tmp_path / "root"))
+        self.submit(client, "upload-escape", "../outside.pdf")
+        status = wait_for_status(client, "upload-escape")
+        assert status["status"] == "failed"
+        assert status["error"]["error"] == "Document not found in storage"
+
+    def test_unknown_upload(self, client):
+        assert client.get("/status/missing").status_code == 404
+        assert client.get("/result/missing").status_code == 404
+
+    def test_unsupported_file_type(self, client):
+        response = client.post("/parse-document", json={
+            "upload_id": "upload-type", "file_path": "notes.txt", "file_type": "text/plain"
+        })
+        assert response.status_code == 400
+        assert response.json()["detail"]["type"] == "DocumentTypeError"
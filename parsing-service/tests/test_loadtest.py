@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+import functools
+import random
+
+import httpx
+import pytest
+
+from benchmarks import loadtest
+from benchmarks.loadtest import EndpointStats, MetricsTimeline, load_mix, open_loop
+
+pytestmark = pytest.mark.asyncio
+
+METRICS = """
+# TYPE documents_processed_total counter
+documents_processed_total{{document_type="pdf",status="success"}} {success}
+documents_processed_total{{document_type="docx",status="error"}} {errors}
+# TYPE parse_stage_seconds histogram
+parse_stage_seconds_sum{{stage="open",document_type="pdf"}} {open_sum}
+parse_stage_seconds_count{{stage="open",document_type="pdf"}} {open_count}
+# TYPE parser_pool_busy_workers gauge
+parser_pool_busy_workers {busy}
+"""
+
+
+def scrape(success=0, errors=0, open_sum=0.0, open_count=0, busy=0) -> str:
+    return METRICS.format(success=success, errors=errors, open_sum=open_sum, open_count=open_count, busy=busy)
+
+
+class TestEndpointStats:
+    async def test_rejections_are_not_errors(self):
+        stats = EndpointStats("/parse")
+        for latency, outcome in [(0.02, "200"), (0.2, "200"), (0.03, "429"), (0.04, "503"), (40.0, "ReadTimeout")]:
+            stats.record(latency, outcome)
+        summary = stats.summary(duration=10)
+        assert (summary["sent"], summary["rejected"], summary["errors"]) == (5, 2, 1)
+        assert summary["rate"] == 0.5 and summary["error_rate"] == 0.2
+        assert summary["max"] == 40.0
+        histogram = summary["histogram"]
+        assert (histogram["0.025"], histogram["0.05"], histogram["0.25"], histogram["60"]) == (1, 2, 1, 1)
+        assert sum(histogram.values()) == 5
+
+    async def test_no_requests(self):
+        summary = EndpointStats("/health").summary(duration=0)
+        assert summary["rate"] == 0.0 and "p99" not in summary
+
+
+class TestMix:
+    async def test_corpus_fixtures_with_weights(self):
+        documents, weights = load_mix("pdf-small=3, docx-small", [])
+        assert [document.filename for document in documents] == ["pdf-small.pdf", "docx-small.docx"]
+        assert weights == [3.0, 1.0] and documents[0].data.startswith(b"%PDF")
+
+    async def test_files_replace_the_mix(self, write_file, pdf_bytes):
+        documents, weights = load_mix("pdf-small=3", [write_file("report.pdf", pdf_bytes)])
+        assert [(document.filename, document.mime_type) for document in documents] == [("report.pdf", "application/pdf")]
+        assert weights == [1.0]
+
+
+class TestMetricsTimeline:
+    async def test_deltas_means_and_peaks(self):
+        timeline = MetricsTimeline()
+        timeline.add(0, scrape(success=5, errors=1, open_sum=1.0, open_count=10, busy=1))
+        timeline.add(5, scrape(success=9, errors=1, open_sum=1.5, open_count=20, busy=4))
+        timeline.add(10, scrape(success=15, errors=3, open_sum=2.0, open_count=30, busy=2))
+        summary = timeline.summary()
+        assert summary["documents"] == {"success": 10.0, "error": 2.0}
+        assert summary["mean_stage_seconds"] == {"open": pytest.approx(0.05)}
+        assert summary["peaks"]["parser_pool_busy_workers"] == 4
+        assert summary["peaks"]["parser_worker_processes"] is None
+
+    async def test_one_scrape_has_no_deltas(self):
+        timeline = MetricsTimeline()
+        timeline.add(0, scrape(success=5))
+        assert timeline.delta("documents_processed_total") == {}
+
+
+class TestOpenLoop:
+    async def test_sends_on_schedule(self):
+        sent = []
+
+        async def send():
+            sent.append(1)
+
+        await open_loop(40, 0.21, send, EndpointStats("/parse"), 8, False, random.Random(0))
+        assert len(sent) == 8  # every 25 ms from the first interval on
+
+    async def test_drops_sends_beyond_max_outstanding(self):
+        stats = EndpointStats("/parse")
+        release = asyncio.Event()
+
+        async def send():
+            await release.wait()
+
+        asyncio.get_running_loop().call_later(0.15, release.set)
+        await open_loop(100, 0.105, send, stats, 2, False, random.Random(0))
+        assert stats.dropped == 8
+
+
+class TestRun:
+    async def test_against_the_app(self, client, monkeypatch):
+        import main
+
+        transport = httpx.ASGITransport(app=main.app)
+        monkeypatch.setattr(loadtest.httpx, "AsyncClient", functools.partial(httpx.AsyncClient, transport=transport))
+        args = argparse.Namespace(
+            url="http://service", rate=20, duration=0.32, mix="pdf-small=1,docx-small=1", doc=[], param=["fields=text"],
+            arrival="constant", health_rate=10, scrape_interval=0.1, max_outstanding=8, timeout=30, seed=0
+        )
+        result = await loadtest.run(args)
+        parse = result["endpoints"]["/parse"]
+        assert parse["sent"] == 6 and parse["statuses"] == {"200": 6}
+        assert result["endpoints"]["/health"]["errors"] == 0
+        assert result["server"]["documents"]["success"] == 6
@@ -0,0 +1,90 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+from prometheus_client import REGISTRY
+from prometheus_client.parser import text_string_to_metric_families
+
+import monitoring
+from executor import ParseExecutor
+from tracing import Trace
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def samples(exposition: bytes) -> dict:
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(exposition.decode("utf-8"))
+        for sample in family.samples
+    }
+
+
+def run_service_process(directory: str, workers: int):
+    """Record metrics from a separate service process sharing ``directory``."""
+    code = textwrap.dedent(f"""
+        import monitoring
+        monitoring.record_document_processed("pdf")
+        monitoring.update_worker_count({workers})
+    """)
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": directory}
+    subprocess.run([sys.executable, "-c", code], cwd=SERVICE_DIR, env=env, check=True)
+
+
+class TestRecordTrace:
+    def test_stage_times_and_counts(self):
+        def value(name, **labels):
+            return REGISTRY.get_sample_value(name, labels) or 0
+
+        trace = Trace()
+        trace.add("open", trace.start, 0.5)
+        trace.count("pdf", "tables", 3)
+        before = value("parse_stage_seconds_sum", stage="open", document_type="pdf")
+        tables = value("tables_extracted_total", document_type="pdf")
+        monitoring.record_trace("pdf", trace)
+        assert value("parse_stage_seconds_sum", stage="open", document_type="pdf") == before + 0.5
+        assert value("tables_extracted_total", document_type="pdf") == tables + 3
+
+
+class TestRenderMetrics:
+    def test_single_process(self, client):
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert "parsing_service_memory_bytes" in response.text
+
+    def test_aggregates_service_processes(self, monkeypatch, tmp_path):
+        directory = str(tmp_path)
+        run_service_process(directory, workers=2)
+        run_service_process(directory, workers=3)
+        monkeypatch.setattr("config.PROMETHEUS_MULTIPROC_DIR", directory)
+
+        merged = samples(monitoring.render_metrics())
+        assert merged[("documents_processed_total", (("document_type", "pdf"), ("status", "success")))] == 2
+        assert merged[("parser_worker_processes", ())] == 5
+
+        # Both processes have exited: their live gauges go, totals stay
+        monitoring.cleanup_dead_processes()
+        assert not [name for name in os.listdir(directory) if name.startswith("gauge_live")]
+        merged = samples(monitoring.render_metrics())
+        assert ("parser_worker_processes", ()) not in merged
+        assert merged[("documents_processed_total", (("document_type", "pdf"), ("status", "success")))] == 2
+
+    def test_cleanup_is_a_no_op_without_a_directory(self, monkeypatch):
+        monkeypatch.setattr("config.PROMETHEUS_MULTIPROC_DIR", "")
+        monitoring.cleanup_dead_processes()
+        monitoring.mark_process_exited()
+
+
+class TestParserWorkers:
+    @pytest.mark.asyncio
+    async def test_workers_do_not_write_metric_files(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+        executor = ParseExecutor(mode="process", max_workers=1)
+        executor.start()
+        try:
+            assert await executor.run(os.getenv, "PROMETHEUS_MULTIPROC_DIR") is None
+        finally:
+            executor.shutdown()
+        assert os.listdir(tmp_path) == []
@@ -0,0 +1,34 @@
+import time
+
+import pytest
+
+import monitoring
+from parsers import parse_docx, parse_pdf
+from tracing import run_traced
+
+
+@pytest.fixture
+def recorded(monkeypatch) -> list:
+    """Calls that reach the Prometheus extraction counters."""
+    calls = []
+    monkeypatch.setattr(monitoring, "record_extraction_metric", lambda *args: calls.append(args))
+    return calls
+
+
+class TestExtractionMetrics:
+    def test_counts_are_flushed_once_per_document(self, recorded, pdf_bytes):
+        parse_pdf(pdf_bytes)
+        assert sorted(recorded) == [("images", "pdf", 2), ("tables", "pdf", 2), ("text_chunks", "pdf", 5)]
+
+    def test_docx_paragraphs_are_flushed_once(self, recorded, docx_bytes):
+        parse_docx(docx_bytes)
+        assert [call for call in recorded if call[0] == "paragraphs"] == [("paragraphs", "docx", 105)]
+
+    def test_counts_go_to_the_trace_when_there_is_one(self, recorded, pdf_bytes):
+        _, trace = run_traced(time.time(), parse_pdf, pdf_bytes)
+        assert recorded == []
+        assert trace.counts == {("pdf", "images"): 2, ("pdf", "tables"): 2, ("pdf", "text_chunks"): 5}
+
+    def test_unknown_metric_type(self):
+        with pytest.raises(ValueError):
+            monitoring.record_extraction_metrics("pdf", {"pages": 1})
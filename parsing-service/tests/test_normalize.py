@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from benchmarks.corpus import MIME_TYPES
+from exceptions import NormalizationError
+from parsers import ParseOptions, normalize_records, normalize_result, normalize_tables, parse_pdf
+
+
+class TestNormalizeTables:
+    def test_financial_cells_are_typed(self):
+        frame, = normalize_tables([{"page": 2, "rows": [
+            ["Segment", "FY2022", "FY2023", "Growth", "Multiple"],
+            ["Retail", "$1.2M", "(3.4)", "4.1%", "3.1x"],
+            ["Total", "$1,234", "—", "(2.5%)", "n/a"],
+        ]}])
+        assert frame == {
+            "page": 2,
+            "header_rows": 1,
+            "columns": ["Segment", "FY2022", "FY2023", "Growth", "Multiple"],
+            "types": ["text", "currency", "number", "percent", "multiple"],
+            "units": [None, "USD", None, None, None],
+            "data": [["Retail", "Total"], [1200000.0, 1234.0], [-3.4, None], [0.041, -0.025], [3.1, None]],
+        }
+
+    def test_header_rows_and_column_names(self):
+        frame, = normalize_tables([[
+            ["", "Revenue", "Revenue"],
+            ["Region", "2022", "2023"],
+            ["North", "10", "12"],
+            ["South", "8", ""],
+        ]])
+        assert frame["header_rows"] == 2
+        assert frame["columns"] == ["Region", "Revenue 2022", "Revenue 2023"]
+        assert frame["data"][2] == [12.0, None]
+
+    def test_text_tables_take_one_header_row(self):
+        frame, = normalize_tables([[["Name", "Role"], ["Ada", "Engineer"], ["Grace", "Admiral"]]])
+        assert frame["header_rows"] == 1 and frame["types"] == ["text", "text"]
+        assert frame["data"] == [["Ada", "Grace"], ["Engineer", "Admiral"]]
+
+    def test_ragged_and_empty_tables(self):
+        ragged, empty = normalize_tables([[["Item", "Cost"], ["Ink", "12"], ["Paper"]], []])
+        assert ragged["data"] == [["Ink", "Paper"], [12.0, None]]
+        assert empty == {"header_rows": 0, "columns": [], "types": [], "units": [], "data": []}
+
+
+class TestNormalizeStage:
+    def test_only_on_request(self, pdf_bytes):
+        assert "normalized_tables" not in parse_pdf(pdf_bytes)
+        result = parse_pdf(pdf_bytes, ParseOptions(normalize=True))
+        assert [frame["page"] for frame in result["normalized_tables"]] == [2, 4]
+        assert result["normalized_tables"][0]["columns"] == ["Segment", "FY2022", "FY2023", "Growth", "Margin"]
+
+    def test_failure_raises_normalization_error(self, monkeypatch):
+        def normalize_tables(tables):
+            raise ValueError("bad cell")
+
+        monkeypatch.setattr("parsers.normalize.normalize_tables", normalize_tables)
+        with pytest.raises(NormalizationError) as excinfo:
+            normalize_result({"content_type": "pdf", "tables": [[["a"]]]}, ParseOptions(normalize=True))
+        assert excinfo.value.details == {"error": "bad cell"}
+
+    def test_streamed_slide_tables(self):
+        record = {"number": 1, "shapes": [
+            {"type": "text", "content": "Title"},
+            {"type": "table", "content": [["Region", "Share"], ["North", "12%"]]},
+        ]}
+        normalized, = normalize_records(iter([record]), ParseOptions(normalize=True))
+        assert "normalized" not in normalized["shapes"][0]
+        assert normalized["shapes"][1]["normalized"]["types"] == ["text", "percent"]
+
+    def test_endpoint(self, client, pdf_bytes, pptx_bytes):
+        pdf = client.post(
+            "/parse", files={"file": ("report.pdf", pdf_bytes, MIME_TYPES["pdf"])}, params={"normalize": True}
+        ).json()
+        assert len(pdf["normalized_tables"]) == len(pdf["tables"]) == 2
+        response = client.post(
+            "/parse", files={"file": ("deck.pptx", pptx_bytes, MIME_TYPES["pptx"])},
+            params={"normalize": True, "stream": True}
+        )
+        slides = [json.loads(line) for line in response.text.splitlines()]
+        tables = [shape for slide in slides for shape in slide.get("shapes", ()) if shape["type"] == "table"]
+        assert tables and all("normalized" in shape for shape in tables)
@@ -0,0 +1,110 @@
+import io
+
+import docx
+import pytest
+from docx.enum.text import WD_BREAK
+from pptx import Presentation
+from pptx.util import Inches
+
+from exceptions import DocumentCorruptedError
+from parsers import ParseOptions, parse_docx, parse_fields, parse_page_ranges, parse_pptx
+
+OPTIONS = [
+    ParseOptions(),
+    ParseOptions(fields=parse_fields("text,metadata")),
+    ParseOptions(normalize=True),
+]
+
+
+def build_docx() -> bytes:
+    """Runs, tabs and breaks, a merged table cell, a nested table and a new section."""
+    doc = docx.Document()
+    doc.core_properties.title = "Engine check"
+    doc.add_heading("Terms", level=1)
+    paragraph = doc.add_paragraph("Party A\tParty B")
+    paragraph.add_run().add_break(WD_BREAK.LINE)
+    paragraph.add_run("second line").italic = True
+    table = doc.add_table(rows=3, cols=3)
+    table.cell(0, 0).merge(table.cell(0, 1)).text = "Merged header"
+    table.cell(0, 2).text = "Total"
+    table.cell(1, 0).add_paragraph("two paragraphs")
+    table.cell(1, 1).add_table(rows=1, cols=2).cell(0, 1).text = "nested"
+    table.cell(2, 2).text = "$1.0M"
+    doc.add_section()
+    doc.add_paragraph("After the section break")
+    stream = io.BytesIO()
+    doc.save(stream)
+    return stream.getvalue()
+
+
+def build_pptx() -> bytes:
+    """A grouped shape, a table, notes and an empty slide."""
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[1])
+    slide.shapes.title.text = "Quarterly review"
+    group = slide.shapes.add_group_shape()
+    group.shapes.add_textbox(Inches(1), Inches(1), Inches(2), Inches(1)).text_frame.text = "grouped text"
+    table = slide.shapes.add_table(2, 2, Inches(1), Inches(3), Inches(4), Inches(1)).table
+    table.cell(0, 0).text = "Region"
+    table.cell(1, 1).text = "12%"
+    slide.notes_slide.notes_text_frame.text = "Speaker notes"
+    prs.slides.add_slide(prs.slide_layouts[6])
+    stream = io.BytesIO()
+    prs.save(stream)
+    return stream.getvalue()
+
+
+def both_engines(monkeypatch, setting: str, engines, parse, source, options):
+    results = []
+    for engine in engines:
+        monkeypatch.setattr(f"config.{setting}", engine)
+        results.append(parse(source, options))
+    return results
+
+
+class TestDocxEngines:
+    @pytest.mark.parametrize("options", OPTIONS)
+    def test_ooxml_matches_python_docx(self, monkeypatch, docx_bytes, options):
+        for source in (docx_bytes, build_docx()):
+            reference, fast = both_engines(
+                monkeypatch, "DOCX_ENGINE", ("python-docx", "ooxml"), parse_docx, source, options
+            )
+            assert fast == reference
+
+    def test_edge_cases_are_extracted(self, monkeypatch):
+        monkeypatch.setattr("config.DOCX_ENGINE", "ooxml")
+        result = parse_docx(build_docx())
+        assert result["metadata"]["title"] == "Engine check"
+        assert "Party A\tParty B" in result["text"] and "After the section break" in result["text"]
+        assert result["sections"] == 2
+        assert result["tables"][0][0][0] == "Merged header"
+
+    @pytest.mark.parametrize("engine", ["python-docx", "ooxml"])
+    def test_corrupt_document(self, monkeypatch, engine):
+        monkeypatch.setattr("config.DOCX_ENGINE", engine)
+        with pytest.raises(DocumentCorruptedError):
+            parse_docx(b"PK\x03\x04 not really a zip")
+
+
+class TestPptxEngines:
+    @pytest.mark.parametrize("options", OPTIONS + [ParseOptions(pages=parse_page_ranges("2,4-5"))])
+    def test_ooxml_matches_python_pptx(self, monkeypatch, pptx_bytes, options):
+        for source in (pptx_bytes, build_pptx()):
+            reference, fast = both_engines(
+                monkeypatch, "PPTX_ENGINE", ("python-pptx", "ooxml"), parse_pptx, source, options
+            )
+            assert fast == reference
+
+    def test_edge_cases_are_extracted(self, monkeypatch):
+        monkeypatch.setattr("config.PPTX_ENGINE", "ooxml")
+        result = parse_pptx(build_pptx())
+        assert result["total_slides"] == 2
+        assert result["slides"][0]["notes"] == "Speaker notes"
+        assert result["slides"][0]["shapes"][1] == {"type": "table", "content": [["Region", ""], ["", "12%"]]}
+        assert result["slides"][1] == {"number": 2, "shapes": [], "notes": ""}
+
+    @pytest.mark.parametrize("engine", ["python-pptx", "ooxml"])
+    def test_corrupt_document(self, monkeypatch, engine):
+        monkeypatch.setattr("config.PPTX_ENGINE", engine)
+        with pytest.raises(DocumentCorruptedError):
+            parse_pptx(b"PK\x03\x04 not really a zip")
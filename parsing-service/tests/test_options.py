@@ -0,0 +1,81 @@
+import pytest
+
+from benchmarks.corpus import MIME_TYPES
+from exceptions import ParsingError
+from parsers import ParseOptions, parse_docx, parse_fields, parse_page_ranges, parse_pdf, parse_pptx
+
+
+class TestFields:
+    def test_parse_fields(self):
+        assert parse_fields(None) is None and parse_fields(" , ") is None
+        assert parse_fields("Text, metadata") == frozenset({"text", "metadata"})
+        with pytest.raises(ParsingError) as excinfo:
+            parse_fields("text,pages")
+        assert excinfo.value.status_code == 400
+        assert excinfo.value.message == "Unknown fields: pages"
+
+    @pytest.mark.parametrize("parse, fixture", [
+        (parse_pdf, "pdf_bytes"), (parse_docx, "docx_bytes"), (parse_pptx, "pptx_bytes")
+    ])
+    def test_only_selected_sections_are_returned(self, request, parse, fixture):
+        source = request.getfixturevalue(fixture)
+        full = parse(source)
+        text_only = parse(source, ParseOptions(fields=parse_fields("text")))
+        assert text_only["text"] == full["text"]
+        assert not {"metadata", "tables", "images", "slides"} & set(text_only)
+        # Counts and the content type are always returned
+        assert text_only["content_type"] == full["content_type"]
+
+    def test_unselected_sections_are_not_extracted(self, monkeypatch, pdf_bytes):
+        def find_tables(*args):
+            raise AssertionError("tables extracted")
+
+        monkeypatch.setattr("parsers.pdf_parser.find_tables", find_tables)
+        result = parse_pdf(pdf_bytes, ParseOptions(fields=parse_fields("metadata,images")))
+        assert set(result) == {"content_type", "metadata", "images", "pages"}
+
+    def test_endpoint(self, client, pdf_bytes):
+        files = {"file": ("report.pdf", pdf_bytes, MIME_TYPES["pdf"])}
+        result = client.post("/parse", files=files, params={"fields": "tables"}).json()
+        assert set(result) == {"content_type", "tables", "pages"} and len(result["tables"]) == 2
+        response = client.post("/parse", files=files, params={"fields": "bogus"})
+        assert response.status_code == 400
+        assert response.json()["detail"]["details"] == {"allowed": ["metadata", "text", "tables", "images", "slides"]}
+
+
+class TestPageRanges:
+    def test_parse_page_ranges(self):
+        assert parse_page_ranges(None) is None and parse_page_ranges(",") is None
+        assert parse_page_ranges("9,1-3,5-") == ((0, 3), (4, None), (8, 9))
+
+    @pytest.mark.parametrize("value", ["0", "3-1", "a-b", "-2"])
+    def test_invalid_ranges(self, value):
+        with pytest.raises(ParsingError) as excinfo:
+            parse_page_ranges(value)
+        assert excinfo.value.status_code == 400
+
+    def test_page_indices(self):
+        options = ParseOptions(pages=parse_page_ranges("2-3,3-5,9-"))
+        assert list(options.page_indices(10)) == [1, 2, 3, 4, 8, 9]
+        assert list(options.page_indices(10, 3, 9)) == [3, 4, 8]
+
+    def test_pdf_pages(self, pdf_bytes):
+        result = parse_pdf(pdf_bytes, ParseOptions(pages=parse_page_ranges("2-3")))
+        assert result["pages"] == 5
+        assert [table["page"] for table in result["tables"]] == [2]
+        assert [image["page"] for image in result["images"]] == [3]
+        full = parse_pdf(pdf_bytes)
+        assert result["text"] in full["text"] and len(result["text"]) < len(full["text"])
+
+    def test_pptx_slides(self, pptx_bytes):
+        result = parse_pptx(pptx_bytes, ParseOptions(pages=parse_page_ranges("2-3,9-")))
+        assert result["total_slides"] == 10
+        assert [slide["number"] for slide in result["slides"]] == [2, 3, 9, 10]
+
+    def test_endpoint(self, client, pptx_bytes):
+        files = {"file": ("deck.pptx", pptx_bytes, MIME_TYPES["pptx"])}
+        result = client.post("/parse", files=files, params={"slides": "1,4"}).json()
+        assert [slide["number"] for slide in result["slides"]] == [1, 4]
+        response = client.post("/parse", files=files, params={"pages": "4-2"})
+        assert response.status_code == 400
+        assert response.json()["detail"]["error"] == "Invalid page range: 4-2"
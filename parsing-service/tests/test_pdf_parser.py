@@ -0,0 +1,101 @@
+import base64
+
+import fitz
+import pytest
+
+from exceptions import DocumentCorruptedError
+from parsers import (
+    ParseOptions,
+    count_pdf_pages,
+    merge_pdf_results,
+    parse_page_ranges,
+    parse_pdf,
+    parse_pdf_or_plan,
+    plan_page_ranges,
+    split_page_ranges
+)
+from parsers.pdf_tables import find_tables
+
+
+@pytest.fixture
+def pdf_path(write_file, pdf_bytes) -> str:
+    return write_file("report.pdf", pdf_bytes)
+
+
+class TestOpenModes:
+    def test_mmap_file_and_bytes_give_same_result(self, monkeypatch, pdf_path, pdf_bytes):
+        monkeypatch.setattr("config.PDF_OPEN_MODE", "file")
+        from_file = parse_pdf(pdf_path)
+        monkeypatch.setattr("config.PDF_OPEN_MODE", "mmap")
+        from_mapping = parse_pdf(pdf_path)
+        assert from_mapping == from_file == parse_pdf(pdf_bytes)
+        assert from_file["pages"] == 5 and from_file["text"]
+
+
+class TestSinglePassExtraction:
+    def test_text_and_tables_match_separate_passes(self, pdf_bytes):
+        result = parse_pdf(pdf_bytes)
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            text = "\n".join(page_text for page_text in (page.get_text() for page in doc) if page_text.strip())
+            tables = [{"page": page.number + 1, **table} for page in doc for table in find_tables(page)]
+        assert result["text"] == text
+        assert result["tables"] == tables
+        assert [table["page"] for table in tables] == [2, 4]
+        assert tables[0]["rows"][0] == ["Segment", "FY2022", "FY2023", "Growth", "Margin"]
+
+
+class TestImages:
+    def test_metadata_without_decoding(self, monkeypatch, pdf_bytes):
+        def extract_image(self, xref):
+            raise AssertionError("image stream decoded")
+
+        monkeypatch.setattr(fitz.Document, "extract_image", extract_image)
+        result = parse_pdf(pdf_bytes)
+        assert len(result["images"]) == 2
+        for image in result["images"]:
+            assert {key: image[key] for key in ("width", "height", "format")} == {"width": 96, "height": 96, "format": "png"}
+        assert "image_content" not in result
+
+    def test_content_on_request(self, pdf_bytes):
+        result = parse_pdf(pdf_bytes, ParseOptions(include_image_content=True))
+        assert set(result["image_content"]) == {str(image["xref"]) for image in result["images"]}
+        for content in result["image_content"].values():
+            assert content["format"] == "png"
+            assert base64.b64decode(content["data"]).startswith(b"\x89PNG")
+
+
+class TestPageParallel:
+    def test_split_page_ranges(self):
+        assert split_page_ranges(10, 3) == [(0, 4), (4, 7), (7, 10)]
+        assert split_page_ranges(2, 4) == [(0, 1), (1, 2)]
+
+    def test_plan_covers_selected_pages_only(self):
+        assert plan_page_ranges(ParseOptions(), 10, 2, min_pages=20) == [(0, 10)]
+        assert plan_page_ranges(ParseOptions(), 10, 2, min_pages=0) == [(0, 10)]
+        assert plan_page_ranges(ParseOptions(), 10, 2, min_pages=4) == [(0, 5), (5, 10)]
+        selected = ParseOptions(pages=parse_page_ranges("3-6,9"))
+        assert plan_page_ranges(selected, 10, 2, min_pages=4) == [(2, 5), (5, 9)]
+
+    @pytest.mark.parametrize("options", [
+        ParseOptions(),
+        ParseOptions(include_image_content=True, normalize=True),
+        ParseOptions(pages=parse_page_ranges("2-4")),
+    ])
+    def test_merged_ranges_match_single_pass(self, pdf_path, options):
+        ranges = plan_page_ranges(options, 5, 3, min_pages=1)
+        assert len(ranges) > 1
+        merged = merge_pdf_results([parse_pdf(pdf_path, options, page_range) for page_range in ranges])
+        assert merged == parse_pdf(pdf_path, options)
+
+    def test_parse_or_plan(self, pdf_path):
+        result, ranges = parse_pdf_or_plan(pdf_path, ParseOptions(), 2, min_pages=10)
+        assert result == parse_pdf(pdf_path) and ranges == [(0, 5)]
+        result, ranges = parse_pdf_or_plan(pdf_path, ParseOptions(), 2, min_pages=5)
+        assert result is None and ranges == [(0, 3), (3, 5)]
+
+    def test_corrupt_pdf(self, corrupt_pdf_bytes, write_file):
+        path = write_file("corrupt.pdf", corrupt_pdf_bytes)
+        for parse in (count_pdf_pages, parse_pdf, lambda source: parse_pdf_or_plan(source, ParseOptions(), 2, 1)):
+            with pytest.raises(DocumentCorruptedError) as excinfo:
+                parse(path)
+            assert excinfo.value.status_code == 400
@@ -0,0 +1,94 @@
+import fitz
+import numpy as np
+import pytest
+
+from parsers import pdf_tables
+from parsers.pdf_tables import find_tables
+
+
+@pytest.fixture
+def page():
+    doc = fitz.open()
+    yield doc.new_page()
+    doc.close()
+
+
+def draw_ruled_table(page: fitz.Page, rows: int, wrap: bool) -> None:
+    """A 3-column grid of ruled cells; with ``wrap`` every row has a cell
+    whose text continues on a second line."""
+    xs = [50, 200, 350, 500]
+    y = 100
+    ys = [y]
+    for row in range(rows):
+        for column in range(3):
+            page.insert_text((xs[column] + 4, y + 14), f"cell {row} {column}")
+            if wrap and (row + column) % 2:
+                page.insert_text((xs[column] + 4, y + 28), f"more {row}{column}")
+        y += 36
+        ys.append(y)
+    for y in ys:
+        page.draw_line((xs[0], y), (xs[-1], y))
+    for x in xs:
+        page.draw_line((x, ys[0]), (x, ys[-1]))
+
+
+class TestFindTables:
+    def test_aligned_columns(self, pdf_bytes):
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            tables = find_tables(doc[1])
+        assert len(tables) == 1
+        rows = tables[0]["rows"]
+        assert rows[0] == ["Segment", "FY2022", "FY2023", "Growth", "Margin"]
+        assert len(rows) == 9 and {len(row) for row in rows} == {5}
+
+    def test_ruled_columns_and_wrapped_rows(self, page):
+        draw_ruled_table(page, rows=6, wrap=True)
+        tables = find_tables(page)
+        assert len(tables) == 1
+        rows = tables[0]["rows"]
+        assert len(rows) == 6
+        assert rows[0] == ["cell 0 0", "cell 0 1 more 01", "cell 0 2"]
+        assert rows[1] == ["cell 1 0 more 10", "cell 1 1", "cell 1 2 more 12"]
+        assert tables[0]["bbox"][0] >= 50 and tables[0]["bbox"][2] <= 500
+
+    def test_ruled_table_without_wrapping(self, page):
+        draw_ruled_table(page, rows=4, wrap=False)
+        rows = find_tables(page)[0]["rows"]
+        assert rows == [[f"cell {row} {column}" for column in range(3)] for row in range(4)]
+
+    def test_prose_page_skips_drawings(self, monkeypatch, page):
+        def ruling_lines(page):
+            raise AssertionError("drawings read")
+
+        monkeypatch.setattr(pdf_tables, "_ruling_lines", ruling_lines)
+        page.insert_textbox(fitz.Rect(72, 72, 520, 700), "A paragraph of running text. " * 60)
+        assert find_tables(page) == []
+
+    def test_bulleted_list_is_not_a_table(self, page):
+        for index in range(5):
+            page.insert_text((72, 100 + index * 16), "•")
+            page.insert_text((110, 100 + index * 16), f"item {index}")
+        assert find_tables(page) == []
+
+
+class TestTableRegions:
+    @staticmethod
+    def regions(cells_per_line, gaps=None):
+        count = len(cells_per_line)
+        top = np.arange(count, dtype=float) * 12
+        if gaps:
+            for line, extra in gaps.items():
+                top[line:] += extra
+        return pdf_tables._table_regions(np.array(cells_per_line), top, top + 10, 10.0)
+
+    def test_runs_of_multi_cell_lines(self):
+        assert self.regions([2, 3, 2]) == [(0, 2)]
+        assert self.regions([2, 2]) == []
+
+    def test_one_cell_line_inside_but_not_at_the_edges(self):
+        assert self.regions([1, 2, 2, 1, 2, 1]) == [(1, 4)]
+        # Two one-cell lines in a row end the run
+        assert self.regions([2, 2, 1, 1, 2, 2, 2]) == [(4, 6)]
+
+    def test_wide_gap_splits_runs(self):
+        assert self.regions([2] * 6, gaps={3: 40}) == [(0, 2), (3, 5)]
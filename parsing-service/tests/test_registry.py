@@ -0,0 +1,75 @@
+import io
+import zipfile
+
+import pytest
+
+from benchmarks.corpus import MIME_TYPES
+from exceptions import DocumentTypeError
+from parsers import PARSERS, RECORD_ITERATORS, detect_parser, get_parser, register_parser, sniff_document_type
+
+
+@pytest.fixture
+def registry():
+    """Restore the parser registry after the test."""
+    parsers, iterators = dict(PARSERS), dict(RECORD_ITERATORS)
+    yield
+    PARSERS.clear()
+    PARSERS.update(parsers)
+    RECORD_ITERATORS.clear()
+    RECORD_ITERATORS.update(iterators)
+
+
+def zip_bytes(*members) -> bytes:
+    stream = io.BytesIO()
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_STORED) as zf:
+        for name, data in members:
+            zf.writestr(name, data)
+    return stream.getvalue()
+
+
+class TestSniffing:
+    def test_recognises_documents_by_content(self, write_file, pdf_bytes, docx_bytes, pptx_bytes):
+        assert sniff_document_type(write_file("a", pdf_bytes)) == "pdf"
+        assert sniff_document_type(write_file("b", docx_bytes)) == "docx"
+        assert sniff_document_type(write_file("c", pptx_bytes)) == "pptx"
+
+    def test_unknown_content(self, write_file):
+        assert sniff_document_type(write_file("notes.txt", b"plain text")) is None
+        assert sniff_document_type(write_file("bundle.zip", zip_bytes(("notes.txt", b"x")))) is None
+
+    def test_reads_central_directory_when_head_is_not_enough(self, write_file):
+        # The first member pushes the identifying one out of the sniffed head
+        data = zip_bytes(("[Content_Types].xml", b"x" * 20000), ("ppt/presentation.xml", b"<p/>"))
+        assert sniff_document_type(write_file("deck", data)) == "pptx"
+
+
+class TestDetectParser:
+    def test_content_wins_over_declared_type(self, write_file, docx_bytes):
+        doc_type, parse = detect_parser(write_file("memo.pdf", docx_bytes), MIME_TYPES["pdf"], "memo.pdf")
+        assert doc_type == "docx" and parse is PARSERS["docx"].parse
+
+    def test_falls_back_to_content_type_then_extension(self, write_file):
+        path = write_file("unknown", b"no signature")
+        assert detect_parser(path, MIME_TYPES["pptx"], "deck")[0] == "pptx"
+        assert detect_parser(path, "application/octet-stream", "memo.docx")[0] == "docx"
+        with pytest.raises(DocumentTypeError):
+            detect_parser(path, "text/plain", "notes.txt")
+
+    def test_register_parser(self, registry, write_file):
+        def parse_csv(source, options=None):
+            return {"content_type": "csv"}
+
+        spec = register_parser("csv", parse_csv, keywords=("csv",), magic=(b"id,name",))
+        assert get_parser("text/csv") == ("csv", parse_csv)
+        assert detect_parser(write_file("export", b"id,name\n1,a\n"))[0] == "csv"
+        assert spec.iterate is None and "csv" not in RECORD_ITERATORS
+
+    def test_mislabelled_upload_is_parsed_by_content(self, client, docx_bytes):
+        response = client.post("/parse", files={"file": ("memo.pdf", docx_bytes, MIME_TYPES["pdf"])})
+        assert response.status_code == 200
+        assert response.json()["content_type"] == "docx"
+
+    def test_unsupported_upload(self, client):
+        response = client.post("/parse", files={"file": ("notes.txt", b"plain text", "text/plain")})
+        assert response.status_code == 400
+        assert response.json()["detail"]["type"] == "DocumentTypeError"
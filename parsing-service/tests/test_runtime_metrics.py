@@ -0,0 +1,96 @@
+import asyncio
+import gc
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+from prometheus_client import REGISTRY, CollectorRegistry, multiprocess
+
+from executor import ParseExecutor
+from runtime_metrics import RuntimeMetricsCollector
+
+pytestmark = pytest.mark.asyncio
+
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def value(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels)
+
+
+class TestRuntimeMetricsCollector:
+    async def test_sample_reports_service_and_workers(self):
+        executor = ParseExecutor(mode="process", max_workers=1)
+        executor.start()
+        try:
+            # Process pools start their workers with the first job
+            assert await executor.run(os.getpid) != os.getpid()
+            collector = RuntimeMetricsCollector(executor)
+            collector.sample()
+            assert value("parser_worker_processes") == 1
+            assert value("parsing_service_process_memory_bytes", role="main") > 0
+            assert value("parsing_service_process_memory_bytes", role="workers") > 0
+            assert value("parsing_service_threads", role="main") >= 1
+            assert value("parsing_service_memory_bytes") == (
+                value("parsing_service_process_memory_bytes", role="main")
+                + value("parsing_service_process_memory_bytes", role="workers")
+            )
+        finally:
+            executor.shutdown()
+
+    async def test_thread_pool_has_no_workers(self):
+        executor = ParseExecutor(mode="thread", max_workers=1)
+        executor.start()
+        try:
+            RuntimeMetricsCollector(executor).sample()
+            assert value("parser_worker_processes") == 0
+            assert value("parsing_service_process_memory_bytes", role="workers") == 0
+        finally:
+            executor.shutdown()
+
+    async def test_loop_lag_pool_and_gc(self):
+        executor = ParseExecutor(mode="thread", max_workers=2)
+        collector = RuntimeMetricsCollector(executor, interval=60, lag_interval=0.01)
+        lag_before = value("event_loop_lag_seconds_count") or 0
+        gc_before = value("parsing_service_gc_pause_seconds_count", generation="2") or 0
+        collector.start()
+        try:
+            await asyncio.sleep(0.05)
+            gc.collect()
+        finally:
+            await collector.stop()
+        assert value("event_loop_lag_seconds_count") > lag_before
+        assert value("parser_pool_workers") == 2 and value("parser_pool_utilization_ratio") == 0
+        assert value("parsing_service_gc_pause_seconds_count", generation="2") > gc_before
+        assert collector._on_gc not in gc.callbacks
+
+    async def test_gc_inside_a_metric_update_does_not_deadlock(self, tmp_path):
+        # A collection after every allocation, so some start while a
+        # metric holds prometheus_client's multiprocess lock
+        code = textwrap.dedent("""
+            import asyncio, gc
+            import monitoring
+            from executor import ParseExecutor
+            from runtime_metrics import RuntimeMetricsCollector
+
+            async def main():
+                collector = RuntimeMetricsCollector(ParseExecutor(mode="thread"), interval=60, lag_interval=0.01)
+                collector.start()
+                gc.set_threshold(1)
+                for index in range(500):
+                    monitoring.record_stage_times("pdf", {f"stage{index % 20}": 0.001})
+                await asyncio.sleep(0.05)
+                gc.set_threshold(700)
+                await collector.stop()
+
+            asyncio.run(main())
+        """)
+        env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+        subprocess.run([sys.executable, "-c", code], cwd=SERVICE_DIR, env=env, check=True, timeout=30)
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=str(tmp_path))
+        assert registry.get_sample_value("parsing_service_gc_pause_seconds_count", {"generation": "0"}) > 0
@@ -0,0 +1,89 @@
+import json
+
+import msgpack
+import pyarrow as pa
+import pytest
+from fastapi import HTTPException
+
+import serialization
+from benchmarks.corpus import MIME_TYPES
+from serialization import ARROW_MEDIA_TYPE, ARROW_RESULT_KEY, MSGPACK_MEDIA_TYPE, dumps_arrow, dumps_json, negotiate
+
+
+class TestNegotiate:
+    @pytest.mark.parametrize("accept, expected", [
+        (None, "json"),
+        ("*/*", "json"),
+        ("text/html, application/msgpack", "msgpack"),
+        ("application/x-msgpack", "msgpack"),
+        ("application/vnd.apache.arrow.stream;q=0.9, application/json", "json"),
+        ("application/msgpack;q=0, application/json", "json"),
+        ("application/msgpack; q=0.0, application/vnd.apache.arrow.stream", "arrow"),
+        ("application/json;q=0.1, application/msgpack", "msgpack"),
+        ("application/msgpack;q=0.5, application/vnd.apache.arrow.stream;q=0.8", "arrow"),
+        ("application/msgpack;q=0.5, */*", "json"),
+        ("application/vnd.apache.arrow.stream;q=0.5, application/msgpack;q=0.5", "arrow"),
+        ("application/msgpack;q=high, application/json;q=0.2", "json"),
+    ])
+    def test_formats(self, accept, expected):
+        assert negotiate(accept) == expected
+
+    def test_missing_encoder_is_not_acceptable(self, monkeypatch):
+        monkeypatch.setattr(serialization, "msgpack", None)
+        with pytest.raises(HTTPException) as excinfo:
+            negotiate(MSGPACK_MEDIA_TYPE)
+        assert excinfo.value.status_code == 406
+        assert MSGPACK_MEDIA_TYPE not in excinfo.value.detail["available"]
+        # Refused, or with an acceptable alternative, the missing encoder does not matter
+        assert negotiate(f"{MSGPACK_MEDIA_TYPE};q=0, application/json") == "json"
+        assert negotiate(f"{MSGPACK_MEDIA_TYPE}, application/json;q=0.5") == "json"
+
+
+class TestEncoders:
+    def test_json_is_compact_utf8(self):
+        assert dumps_json({"text": "Überblick", 1: [1.5]}) == '{"text":"Überblick","1":[1.5]}'.encode("utf-8")
+
+    def test_arrow_tables_and_metadata(self):
+        result = {
+            "content_type": "pdf",
+            "pages": 1,
+            "normalized_tables": [{
+                "page": 1, "header_rows": 1, "columns": ["Region", "Share"], "types": ["text", "percent"],
+                "units": [None, None], "data": [["North", None], [0.12, None]]
+            }],
+        }
+        reader = pa.ipc.open_stream(dumps_arrow(result))
+        table = reader.read_all()
+        assert json.loads(reader.schema.metadata[ARROW_RESULT_KEY]) == {"content_type": "pdf", "pages": 1}
+        assert table.to_pylist() == [{
+            "page": 1, "header_rows": 1, "columns": ["Region", "Share"], "types": ["text", "percent"],
+            "units": [None, None], "values": [None, [0.12, None]], "text": [["North", None], None]
+        }]
+
+
+class TestEndpoint:
+    @pytest.fixture
+    def files(self, pdf_bytes) -> dict:
+        return {"file": ("report.pdf", pdf_bytes, MIME_TYPES["pdf"])}
+
+    def test_msgpack_matches_json(self, client, files):
+        packed = client.post("/parse", files=files, headers={"Accept": MSGPACK_MEDIA_TYPE})
+        assert packed.headers["content-type"] == MSGPACK_MEDIA_TYPE and "Accept" in packed.headers["vary"]
+        assert msgpack.unpackb(packed.content) == client.post("/parse", files=files).json()
+
+    def test_arrow_carries_normalized_tables(self, client, files):
+        response = client.post("/parse", files=files, headers={"Accept": ARROW_MEDIA_TYPE})
+        assert response.headers["content-type"] == ARROW_MEDIA_TYPE
+        reader = pa.ipc.open_stream(response.content)
+        assert reader.read_all().column("page").to_pylist() == [2, 4]
+        assert json.loads(reader.schema.metadata[ARROW_RESULT_KEY])["pages"] == 5
+
+    def test_not_acceptable_is_counted(self, client, files, monkeypatch):
+        import main
+
+        errors = []
+        monkeypatch.setattr(main, "record_error", lambda *args: errors.append(args))
+        monkeypatch.setattr(serialization, "pa", None)
+        response = client.post("/parse", files=files, headers={"Accept": ARROW_MEDIA_TYPE})
+        assert response.status_code == 406
+        assert errors == [("unknown", "NotAcceptable")]
@@ -0,0 +1,120 @@
+import json
+
+import httpx
+import pytest
+
+from benchmarks.corpus import MIME_TYPES
+from tracing import SpanExporter, StageClock, Trace, clock, stage, trace_spans
+
+
+class TestTrace:
+    def test_stages_accumulate_in_first_entered_order(self):
+        trace = Trace()
+        trace.add("text", 10.0, 0.25)
+        trace.add("open", 5.0, 0.5)
+        trace.add("text", 8.0, 0.25)
+        trace.end = trace.start + 2
+        assert trace.stages["text"] == [8.0, 0.5]
+        assert trace.timings() == {"total": 2.0, "stages": {"open": 0.5, "text": 0.5}}
+        assert trace.server_timing() == "open;dur=500.000, text;dur=500.000, total;dur=2000.000"
+
+    def test_merge_adds_worker_stages_and_counts(self):
+        trace, worker = Trace(), Trace()
+        trace.add("open", 1.0, 0.5)
+        trace.count("pdf", "tables", 1)
+        worker.add("open", 2.0, 0.25)
+        worker.count("pdf", "tables", 2)
+        trace.merge(worker)
+        assert trace.stages == {"open": [1.0, 0.75]} and trace.counts == {("pdf", "tables"): 3}
+
+    def test_stage_is_a_no_op_without_a_trace(self):
+        with stage("open"):
+            pass
+        clock().enter("text")
+
+    def test_clock_is_not_charged_while_paused(self, monkeypatch):
+        now = [0.0]
+        monkeypatch.setattr("tracing.time.perf_counter", lambda: now[0])
+        trace = Trace()
+        stage_clock = StageClock(trace)
+        stage_clock.enter("text")
+        now[0] = 1.0
+        stage_clock.enter("tables")
+        now[0] = 1.5
+        stage_clock.pause()
+        now[0] = 10.0
+        stage_clock.enter("text")
+        now[0] = 10.5
+        stage_clock.pause()
+        assert {name: seconds for name, (_, seconds) in trace.stages.items()} == {"text": 1.5, "tables": 0.5}
+
+
+class TestSpans:
+    def test_request_span_with_a_child_per_stage(self):
+        trace = Trace()
+        trace.add("open", trace.start, 0.5)
+        trace.attributes["document.type"] = "pdf"
+        trace.finish(error=True)
+        server, child = trace_spans(trace)
+        assert server["status"] == {"code": 2}
+        assert server["attributes"] == [{"key": "document.type", "value": {"stringValue": "pdf"}}]
+        assert child["parentSpanId"] == server["spanId"] and child["traceId"] == trace.trace_id
+        assert int(child["endTimeUnixNano"]) - int(child["startTimeUnixNano"]) == pytest.approx(5e8, rel=1e-6)
+
+    def test_exporter_drops_traces_beyond_the_buffer(self):
+        assert not SpanExporter(endpoint="").enabled
+        exporter = SpanExporter(endpoint="http://collector/v1/traces", max_queue=1)
+        for _ in range(3):
+            exporter.export(Trace())
+        assert exporter._queued == 1 and exporter._dropped == 2
+
+    @pytest.mark.asyncio
+    async def test_flush_posts_otlp_json(self):
+        posted = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            posted.append(json.loads(request.content))
+            return httpx.Response(200)
+
+        exporter = SpanExporter(endpoint="http://collector/v1/traces", service_name="parser")
+        exporter._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        trace = Trace()
+        trace.finish()
+        exporter.export(trace)
+        await exporter.flush()
+        await exporter._client.aclose()
+        resource, = posted[0]["resourceSpans"]
+        assert resource["resource"]["attributes"] == [{"key": "service.name", "value": {"stringValue": "parser"}}]
+        assert [span["spanId"] for span in resource["scopeSpans"][0]["spans"]] == [trace.span_id]
+        assert exporter._spans == []
+
+
+class TestEndpoint:
+    @pytest.fixture
+    def files(self, pdf_bytes) -> dict:
+        return {"file": ("report.pdf", pdf_bytes, MIME_TYPES["pdf"])}
+
+    def test_server_timing_header(self, client, files):
+        response = client.post("/parse", files=files)
+        metrics = [metric.split(";")[0] for metric in response.headers["server-timing"].split(", ")]
+        assert {"upload", "detect", "open", "text", "tables", "serialize"} <= set(metrics)
+        assert metrics[-1] == "total" and "timings" not in response.json()
+
+    def test_timings_block(self, client, files):
+        timings = client.post("/parse", files=files, params={"timings": True}).json()["timings"]
+        assert timings["total"] > 0 and "open" in timings["stages"]
+
+    def test_streamed_timings_line(self, client, files):
+        response = client.post("/parse", files=files, params={"stream": True, "timings": True})
+        last = json.loads(response.text.splitlines()[-1])
+        assert last["type"] == "timings" and "serialize" in last["stages"]
+
+    def test_finished_traces_are_exported(self, client, files, monkeypatch):
+        import main
+
+        exporter = SpanExporter(endpoint="http://collector/v1/traces")
+        monkeypatch.setattr(main, "span_exporter", exporter)
+        client.post("/parse", files=files)
+        server = exporter._spans[0]
+        assert {"key": "document.type", "value": {"stringValue": "pdf"}} in server["attributes"]
+        assert {span["name"] for span in exporter._spans[1:]} >= {"upload", "open", "serialize"}
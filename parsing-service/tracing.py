@@ -0,0 +1,314 @@
+import asyncio
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from loguru import logger
+
+import config
+
+# Trace of the request being handled, if any
+_current: contextvars.ContextVar = contextvars.ContextVar("parse_trace", default=None)
+
+# OTLP span kinds and status codes
+_SPAN_KIND_INTERNAL = 1
+_SPAN_KIND_SERVER = 2
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+
+
+class Trace:
+    """Per-stage timings of one parse request.
+
+    ``stages`` maps a stage name (``upload``, ``open``, ``metadata``,
+    ``text``, ``tables``, ``images``, ``normalize``, ``serialize``, ...) to
+    ``[start, seconds]``: when the stage was first entered, as a Unix
+    timestamp, and the total time spent in it. Stages entered repeatedly,
+    such as once per page, accumulate. Stages of page ranges parsed in
+    parallel are summed, so they can add up to more than the request took.
+    """
+
+    def __init__(self, name: str = "parse"):
+        self.name = name
+        self.trace_id = os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.stages: Dict[str, List[float]] = {}
+        self.attributes: Dict[str, Any] = {}
+        self.counts: Dict[Tuple[str, str], int] = {}
+        self.error = False
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.time()) - self.start
+
+    def add(self, name: str, start: float, seconds: float):
+        """Charge ``seconds`` to stage ``name``."""
+        entry = self.stages.get(name)
+        if entry is None:
+            self.stages[name] = [start, seconds]
+        else:
+            entry[0] = min(entry[0], start)
+            entry[1] += seconds
+
+    def count(self, doc_type: str, metric_type: str, count: int):
+        """Add ``count`` to an extraction count."""
+        key = (doc_type, metric_type)
+        self.counts[key] = self.counts.get(key, 0) + count
+
+    def merge(self, other: "Trace"):
+        """Add the stages and counts of a trace recorded elsewhere, e.g. in a worker."""
+        for name, (start, seconds) in other.stages.items():
+            self.add(name, start, seconds)
+        for (doc_type, metric_type), count in other.counts.items():
+            self.count(doc_type, metric_type, count)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as stage ``name``."""
+        start = time.time()
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter() - began)
+
+    def finish(self, error: bool = False):
+        if self.end is None:
+            self.end = time.time()
+            self.error = error
+
+    def timings(self) -> dict:
+        """The ``timings`` block of a parse response: the total and each
+        stage in seconds, stages in the order they were first entered."""
+        return {
+            "total": round(self.duration, 6),
+            "stages": {name: round(seconds, 6) for name, (_, seconds) in self._ordered_stages()}
+        }
+
+    def server_timing(self) -> str:
+        """The stages as a ``Server-Timing`` header value."""
+        metrics = [f"{name};dur={seconds * 1000:.3f}" for name, (_, seconds) in self._ordered_stages()]
+        metrics.append(f"total;dur={self.duration * 1000:.3f}")
+        return ", ".join(metrics)
+
+    def _ordered_stages(self):
+        return sorted(self.stages.items(), key=lambda item: item[1][0])
+
+
+class StageClock:
+    """Charges elapsed time to the stage that is currently running.
+
+    For generators, whose stages interleave and which must not be charged
+    for the time they spend suspended: ``enter`` a stage when its work
+    starts and ``pause`` before every ``yield``.
+    """
+
+    def __init__(self, trace: Trace):
+        self._trace = trace
+        self._stage = None
+        self._start = 0.0
+        self._began = 0.0
+
+    def enter(self, name: Optional[str]):
+        if name == self._stage:
+            return
+        now = time.perf_counter()
+        if self._stage is not None:
+            self._trace.add(self._stage, self._start, now - self._began)
+        self._stage = name
+        self._began = now
+        if name is not None:
+            self._start = time.time()
+
+    def pause(self):
+        self.enter(None)
+
+
+class _NullClock:
+    def enter(self, name: Optional[str]):
+        pass
+
+    def pause(self):
+        pass
+
+
+_NULL_CLOCK = _NullClock()
+
+
+def start_trace(name: str = "parse") -> Trace:
+    """Start a trace for the current request (its asyncio task)."""
+    trace = Trace(name)
+    _current.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as stage ``name`` of the current trace."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    with trace.stage(name):
+        yield
+
+
+def clock():
+    """A :class:`StageClock` on the current trace (a no-op without one)."""
+    trace = _current.get()
+    return _NULL_CLOCK if trace is None else StageClock(trace)
+
+
+def run_traced(submitted: float, func: Callable[..., Any], *args: Any) -> Tuple[Any, Trace]:
+    """Run ``func(*args)`` on an executor worker under a trace of its own.
+
+    Returns the result and the worker's trace: the stages and extraction
+    counts recorded while it ran, including the time the job waited for a
+    worker since ``submitted`` as ``queue``.
+    """
+    trace = Trace()
+    trace.add("queue", submitted, max(0.0, trace.start - submitted))
+    token = _current.set(trace)
+    try:
+        return func(*args), trace
+    finally:
+        _current.reset(token)
+
+
+def _attribute(key: str, value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def _nanos(timestamp: float) -> str:
+    return str(int(timestamp * 1e9))
+
+
+def trace_spans(trace: Trace) -> List[dict]:
+    """A finished trace as OTLP spans: one server span for the request and
+    an internal child span per stage. A stage span starts when the stage
+    was first entered and lasts as long as the stage's total time."""
+    spans = [{
+        "traceId": trace.trace_id,
+        "spanId": trace.span_id,
+        "name": trace.name,
+        "kind": _SPAN_KIND_SERVER,
+        "startTimeUnixNano": _nanos(trace.start),
+        "endTimeUnixNano": _nanos(trace.end or time.time()),
+        "attributes": [_attribute(key, value) for key, value in trace.attributes.items()],
+        "status": {"code": _STATUS_ERROR if trace.error else _STATUS_OK}
+    }]
+    for name, (start, seconds) in trace._ordered_stages():
+        spans.append({
+            "traceId": trace.trace_id,
+            "spanId": os.urandom(8).hex(),
+            "parentSpanId": trace.span_id,
+            "name": name,
+            "kind": _SPAN_KIND_INTERNAL,
+            "startTimeUnixNano": _nanos(start),
+            "endTimeUnixNano": _nanos(start + seconds),
+            "attributes": [_attribute("parse.stage", name)]
+        })
+    return spans
+
+
+class SpanExporter:
+    """Sends finished traces to an OpenTelemetry collector over OTLP/HTTP.
+
+    Spans are buffered and posted as OTLP JSON every ``interval`` seconds
+    from a background task. Export is best effort: when the buffer is full
+    new traces are dropped, and failed posts are logged and discarded, so
+    a missing collector never slows requests down. Disabled when
+    ``endpoint`` is empty.
+    """
+
+    def __init__(
+        self,
+        endpoint: str = config.OTLP_ENDPOINT,
+        service_name: str = config.OTLP_SERVICE_NAME,
+        interval: float = config.OTLP_EXPORT_INTERVAL,
+        max_queue: int = config.OTLP_MAX_QUEUE,
+    ):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.interval = interval
+        self.max_queue = max_queue
+        self._spans: List[dict] = []
+        self._queued = 0
+        self._dropped = 0
+        self._task: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.endpoint)
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._client = httpx.AsyncClient(timeout=self.interval)
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Exporting parse traces to {self.endpoint}")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
+        await self._client.aclose()
+        self._client = None
+
+    def export(self, trace: Trace):
+        """Queue a finished trace for the next export."""
+        if not self.enabled:
+            return
+        if self._queued >= self.max_queue:
+            self._dropped += 1
+            return
+        self._spans.extend(trace_spans(trace))
+        self._queued += 1
+
+    def payload(self, spans: List[dict]) -> dict:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{"scope": {"name": self.service_name}, "spans": spans}]
+            }]
+        }
+
+    async def flush(self):
+        """Post the buffered spans now."""
+        spans, self._spans, self._queued = self._spans, [], 0
+        if self._dropped:
+            logger.warning(f"Dropped {self._dropped} parse traces, the export buffer was full")
+            self._dropped = 0
+        if not spans or self._client is None:
+            return
+        try:
+            response = await self._client.post(self.endpoint, json=self.payload(spans))
+            response.raise_for_status()
+        except Exception as e:
+            logger.warning(f"Failed to export {len(spans)} spans to {self.endpoint}: {str(e)}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()